@@ -6,28 +6,161 @@ OTIMIZADO: Processa cada ticker apenas uma vez, reutilizando
 análises para múltiplos usuários que compartilham os mesmos tickers.
 CONTEXTUAL: Usa tese estratégica de cada empresa para qualificar as notícias.
 """
-from src.config import validar_configuracoes
-from src.utils import calcular_periodo_24h, parsear_tickers, extrair_tickers_unicos
+import argparse
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from src.config import (
+    validar_configuracoes,
+    NOTICIAS_BUSCA_EM_LOTE,
+    TICKERS_WORKERS,
+    SMTP_POOL_CONEXOES,
+    INGESTAO_INCREMENTAL,
+    ENVIO_STREAMING,
+    SINTESE_UNIFICADA
+)
+from src.utils import calcular_periodo_24h, parsear_tickers, extrair_tickers_unicos, contar_assinantes, log, log_erro
 from src.sheets_client import carregar_usuarios_sheets
-from src.news_fetcher import buscar_noticias
-from src.context_manager import garantir_contexto
+from src.news_fetcher import buscar_noticias, buscar_noticias_multiplos
+from src.context_manager import garantir_contexto, garantir_digest, estimar_economia_digest
+from src import ingestao
+from src.prefiltro import selecionar_indices, obter_estatisticas as estatisticas_prefiltro
+from src.deduplicacao import agrupar_quase_duplicatas, propagar_vereditos, obter_estatisticas as estatisticas_dedup
 from src.ai_analyzer import (
-    analisar_com_gpt,
+    analisar_artigos,
     filtrar_top_relevantes,
-    gerar_resumo_executivo
+    gerar_resumo_executivo,
+    gerar_analise_consolidada,
+    gerar_sintese_ticker,
+    obter_prompts_com_contexto
+)
+from src.email_sender import (
+    gerar_corpo_email_html,
+    personalizar_email_html,
+    enviar_email,
+    fechar_conexoes_smtp
 )
-from src.email_sender import gerar_email_html, enviar_email
 from src.price_fetcher import buscar_precos_multiplos
+from src.llm_cache import obter_estatisticas as estatisticas_cache_ia
+from src.openai_client import obter_estatisticas as estatisticas_openai
+from src.agendador import AgendadorEnvios
+from src.telemetria import medir, gravar_relatorio
+from src.execucao import (
+    CheckpointExecucao,
+    novo_run_id,
+    ultimo_run_id,
+    limpar_execucoes_antigas,
+    parsear_shard,
+    particionar_tickers
+)
+
+
+def _processar_ticker(ticker, idx, total_tickers, data_inicio, data_fim, noticias_por_ticker, marcas):
+    """
+    Executa o pipeline completo de um ticker: contexto, notícias, análise,
+    filtro, resumo executivo e análise consolidada.
+
+    Erros ficam isolados no ticker: o que já foi obtido é devolvido e
+    o restante fica vazio.
+
+    Returns:
+        Tupla (contexto, top_analises, resumo, consolidado, concluido), onde
+        concluido é False se o pipeline do ticker terminou com erro
+    """
+    contexto = None
+    try:
+        log(f"\n[{idx}/{total_tickers}] Processando {ticker}...")
+        
+        # 1. Garantir contexto estratégico (Carrega ou gera via GPT-4o)
+        with medir("contexto", ticker=ticker):
+            contexto = garantir_contexto(ticker)
+            # Digest compacto nos prompts repetidos; a tese completa fica para o resumo executivo
+            contexto_curto = (garantir_digest(ticker, contexto) if contexto else None) or contexto
+        
+        # 2. Buscar notícias (1x por ticker, ou da busca combinada)
+        if noticias_por_ticker is not None:
+            artigos = noticias_por_ticker.get(ticker, [])
+        else:
+            with medir("noticias", ticker=ticker):
+                artigos = buscar_noticias(ticker, data_inicio, data_fim, desde=marcas.get(ticker))
+        
+        if INGESTAO_INCREMENTAL:
+            # Só os artigos novos vão para o GPT; os demais vêm da janela salva
+            artigos = ingestao.filtrar_novos(ticker, artigos)
+        elif not artigos:
+            log_erro(f"  ⚠ {ticker}: Nenhuma notícia encontrada")
+            return contexto, [], None, None, True
+        
+        # 3. Agrupar quase-duplicatas e aplicar o pré-filtro léxico aos
+        # representantes: cópias e notícias de ruído nem chegam à IA
+        with medir("filtragem", ticker=ticker):
+            todos_grupos = agrupar_quase_duplicatas(artigos, ticker)
+            aprovados = selecionar_indices([g[0] for g in todos_grupos], ticker, contexto)
+            grupos = [todos_grupos[i] for i in aprovados]
+        
+        # 4. Analisar com GPT (1x por ticker, usando o contexto)
+        with medir("analise", ticker=ticker):
+            resultados = analisar_artigos([g[0] for g in grupos], ticker, contexto_curto)
+        if INGESTAO_INCREMENTAL:
+            # Reprovados no pré-filtro e artigos sem corpo contam como vistos;
+            # só falhas de análise (None) seguram a marca d'água. As cópias
+            # herdam o veredito do representante.
+            por_grupo = dict(zip(aprovados, resultados))
+            marcados = [
+                por_grupo[i] if i in por_grupo and grupo[0].get('body') else ingestao.DESCARTADO
+                for i, grupo in enumerate(todos_grupos)
+            ]
+            ingestao.registrar(ticker, *propagar_vereditos(todos_grupos, marcados))
+            analises = [a for a in ingestao.analises_janela(ticker) if not a.get('duplicata')]
+            log(f"  ✓ {ticker}: {len(artigos)} notícias novas, {len(analises)} análises na janela")
+        else:
+            analises = [r for r in resultados if r is not None]
+        
+        if not analises:
+            log_erro(f"  ⚠ {ticker}: Nenhuma análise gerada")
+            return contexto, [], None, None, True
+        
+        # 5. Filtrar top relevantes (baseado no relevancia_score)
+        top_analises = filtrar_top_relevantes(analises)
+        
+        log(f"  ✓ {ticker}: {len(top_analises)} notícias relevantes selecionadas")
+        
+        if not top_analises:
+            return contexto, [], None, None, True
+        
+        # 6. Resumo executivo (tese completa) e análise consolidada (digest)
+        with medir("sintese", ticker=ticker):
+            if SINTESE_UNIFICADA:
+                # Uma única requisição JSON gera os três textos
+                resumo, consolidado = gerar_sintese_ticker(ticker, top_analises, contexto, contexto_curto)
+            else:
+                resumo = gerar_resumo_executivo(top_analises, {ticker: contexto}).get(ticker, "")
+                consolidado = gerar_analise_consolidada({ticker: top_analises}, {ticker: contexto_curto}).get(ticker)
+        
+        return contexto, top_analises, resumo, consolidado, True
+        
+    except Exception as e:
+        log_erro(f"  ✗ Erro ao processar {ticker}: {e}")
+        return contexto, [], None, None, False
 
 
-def processar_todos_tickers(tickers_unicos, data_inicio, data_fim):
+def processar_todos_tickers(tickers_unicos, data_inicio, data_fim, ao_concluir_ticker=None, checkpoint=None):
     """
     Processa todos os tickers únicos uma única vez.
     
+    Cada ticker percorre o pipeline completo em um pool de
+    TICKERS_WORKERS threads, então o tempo total acompanha o ticker
+    mais lento e não a soma de todos.
+    
     Args:
         tickers_unicos: Set de tickers únicos
         data_inicio: Data início da busca
         data_fim: Data fim da busca
+        ao_concluir_ticker: Função opcional chamada como
+            ao_concluir_ticker(ticker, caches) assim que cada ticker termina,
+            onde caches é a mesma tupla retornada por esta função
+        checkpoint: CheckpointExecucao opcional; tickers com checkpoint são
+            reaproveitados e os demais são gravados assim que terminam
         
     Returns:
         Tupla (cache_analises, cache_resumos, cache_contextos, analises_consolidadas):
@@ -39,121 +172,116 @@ def processar_todos_tickers(tickers_unicos, data_inicio, data_fim):
     cache_analises = {}
     cache_resumos = {}
     cache_contextos = {}
+    analises_consolidadas = {}
     total_tickers = len(tickers_unicos)
     
-    print(f"\n{'='*60}")
-    print(f"📊 FASE 1: PROCESSANDO {total_tickers} TICKERS ÚNICOS")
-    print(f"{'='*60}")
+    log(f"\n{'='*60}")
+    log(f"📊 FASE 1: PROCESSANDO {total_tickers} TICKERS ÚNICOS")
+    log(f"{'='*60}")
     
-    for idx, ticker in enumerate(sorted(tickers_unicos), 1):
-        try:
-            print(f"\n[{idx}/{total_tickers}] Processando {ticker}...")
-            
-            # 1. Garantir contexto estratégico (Carrega ou gera via GPT-4o)
-            contexto = garantir_contexto(ticker)
+    caches = (cache_analises, cache_resumos, cache_contextos, analises_consolidadas)
+
+    def guardar(ticker, contexto, top_analises, resumo, consolidado):
+        if contexto:
             cache_contextos[ticker] = contexto
-            
-            # 2. Buscar notícias (1x por ticker)
-            artigos = buscar_noticias(ticker, data_inicio, data_fim)
-            
-            if not artigos:
-                print(f"  ⚠ {ticker}: Nenhuma notícia encontrada")
-                cache_analises[ticker] = []
-                continue
-            
-            # 3. Analisar com GPT (1x por ticker, usando o contexto)
-            analises = analisar_com_gpt(artigos, ticker, contexto)
-            
-            if not analises:
-                print(f"  ⚠ {ticker}: Nenhuma análise gerada")
-                cache_analises[ticker] = []
-                continue
-            
-            # 4. Filtrar top relevantes (baseado no relevancia_score)
-            top_analises = filtrar_top_relevantes(analises)
-            
-            print(f"  ✓ {ticker}: {len(top_analises)} notícias relevantes selecionadas")
-            
-            # Armazenar no cache
-            cache_analises[ticker] = top_analises
-            
-        except Exception as e:
-            print(f"  ✗ Erro ao processar {ticker}: {e}")
-            cache_analises[ticker] = []
-            continue
+        cache_analises[ticker] = top_analises
+        if top_analises:
+            cache_resumos[ticker] = resumo or ""
+        if consolidado:
+            analises_consolidadas[ticker] = consolidado
+        if ao_concluir_ticker:
+            ao_concluir_ticker(ticker, caches)
+
+    # Retomada: tickers com checkpoint não voltam ao Event Registry nem à OpenAI
+    retomados = checkpoint.carregar_tickers(tickers_unicos) if checkpoint else {}
+    if retomados:
+        log(f"\n♻️ {len(retomados)} tickers recuperados do checkpoint da execução {checkpoint.run_id}")
+    for ticker in sorted(retomados):
+        guardar(ticker, *retomados[ticker])
+    pendentes = [t for t in sorted(tickers_unicos) if t not in retomados]
     
-    # =========================================================
-    # Gerar resumos executivos (1x por ticker com notícias)
-    # =========================================================
-    print(f"\n{'='*60}")
-    print(f"📝 GERANDO RESUMOS EXECUTIVOS")
-    print(f"{'='*60}")
+    # Marcas d'água da ingestão incremental (último artigo já analisado)
+    marcas = ingestao.obter_marcas(pendentes) if INGESTAO_INCREMENTAL else {}
     
-    for ticker, analises in cache_analises.items():
-        if analises:
-            # Gera resumo executivo para este ticker (1x, usando contexto)
-            resumo = gerar_resumo_executivo(analises, cache_contextos)
-            cache_resumos[ticker] = resumo.get(ticker, "")
+    # Busca combinada: poucas consultas ao Event Registry para todos os tickers
+    noticias_por_ticker = None
+    if NOTICIAS_BUSCA_EM_LOTE and pendentes:
+        log(f"\n🔍 Buscando notícias de {len(pendentes)} tickers em consultas combinadas...")
+        with medir("noticias"):
+            noticias_por_ticker = buscar_noticias_multiplos(pendentes, data_inicio, data_fim, desde=marcas)
+    
+    with ThreadPoolExecutor(max_workers=max(TICKERS_WORKERS, 1), thread_name_prefix="ticker") as executor:
+        futuros = {
+            executor.submit(
+                _processar_ticker, ticker, idx, total_tickers,
+                data_inicio, data_fim, noticias_por_ticker, marcas
+            ): ticker
+            for idx, ticker in enumerate(pendentes, len(retomados) + 1)
+        }
+        
+        # Os caches são preenchidos na ordem em que os tickers terminam
+        for futuro in as_completed(futuros):
+            ticker = futuros[futuro]
+            contexto, top_analises, resumo, consolidado, concluido = futuro.result()
+            # Tickers com erro ficam sem checkpoint e são refeitos na retomada
+            if checkpoint and concluido:
+                checkpoint.salvar_ticker(ticker, contexto, top_analises, resumo, consolidado)
+            guardar(ticker, contexto, top_analises, resumo, consolidado)
     
     # Resumo da fase 1
     tickers_com_noticias = sum(1 for t, a in cache_analises.items() if a)
     total_noticias_cache = sum(len(a) for a in cache_analises.values())
     
-    # Gerar análises consolidadas
-    print(f"\n{'='*60}")
-    print(f"📊 GERANDO ANÁLISES CONSOLIDADAS")
-    print(f"{'='*60}")
-    
-    from src.ai_analyzer import gerar_analise_consolidada
-    analises_consolidadas = gerar_analise_consolidada(cache_analises, cache_contextos)
-    
-    print(f"\n{'='*60}")
-    print(f"✓ FASE 1 CONCLUÍDA")
-    print(f"  Tickers processados: {total_tickers}")
-    print(f"  Tickers com notícias: {tickers_com_noticias}")
-    print(f"  Resumos executivos gerados: {len(cache_resumos)}")
-    print(f"  Análises consolidadas geradas: {len(analises_consolidadas)}")
-    print(f"  Total de análises em cache: {total_noticias_cache}")
-    print(f"{'='*60}")
+    log(f"\n{'='*60}")
+    log(f"✓ FASE 1 CONCLUÍDA")
+    log(f"  Tickers processados: {total_tickers}")
+    log(f"  Tickers com notícias: {tickers_com_noticias}")
+    log(f"  Resumos executivos gerados: {len(cache_resumos)}")
+    log(f"  Análises consolidadas geradas: {len(analises_consolidadas)}")
+    log(f"  Total de análises em cache: {total_noticias_cache}")
+    log(f"{'='*60}")
     
-    return cache_analises, cache_resumos, cache_contextos, analises_consolidadas
+    return caches
 
 
-def processar_usuario(usuario_dict, cache_analises, cache_resumos, precos_dados, analises_consolidadas):
+def _buscar_precos(tickers, checkpoint=None):
     """
-    Processa um único usuário usando os caches de análises, resumos, preços e análises consolidadas.
+    Busca os preços da fase 1.5 dentro de um span de telemetria.
+
+    Com checkpoint, a retomada reutiliza os mesmos preços da execução original.
+    """
+    precos = checkpoint.carregar_precos() if checkpoint else None
+    if precos is not None and set(tickers) <= set(precos):
+        log(f"\n♻️ Preços recuperados do checkpoint da execução {checkpoint.run_id}")
+        return precos
+    with medir("precos"):
+        precos = buscar_precos_multiplos(tickers)
+    if checkpoint:
+        checkpoint.salvar_precos(precos)
+    return precos
+
+
+def _assinatura_carteira(tickers):
+    """Chave normalizada do conjunto de tickers (independe de ordem e repetição)."""
+    return tuple(sorted(set(tickers)))
+
+
+def montar_conteudo_email(tickers, cache_analises, cache_resumos, precos_dados, analises_consolidadas):
+    """
+    Monta o corpo do email (sem a saudação) para uma lista de tickers.
+    
+    O resultado é o mesmo para todos os usuários com a mesma carteira.
     
     Args:
-        usuario_dict: Dicionário com dados do usuário
+        tickers: Lista de tickers da carteira
         cache_analises: Dicionário {ticker: lista_de_analises}
         cache_resumos: Dicionário {ticker: resumo_executivo_texto}
         precos_dados: Dicionário {ticker: {preco_fechamento, variacao_percentual, sucesso}}
         analises_consolidadas: Dicionário {ticker: {'positivo': str, 'negativo': str}}
         
     Returns:
-        Tupla (sucesso: bool, num_noticias: int)
+        Tupla (corpo_html, num_noticias)
     """
-    nome = usuario_dict.get('Qual seu nome completo?', 'N/A')
-    email = usuario_dict.get('Qual seu e-mail?', '')
-    ticker_str = usuario_dict.get('Ticker 1', '')
-
-    print(f"\n  Processando: {nome} ({email})")
-
-    # Validar email
-    if not email or '@' not in email:
-        print(f"    ✗ Email inválido: {email}")
-        return False, 0
-
-    # Parsear tickers do usuário
-    tickers = parsear_tickers(ticker_str)
-    if not tickers:
-        print(f"    ⚠ Nenhum ticker encontrado")
-        html = gerar_email_html(usuario_dict, [], {}, {}, {})
-        enviar_email(email, "TradingCore - Análise Diária", html)
-        return True, 0
-
-    print(f"    Tickers: {', '.join(tickers)}")
-    
     # Coletar análises do cache para os tickers do usuário
     todas_analises = []
     for ticker in tickers:
@@ -172,52 +300,217 @@ def processar_usuario(usuario_dict, cache_analises, cache_resumos, precos_dados,
     # Filtrar apenas as análises consolidadas dos tickers do usuário
     consolidadas_usuario = {t: analises_consolidadas.get(t, {}) for t in tickers if t in analises_consolidadas}
 
+    corpo = gerar_corpo_email_html(todas_analises, resumo_executivo, precos_usuario, consolidadas_usuario)
+    return corpo, len(todas_analises)
+
+
+def enviar_para_usuario(usuario_dict, tickers, corpo_html, num_noticias):
+    """
+    Personaliza o corpo já montado com o nome do usuário e envia o email.
+    
+    Args:
+        usuario_dict: Dicionário com dados do usuário
+        tickers: Lista de tickers do usuário
+        corpo_html: Corpo gerado por montar_conteudo_email
+        num_noticias: Número de notícias do corpo
+        
+    Returns:
+        Tupla (sucesso: bool, num_noticias: int)
+    """
+    nome = usuario_dict.get('Qual seu nome completo?', 'N/A')
+    email = usuario_dict.get('Qual seu e-mail?', '')
+
+    log(f"\n  Processando: {nome} ({email})")
+
+    # Validar email
+    if not email or '@' not in email:
+        log_erro(f"    ✗ Email inválido: {email}")
+        return False, 0
+
+    if not tickers:
+        log_erro(f"    ⚠ Nenhum ticker encontrado")
+        html = personalizar_email_html(corpo_html, usuario_dict)
+        enviar_email(email, "TradingCore - Análise Diária", html)
+        return True, 0
+
+    log(f"    Tickers: {', '.join(tickers)}")
+
     # Gerar e enviar email
     try:
-        html = gerar_email_html(usuario_dict, todas_analises, resumo_executivo, precos_usuario, consolidadas_usuario)
+        html = personalizar_email_html(corpo_html, usuario_dict)
 
         sucesso = enviar_email(
             email,
-            f"TradingCore - Análise Diária ({len(todas_analises)} notícias)",
+            f"TradingCore - Análise Diária ({num_noticias} notícias)",
             html
         )
 
         if sucesso:
-            print(f"    ✓ Email enviado! {len(todas_analises)} notícias")
+            log(f"    ✓ Email enviado! {num_noticias} notícias")
 
-        return sucesso, len(todas_analises)
+        return sucesso, num_noticias
 
     except Exception as e:
-        print(f"    ✗ Erro ao enviar email: {e}")
-        return False, len(todas_analises)
+        log_erro(f"    ✗ Erro ao enviar email: {e}")
+        return False, num_noticias
 
 
-def main():
+def processar_usuario(usuario_dict, cache_analises, cache_resumos, precos_dados, analises_consolidadas):
+    """
+    Processa um único usuário usando os caches de análises, resumos, preços e análises consolidadas.
+    
+    Args:
+        usuario_dict: Dicionário com dados do usuário
+        cache_analises: Dicionário {ticker: lista_de_analises}
+        cache_resumos: Dicionário {ticker: resumo_executivo_texto}
+        precos_dados: Dicionário {ticker: {preco_fechamento, variacao_percentual, sucesso}}
+        analises_consolidadas: Dicionário {ticker: {'positivo': str, 'negativo': str}}
+        
+    Returns:
+        Tupla (sucesso: bool, num_noticias: int)
+    """
+    tickers = parsear_tickers(usuario_dict.get('Ticker 1', ''))
+    corpo, num_noticias = montar_conteudo_email(
+        tickers, cache_analises, cache_resumos, precos_dados, analises_consolidadas
+    )
+    return enviar_para_usuario(usuario_dict, tickers, corpo, num_noticias)
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Envia as análises diárias do TradingCore.")
+    parser.add_argument("--run-id", help="Identificador da execução (padrão: data e hora atuais)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma a execução informada em --run-id (ou a mais recente), "
+                             "reaproveitando a fase 1 e pulando os emails já enviados")
+    parser.add_argument("--shard", metavar="i/N",
+                        help="Executa só a fase 1 da fatia i de N dos tickers, gravando no checkpoint de --run-id")
+    parser.add_argument("--particao", choices=["hash", "assinantes"], default="hash",
+                        help="Divisão dos tickers entre os shards: hash do ticker (padrão) "
+                             "ou equilibrada pelo número de assinantes")
+    parser.add_argument("--coordenar", action="store_true",
+                        help="Junta os shards de --run-id, processa os tickers que faltarem e faz a fase 2")
+    parser.add_argument("--aguardar", type=float, default=0, metavar="SEGUNDOS",
+                        help="Com --coordenar, espera até este tempo pela conclusão de todos os shards")
+    args = parser.parse_args(argv)
+
+    if args.shard:
+        try:
+            args.shard = parsear_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.shard and args.coordenar:
+        parser.error("--shard e --coordenar não podem ser usados juntos")
+    if (args.shard or args.coordenar) and not args.run_id:
+        parser.error("--shard e --coordenar exigem --run-id (o mesmo em todos os processos)")
+    return args
+
+
+def _abrir_checkpoint(args):
+    """
+    Abre o checkpoint da execução conforme --run-id/--resume.
+
+    Shards e coordenador compartilham o checkpoint: o primeiro processo
+    cria o manifesto e os demais adotam o mesmo período.
+
+    Returns:
+        Tupla (checkpoint, data_inicio, data_fim) ou None se não houver o que retomar
+    """
+    if args.shard or args.coordenar:
+        checkpoint = CheckpointExecucao(args.run_id)
+        data_inicio, data_fim = calcular_periodo_24h()
+        manifesto = checkpoint.obter_ou_criar_manifesto(data_inicio=data_inicio, data_fim=data_fim)
+        papel = "shard {}/{}".format(*args.shard) if args.shard else "coordenador"
+        log(f"\n🆔 Execução: {checkpoint.run_id} ({papel})")
+        return checkpoint, manifesto['data_inicio'], manifesto['data_fim']
+
+    run_id = args.run_id
+    if args.resume and not run_id:
+        run_id = ultimo_run_id()
+        if not run_id:
+            log_erro("\n✗ Nenhuma execução anterior para retomar")
+            return None
+
+    checkpoint = CheckpointExecucao(run_id or novo_run_id())
+    manifesto = checkpoint.carregar_manifesto()
+    if manifesto and not args.resume:
+        log_erro(f"\n✗ A execução {checkpoint.run_id} já existe; use --resume para retomá-la")
+        return None
+    if args.resume and manifesto:
+        # O período original é mantido para que a retomada envie o mesmo conteúdo
+        data_inicio, data_fim = manifesto['data_inicio'], manifesto['data_fim']
+        log(f"\n♻️ Retomando a execução {checkpoint.run_id} (iniciada em {manifesto['iniciado_em']})")
+    else:
+        if args.resume:
+            log_erro(f"\n⚠ Execução {checkpoint.run_id} sem checkpoint: começando do zero")
+        data_inicio, data_fim = calcular_periodo_24h()
+        checkpoint.salvar_manifesto(data_inicio=data_inicio, data_fim=data_fim)
+        log(f"\n🆔 Execução: {checkpoint.run_id}")
+
+    removidas = limpar_execucoes_antigas(manter=checkpoint.run_id)
+    if removidas:
+        log(f"🧹 {removidas} checkpoints de execuções antigas removidos")
+    return checkpoint, data_inicio, data_fim
+
+
+def _executar_shard(args, checkpoint, df_usuarios, tickers_unicos, data_inicio, data_fim):
+    """
+    Executa a fase 1 só para a fatia de tickers deste shard.
+
+    O resultado de cada ticker vai para o checkpoint compartilhado e, no
+    fim, o shard registra sua conclusão para o coordenador.
+    """
+    indice, total = args.shard
+    assinantes = contar_assinantes(df_usuarios) if args.particao == "assinantes" else None
+    fatia = particionar_tickers(tickers_unicos, total, assinantes)[indice - 1]
+    log(f"🧩 Shard {indice}/{total}: {len(fatia)} de {len(tickers_unicos)} tickers (partição por {args.particao})")
+
+    if fatia:
+        with medir("fase1"):
+            processar_todos_tickers(set(fatia), data_inicio, data_fim, checkpoint=checkpoint)
+
+    concluidos = len(checkpoint.carregar_tickers(fatia))
+    checkpoint.registrar_shard(indice, total, fatia, concluidos)
+    log(f"\n✓ Shard {indice}/{total} concluído: {concluidos}/{len(fatia)} tickers no checkpoint {checkpoint.diretorio}")
+    if concluidos < len(fatia):
+        log_erro(f"⚠ {len(fatia) - concluidos} tickers com erro serão refeitos pelo coordenador")
+
+    relatorio = gravar_relatorio(sufixo=f"-shard{indice}de{total}")
+    if relatorio:
+        log(f"📈 Telemetria: {relatorio[0]} e {relatorio[1]}")
+
+
+def main(argv=None):
     """Função principal que executa o processamento completo."""
-    print("\n" + "="*60)
-    print("🚀 TRADINGCORE - INICIANDO PROCESSAMENTO")
-    print("="*60)
+    args = parsear_argumentos(argv)
+    inicio = time.monotonic()
+    log("\n" + "="*60)
+    log("🚀 TRADINGCORE - INICIANDO PROCESSAMENTO")
+    log("="*60)
 
     # Validar configurações
     try:
         validar_configuracoes()
     except ValueError as e:
-        print(f"\n✗ {e}")
+        log_erro(f"\n✗ {e}")
         return
 
-    # Calcular período
-    data_inicio, data_fim = calcular_periodo_24h()
-    print(f"\n📅 Período: {data_inicio} a {data_fim}")
+    # Checkpoint da execução e período (o original, na retomada)
+    aberto = _abrir_checkpoint(args)
+    if aberto is None:
+        return
+    checkpoint, data_inicio, data_fim = aberto
+    log(f"\n📅 Período: {data_inicio} a {data_fim}")
 
     # Carregar usuários
-    print(f"\n📊 Carregando usuários...")
-    df_usuarios = carregar_usuarios_sheets()
+    log(f"\n📊 Carregando usuários...")
+    with medir("carregar_usuarios"):
+        df_usuarios = carregar_usuarios_sheets()
 
     if df_usuarios.empty:
-        print("✗ Nenhum usuário encontrado!")
+        log_erro("✗ Nenhum usuário encontrado!")
         return
 
-    print(f"✓ {len(df_usuarios)} usuários carregados")
+    log(f"✓ {len(df_usuarios)} usuários carregados")
 
     # =========================================================
     # FASE 1: Extrair e processar tickers únicos
@@ -225,62 +518,196 @@ def main():
     tickers_unicos = extrair_tickers_unicos(df_usuarios)
     
     if not tickers_unicos:
-        print("✗ Nenhum ticker encontrado em nenhum usuário!")
+        log_erro("✗ Nenhum ticker encontrado em nenhum usuário!")
         return
     
-    print(f"✓ {len(tickers_unicos)} tickers únicos identificados: {', '.join(sorted(tickers_unicos))}")
-    
-    # Processar todos os tickers uma única vez
-    cache_analises, cache_resumos, _, analises_consolidadas = processar_todos_tickers(tickers_unicos, data_inicio, data_fim)
+    log(f"✓ {len(tickers_unicos)} tickers únicos identificados: {', '.join(sorted(tickers_unicos))}")
 
-    # =========================================================
-    # FASE 1.5: Buscar preços do Yahoo Finance
-    # =========================================================
-    precos_dados = buscar_precos_multiplos(tickers_unicos)
+    if args.shard:
+        _executar_shard(args, checkpoint, df_usuarios, tickers_unicos, data_inicio, data_fim)
+        checkpoint.fechar()
+        return
 
-    # =========================================================
-    # FASE 2: Distribuir análises para cada usuário
-    # =========================================================
-    print(f"\n{'='*60}")
-    print(f"📧 FASE 2: ENVIANDO EMAILS PARA {len(df_usuarios)} USUÁRIOS")
-    print(f"{'='*60}")
+    if args.coordenar:
+        # Tickers de shards que não terminaram são processados aqui mesmo
+        total_shards, marcas = checkpoint.aguardar_shards(args.aguardar)
+        if total_shards is None:
+            log_erro("⚠ Nenhum shard concluído: o coordenador processará todos os tickers")
+        else:
+            faltando = sorted(set(range(1, total_shards + 1)) - set(marcas))
+            log(f"🧩 Shards concluídos: {len(marcas)}/{total_shards}"
+                  + (f" (faltando: {', '.join(map(str, faltando))})" if faltando else ""))
+    
+    # Usuários com a mesma carteira formam um grupo: o conteúdo é montado
+    # uma vez por grupo e só a saudação muda. Cada grupo depende dos seus
+    # tickers; o agendador libera o envio assim que todos ficam prontos.
+    usuarios = [row.to_dict() for _, row in df_usuarios.iterrows()]
+    tickers_usuarios = [parsear_tickers(u.get('Ticker 1', '')) for u in usuarios]
+    membros_grupo = {}
+    ordem_grupo = {}
+    for indice, tickers in enumerate(tickers_usuarios):
+        assinatura = _assinatura_carteira(tickers)
+        membros_grupo.setdefault(assinatura, []).append(indice)
+        # O grupo usa a ordem de tickers do primeiro membro
+        ordem_grupo.setdefault(assinatura, list(dict.fromkeys(tickers)))
+
+    agendador = AgendadorEnvios({a: a for a in membros_grupo}, inicio=inicio)
+    futuros_envio = {}
+    conteudos_grupo = {}
+    conteudos_lock = threading.Lock()
+    # Membros que receberam um conteúdo já montado por outro do grupo
+    reaproveitados = set()
+    # Registro durável de envios: a retomada não reenvia para quem já recebeu
+    ja_enviados = checkpoint.emails_enviados()
 
     # Estatísticas
     total_usuarios = len(df_usuarios)
     usuarios_sucesso = 0
     usuarios_erro = 0
+    usuarios_pulados = 0
     total_noticias = 0
 
-    # Processar cada usuário usando os caches
-    for idx, row in df_usuarios.iterrows():
-        try:
-            usuario_dict = row.to_dict()
-            sucesso, num_noticias = processar_usuario(usuario_dict, cache_analises, cache_resumos, precos_dados, analises_consolidadas)
-
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="precos") as executor_precos, \
+            ThreadPoolExecutor(max_workers=max(SMTP_POOL_CONEXOES, 1), thread_name_prefix="email") as executor_email:
+
+        def enviar(indice, assinatura, caches):
+            email = str(usuarios[indice].get('Qual seu e-mail?', '')).strip().lower()
+            if email in ja_enviados:
+                return None, 0
+            cache_analises, cache_resumos, _, analises_consolidadas = caches
+            precos_dados = futuro_precos.result()
+            # O lock só reserva o grupo; a montagem do HTML acontece fora dele,
+            # e os demais membros do mesmo grupo esperam pelo futuro
+            with conteudos_lock:
+                futuro_conteudo = conteudos_grupo.get(assinatura)
+                montar = futuro_conteudo is None
+                if montar:
+                    futuro_conteudo = conteudos_grupo[assinatura] = Future()
+            if montar:
+                try:
+                    futuro_conteudo.set_result(montar_conteudo_email(
+                        ordem_grupo[assinatura], cache_analises, cache_resumos,
+                        precos_dados, analises_consolidadas
+                    ))
+                except Exception as e:
+                    futuro_conteudo.set_exception(e)
+            corpo, num_noticias = futuro_conteudo.result()
+            sucesso, num_noticias = enviar_para_usuario(
+                usuarios[indice], tickers_usuarios[indice], corpo, num_noticias
+            )
             if sucesso:
-                usuarios_sucesso += 1
-                total_noticias += num_noticias
-            else:
-                usuarios_erro += 1
-
-        except Exception as e:
-            print(f"\n✗ Erro crítico ao processar usuário {idx}: {e}")
-            usuarios_erro += 1
-            continue
+                checkpoint.registrar_envio(email, num_noticias)
+                agendador.registrar_entrega()
+                if not montar:
+                    with conteudos_lock:
+                        reaproveitados.add(indice)
+            return sucesso, num_noticias
+
+        def agendar(assinaturas, caches):
+            for assinatura in assinaturas:
+                for indice in membros_grupo[assinatura]:
+                    futuros_envio[executor_email.submit(enviar, indice, assinatura, caches)] = indice
+
+        futuro_precos = None
+        ao_concluir_ticker = None
+        if ENVIO_STREAMING:
+            # Preços em paralelo com a fase 1; emails saem conforme os tickers ficam prontos
+            log("\n📧 Envio em streaming: cada email sai assim que os tickers do usuário ficam prontos")
+            futuro_precos = executor_precos.submit(_buscar_precos, tickers_unicos, checkpoint)
+            ao_concluir_ticker = lambda ticker, caches: agendar(agendador.marcar_pronto(ticker), caches)
+
+        # =========================================================
+        # FASE 1: Processar todos os tickers uma única vez
+        # =========================================================
+        with medir("fase1"):
+            caches = processar_todos_tickers(tickers_unicos, data_inicio, data_fim, ao_concluir_ticker, checkpoint)
+
+        # =========================================================
+        # FASE 1.5: Buscar preços do Yahoo Finance
+        # =========================================================
+        if futuro_precos is None:
+            futuro_precos = executor_precos.submit(_buscar_precos, tickers_unicos, checkpoint)
+            futuro_precos.result()
+
+        # =========================================================
+        # FASE 2: Distribuir análises para cada usuário
+        # =========================================================
+        log(f"\n{'='*60}")
+        log(f"📧 FASE 2: ENVIANDO EMAILS PARA {len(df_usuarios)} USUÁRIOS")
+        log(f"{'='*60}")
+
+        with medir("fase2"):
+            agendar(agendador.liberar_sem_dependencias(), caches)
+            for ticker in sorted(tickers_unicos):
+                # No modo streaming os tickers já foram liberados durante a fase 1
+                agendar(agendador.marcar_pronto(ticker), caches)
+
+            for futuro in as_completed(list(futuros_envio)):
+                try:
+                    sucesso, num_noticias = futuro.result()
+
+                    if sucesso is None:
+                        usuarios_pulados += 1
+                    elif sucesso:
+                        usuarios_sucesso += 1
+                        total_noticias += num_noticias
+                    else:
+                        usuarios_erro += 1
+
+                except Exception as e:
+                    log_erro(f"\n✗ Erro crítico ao processar usuário {futuros_envio[futuro]}: {e}")
+                    usuarios_erro += 1
+                    continue
+
+    fechar_conexoes_smtp()
+    checkpoint.fechar()
 
     # Resumo final
-    print("\n" + "="*60)
-    print("📊 RESUMO DO PROCESSAMENTO")
-    print("="*60)
-    print(f"Tickers únicos processados: {len(tickers_unicos)}")
-    print(f"Total de usuários: {total_usuarios}")
-    print(f"✓ Sucesso: {usuarios_sucesso}")
-    print(f"✗ Erro: {usuarios_erro}")
-    print(f"📰 Total de notícias enviadas: {total_noticias}")
-    print(f"📈 Média de notícias por usuário: {total_noticias/max(usuarios_sucesso,1):.1f}")
-    print("="*60)
-    print("✅ PROCESSAMENTO CONCLUÍDO!")
-    print("="*60 + "\n")
+    log("\n" + "="*60)
+    log("📊 RESUMO DO PROCESSAMENTO")
+    log("="*60)
+    log(f"Tickers únicos processados: {len(tickers_unicos)}")
+    log(f"Total de usuários: {total_usuarios}")
+    log(f"✓ Sucesso: {usuarios_sucesso}")
+    log(f"✗ Erro: {usuarios_erro}")
+    if usuarios_pulados:
+        log(f"♻️ Já enviados antes da retomada: {usuarios_pulados}")
+    log(f"📰 Total de notícias enviadas: {total_noticias}")
+    log(f"📈 Média de notícias por usuário: {total_noticias/max(usuarios_sucesso,1):.1f}")
+    cache_ia = estatisticas_cache_ia()
+    log(f"💾 Cache de IA: {cache_ia['hits']} hits / {cache_ia['misses']} misses")
+    dedup = estatisticas_dedup()
+    if dedup['duplicatas']:
+        log(f"🔁 Quase-duplicatas: {dedup['duplicatas']}/{dedup['artigos']} notícias agrupadas e não analisadas")
+    prefiltro = estatisticas_prefiltro()
+    if prefiltro['avaliados']:
+        log(f"🧹 Pré-filtro: {prefiltro['descartados']}/{prefiltro['avaliados']} notícias descartadas "
+              f"antes da IA ({prefiltro['descartados']} análises evitadas)")
+    uso_openai = estatisticas_openai()
+    if uso_openai['requisicoes']:
+        log(f"⚡ Cache de prefixo da OpenAI: {uso_openai['taxa_cache']:.0%} dos tokens de prompt "
+              f"({uso_openai['cached_tokens']}/{uso_openai['prompt_tokens']}), "
+              f"{uso_openai['com_cache']}/{uso_openai['requisicoes']} requisições com acerto")
+        if uso_openai['latencia_media_com_cache'] is not None and uso_openai['latencia_media_sem_cache'] is not None:
+            log(f"   Latência média: {uso_openai['latencia_media_com_cache']:.2f}s com acerto vs "
+                  f"{uso_openai['latencia_media_sem_cache']:.2f}s sem (~{uso_openai['economia_latencia_s']:.1f}s economizados)")
+    tokens_economizados, prompts_digest = estimar_economia_digest(obter_prompts_com_contexto())
+    if prompts_digest:
+        log(f"✂️ Digest de contexto: ~{tokens_economizados} tokens de prompt economizados em {prompts_digest} prompts")
+    entregas = agendador.metricas()
+    if entregas['entregas']:
+        log(f"⏱️ Primeiro email: {entregas['primeiro_email_s']:.1f}s | "
+              f"p50 de entrega: {entregas['p50_s']:.1f}s | "
+              f"último: {entregas['ultimo_email_s']:.1f}s")
+    log(f"👥 Grupos de carteira: {len(membros_grupo)} para {total_usuarios} usuários "
+          f"({len(conteudos_grupo)} conteúdos montados, {len(reaproveitados)} reaproveitados)")
+    log(f"⏱️ Tempo total: {time.monotonic() - inicio:.1f}s")
+    relatorio = gravar_relatorio()
+    if relatorio:
+        log(f"📈 Telemetria: {relatorio[0]} e {relatorio[1]}")
+    log("="*60)
+    log("✅ PROCESSAMENTO CONCLUÍDO!")
+    log("="*60 + "\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+"""
+Agendador de envios orientado a dependências.
+
+Cada usuário depende dos tickers que acompanha. Assim que todos eles
+ficam prontos na fase 1, o usuário é liberado para envio, sem esperar
+pelos demais tickers.
+"""
+import statistics
+import threading
+import time
+
+
+class AgendadorEnvios:
+    """
+    Acompanha as dependências (tickers) de cada usuário e libera
+    os usuários conforme os tickers ficam prontos.
+    """
+
+    def __init__(self, dependencias, inicio=None):
+        """
+        Args:
+            dependencias: Dicionário {chave: iterável de tickers}, onde a
+                chave identifica um usuário ou um grupo de usuários
+            inicio: Instante de referência (time.monotonic()) para as métricas
+        """
+        self._lock = threading.Lock()
+        self._inicio = inicio if inicio is not None else time.monotonic()
+        self._pendentes = {}
+        self._por_ticker = {}
+        self._prontos_iniciais = []
+        self._entregas = []
+
+        for usuario, tickers in dependencias.items():
+            tickers = set(tickers)
+            if not tickers:
+                self._prontos_iniciais.append(usuario)
+                continue
+            self._pendentes[usuario] = tickers
+            for ticker in tickers:
+                self._por_ticker.setdefault(ticker, []).append(usuario)
+
+    def liberar_sem_dependencias(self):
+        """
+        Retorna (uma única vez) os usuários que não dependem de nenhum ticker.
+        """
+        with self._lock:
+            prontos, self._prontos_iniciais = self._prontos_iniciais, []
+        return prontos
+
+    def marcar_pronto(self, ticker):
+        """
+        Marca um ticker como pronto.
+
+        Returns:
+            Lista de usuários cujas dependências ficaram todas prontas agora
+        """
+        liberados = []
+        with self._lock:
+            for usuario in self._por_ticker.pop(ticker, []):
+                pendentes = self._pendentes.get(usuario)
+                if pendentes is None:
+                    continue
+                pendentes.discard(ticker)
+                if not pendentes:
+                    del self._pendentes[usuario]
+                    liberados.append(usuario)
+        return liberados
+
+    def registrar_entrega(self):
+        """Registra o instante em que um email foi entregue."""
+        with self._lock:
+            self._entregas.append(time.monotonic() - self._inicio)
+
+    def metricas(self):
+        """
+        Retorna as métricas de entrega da execução.
+
+        Returns:
+            Dicionário com 'entregas', 'primeiro_email_s', 'p50_s' e 'ultimo_email_s'
+            (tempos em segundos desde o início, None se nada foi entregue)
+        """
+        with self._lock:
+            entregas = sorted(self._entregas)
+        if not entregas:
+            return {'entregas': 0, 'primeiro_email_s': None, 'p50_s': None, 'ultimo_email_s': None}
+        return {
+            'entregas': len(entregas),
+            'primeiro_email_s': entregas[0],
+            'p50_s': statistics.median(entregas),
+            'ultimo_email_s': entregas[-1],
+        }
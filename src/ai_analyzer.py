@@ -1,101 +1,365 @@
 """
 Módulo para análise de notícias usando OpenAI GPT.
 """
-import json
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from .openai_client import completar
+from .utils import estimar_tokens, extrair_json, log, log_erro
 from .config import (
-    OPENAI_API_KEY,
     OPENAI_MODEL,
     OPENAI_TEMPERATURE,
+    OPENAI_MAX_CONCORRENCIA,
+    ANALISE_LOTE_MAX_TOKENS,
+    ANALISE_LOTE_MAX_ARTIGOS,
     TOP_N_RELEVANTES
 )
 
+# Pool compartilhado entre tickers (criado sob demanda)
+_executor = None
+_executor_lock = threading.Lock()
+# Marca as threads do próprio pool (que chamam a API direto, sem reenfileirar)
+_local = threading.local()
 
-def analisar_com_gpt(artigos, ticker, contexto=None):
+# Prompts enviados com contexto, por ticker (para estimar a economia do digest)
+_prompts_com_contexto = Counter()
+
+
+def _obter_executor():
     """
-    Analisa lista de artigos usando OpenAI GPT, considerando o contexto estratégico.
+    Retorna o pool de threads compartilhado pelas chamadas de análise.
 
-    Args:
-        artigos: Lista de dicionários de artigos
-        ticker: Ticker sendo analisado
-        contexto: Texto com a tese estratégica da empresa
+    O mesmo pool atende todos os tickers, então OPENAI_MAX_CONCORRENCIA
+    limita o total de requisições em voo no processo inteiro.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(OPENAI_MAX_CONCORRENCIA, 1),
+                thread_name_prefix="gpt",
+                initializer=_marcar_thread_do_pool
+            )
+        return _executor
 
-    Returns:
-        Lista de dicionários com análises
+
+def _marcar_thread_do_pool():
+    _local.no_pool = True
+
+
+def _completar_no_pool(data, processar=None):
     """
-    if not artigos:
-        return []
+    Executa `completar` no pool compartilhado e espera o resultado.
 
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-    }
+    Usado pelas chamadas feitas nas threads dos tickers (resumo,
+    consolidação e síntese), para que também respeitem
+    OPENAI_MAX_CONCORRENCIA. Dentro do pool, chama direto.
+    """
+    if getattr(_local, "no_pool", False):
+        return completar(data, processar=processar)
+    return _obter_executor().submit(completar, data, processar).result()
 
-    contexto_str = f"\nCONTEXTO ESTRATÉGICO DA EMPRESA:\n{contexto}\n" if contexto else ""
-    analises = []
 
-    for artigo in artigos:
-        try:
-            body = artigo.get('body', '')[:3000] # Limite para evitar tokens excessivos
-            titulo = artigo.get('title', 'Sem título')
+def _contar_prompt_com_contexto(ticker, contexto):
+    """Contabiliza um prompt que leva o contexto (digest) do ticker."""
+    if contexto:
+        with _executor_lock:
+            _prompts_com_contexto[ticker] += 1
 
-            if not body:
-                continue
 
-            prompt = f"""
-Você é um analista sênior de ações da B3.
-Sua tarefa é analisar se a notícia abaixo é relevante para um investidor de {ticker}.
-{contexto_str}
-Analise a notícia considerando se ela impacta os KPIs ou a tese de investimento citada no contexto.
+def obter_prompts_com_contexto():
+    """
+    Retorna quantos prompts de triagem e consolidação levaram contexto, por ticker.
 
-Notícia:
-\"\"\"{body}\"\"\"
+    Returns:
+        Dicionário {ticker: número de prompts}
+    """
+    with _executor_lock:
+        return dict(_prompts_com_contexto)
+
+
+# Instruções fixas ficam no início da mensagem de sistema, seguidas da
+# empresa e do contexto; o conteúdo variável (notícias) vai por último,
+# na mensagem do usuário. A OpenAI só usa o cache de prefixo a partir de
+# 1024 tokens: instruções mais o digest (~200 tokens) ficam abaixo disso,
+# então a ordem não garante acerto de cache; a economia da triagem vem do
+# digest, e a taxa real de cache aparece no relatório da execução.
+_INSTRUCOES_ARTIGO = """Você é um analista sênior de ações da B3.
+Sua tarefa é analisar se a notícia enviada pelo usuário é relevante para um investidor da empresa indicada ao final destas instruções.
+Analise a notícia considerando se ela impacta os KPIs ou a tese de investimento citada no contexto.
 
 Responda EXCLUSIVAMENTE em JSON, no seguinte formato:
 
-{{
-  "relevante": true ou false (se é realmente impactante para a tese de {ticker}),
+{
+  "relevante": true ou false (se é realmente impactante para a tese da empresa),
   "relevancia_score": número de 0 a 10 (onde 10 é impacto crítico na tese e 0 é ruído),
-  "resumo": "resuma em 1-2 frases o impacto real para {ticker} baseado no contexto",
+  "resumo": "resuma em 1-2 frases o impacto real para a empresa baseado no contexto",
   "sentimento": número entre -1 e 1 (-1=muito negativo, 0=neutro, 1=muito positivo)
-}}
+}
 
-Não escreva nada fora do JSON.
-"""
+Não escreva nada fora do JSON."""
 
-            data = {
-                "model": OPENAI_MODEL,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": OPENAI_TEMPERATURE,
-            }
+_INSTRUCOES_LOTE = """Você é um analista sênior de ações da B3.
+Sua tarefa é analisar se cada uma das notícias enviadas pelo usuário é relevante para um investidor da empresa indicada ao final destas instruções.
+Analise cada notícia considerando se ela impacta os KPIs ou a tese de investimento citada no contexto.
 
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            response_json = response.json()
+Responda EXCLUSIVAMENTE com um array JSON contendo exatamente um objeto por notícia, no seguinte formato:
 
-            conteudo = response_json["choices"][0]["message"]["content"]
+[
+  {
+    "indice": número da notícia entre colchetes,
+    "relevante": true ou false (se é realmente impactante para a tese da empresa),
+    "relevancia_score": número de 0 a 10 (onde 10 é impacto crítico na tese e 0 é ruído),
+    "resumo": "resuma em 1-2 frases o impacto real para a empresa baseado no contexto",
+    "sentimento": número entre -1 e 1 (-1=muito negativo, 0=neutro, 1=muito positivo)
+  }
+]
 
-            # Remove markdown code blocks se existirem
-            conteudo = conteudo.strip()
-            if conteudo.startswith("```"):
-                conteudo = conteudo.split("```")[1]
-                if conteudo.startswith("json"):
-                    conteudo = conteudo[4:]
-                conteudo = conteudo.strip()
+Não escreva nada fora do JSON."""
 
-            resultado = json.loads(conteudo)
-            resultado['titulo'] = titulo
-            resultado['ticker'] = ticker
+_INSTRUCOES_RESUMO = """Você é um analista sênior de ações.
+Compile as notícias enviadas pelo usuário sobre a empresa indicada ao final destas instruções em um resumo executivo MUITO compacto de no máximo 2 linhas.
+Foque no que é realmente estrutural para a tese de investimento, ignorando ruídos passageiros.
 
-            analises.append(resultado)
+Responda apenas com o resumo de 2 linhas, sem formatação adicional."""
 
-        except Exception as e:
-            print(f"  ⚠ Erro ao analisar artigo '{titulo[:30]}...': {e}")
-            continue
+_INSTRUCOES_CONSOLIDADA = """Você é um analista sênior de ações.
+Consolide as notícias {tipo} enviadas pelo usuário sobre a empresa indicada ao final destas instruções em um único bloco coeso.
+
+Crie uma narrativa fluida (não liste bullet points) de até 10 linhas que:
+- Integre os pontos principais sem repetir informações similares
+- Destaque {foco} para a tese de investimento
+- Seja direta e informativa
+
+Responda apenas com o texto consolidado, sem título ou formatação."""
+
+_INSTRUCOES_SINTESE = """Você é um analista sênior de ações.
+A partir das notícias enviadas pelo usuário sobre a empresa indicada ao final destas instruções, produza três textos:
+
+- "resumo": resumo executivo MUITO compacto, de no máximo 2 linhas, cobrindo todas as notícias. Foque no que é realmente estrutural para a tese de investimento, ignorando ruídos passageiros.
+- "positivo": narrativa fluida (não liste bullet points) de até 10 linhas que consolide apenas as notícias marcadas como POSITIVA, integrando os pontos principais sem repetir informações similares e destacando o impacto real para a tese de investimento. Use "" se não houver notícias positivas.
+- "negativo": o mesmo para as notícias marcadas como NEGATIVA, destacando os riscos reais para a tese de investimento. Use "" se não houver notícias negativas.
+
+Responda EXCLUSIVAMENTE em JSON, no seguinte formato:
+
+{"resumo": "...", "positivo": "...", "negativo": "..."}
+
+Não escreva nada fora do JSON."""
+
+
+def _montar_mensagens(instrucoes, ticker, contexto, conteudo):
+    """
+    Monta as mensagens com a parte estável primeiro e a variável por último.
+
+    Args:
+        instrucoes: Instruções fixas da tarefa (iguais para todos os tickers)
+        ticker: Ticker da empresa
+        contexto: Tese (ou digest) da empresa, opcional
+        conteudo: Conteúdo variável (notícias)
+
+    Returns:
+        Lista de mensagens [system, user]
+    """
+    sistema = f"{instrucoes}\n\nEMPRESA: {ticker}"
+    if contexto:
+        sistema += f"\n\nCONTEXTO ESTRATÉGICO DA EMPRESA:\n{contexto}"
+    return [
+        {"role": "system", "content": sistema},
+        {"role": "user", "content": conteudo},
+    ]
+
+
+def _analisar_artigo(artigo, ticker, contexto):
+    """
+    Analisa um único artigo com o GPT.
+
+    Returns:
+        Dicionário com a análise ou None se o artigo foi ignorado ou falhou
+    """
+    titulo = artigo.get('title', 'Sem título')
+    try:
+        body = artigo.get('body', '')[:3000] # Limite para evitar tokens excessivos
+
+        if not body:
+            return None
+
+        noticia = f"Notícia:\n\"\"\"{body}\"\"\""
+
+        data = {
+            "model": OPENAI_MODEL,
+            "messages": _montar_mensagens(_INSTRUCOES_ARTIGO, ticker, contexto, noticia),
+            "temperature": OPENAI_TEMPERATURE,
+        }
+
+        _contar_prompt_com_contexto(ticker, contexto)
+        resultado = completar(data, processar=extrair_json)
+        resultado['titulo'] = titulo
+        resultado['ticker'] = ticker
+
+        return resultado
+
+    except Exception as e:
+        log_erro(f"  ⚠ Erro ao analisar artigo '{titulo[:30]}...': {e}")
+        return None
+
+
+def _montar_lotes(artigos, ticker, contexto):
+    """
+    Agrupa artigos em lotes respeitando o orçamento de tokens do prompt.
+
+    Returns:
+        Lista de lotes (cada lote é uma lista de artigos)
+    """
+    if ANALISE_LOTE_MAX_TOKENS <= 0 or ANALISE_LOTE_MAX_ARTIGOS <= 1:
+        return [[artigo] for artigo in artigos]
+
+    # Instruções + contexto são enviados uma única vez por lote
+    custo_fixo = estimar_tokens(contexto or "") + 300
+    lotes = []
+    lote_atual = []
+    custo_atual = custo_fixo
+
+    for artigo in artigos:
+        custo_artigo = estimar_tokens(artigo.get('body', '')[:3000]) + 20
+        lote_cheio = (
+            custo_atual + custo_artigo > ANALISE_LOTE_MAX_TOKENS
+            or len(lote_atual) >= ANALISE_LOTE_MAX_ARTIGOS
+        )
+        if lote_atual and lote_cheio:
+            lotes.append(lote_atual)
+            lote_atual = []
+            custo_atual = custo_fixo
+        lote_atual.append(artigo)
+        custo_atual += custo_artigo
+
+    if lote_atual:
+        lotes.append(lote_atual)
+    return lotes
+
+
+def _validar_lote(resultado, tamanho):
+    """
+    Confere se a resposta de um lote tem um veredito válido por notícia.
+
+    Returns:
+        Lista de vereditos ordenada por índice ou None se malformada
+    """
+    campos = ('relevante', 'relevancia_score', 'resumo', 'sentimento')
+    if not isinstance(resultado, list) or len(resultado) != tamanho:
+        return None
+
+    por_indice = {}
+    for item in resultado:
+        if not isinstance(item, dict) or any(c not in item for c in campos):
+            return None
+        indice = item.get('indice')
+        if type(indice) is not int or not 0 <= indice < tamanho or indice in por_indice:
+            return None
+        por_indice[indice] = {c: item[c] for c in campos}
+
+    return [por_indice[i] for i in range(tamanho)]
+
+
+def _analisar_lote(lote, ticker, contexto):
+    """
+    Analisa vários artigos do mesmo ticker em uma única requisição.
+
+    Se a resposta vier malformada, cai para uma chamada por artigo.
+
+    Returns:
+        Lista alinhada com o lote (análise ou None por artigo)
+    """
+    if len(lote) == 1:
+        return [_analisar_artigo(lote[0], ticker, contexto)]
+
+    try:
+        noticias_texto = f"{len(lote)} notícias:\n\n" + "\n\n".join(
+            f"Notícia [{i}]:\n\"\"\"{artigo.get('body', '')[:3000]}\"\"\""
+            for i, artigo in enumerate(lote)
+        )
+
+        data = {
+            "model": OPENAI_MODEL,
+            "messages": _montar_mensagens(_INSTRUCOES_LOTE, ticker, contexto, noticias_texto),
+            "temperature": OPENAI_TEMPERATURE,
+        }
+
+        def processar(conteudo):
+            vereditos = _validar_lote(extrair_json(conteudo), len(lote))
+            if vereditos is None:
+                raise ValueError("resposta do lote malformada")
+            return vereditos
+
+        _contar_prompt_com_contexto(ticker, contexto)
+        vereditos = completar(data, processar=processar)
+
+        resultados = []
+        for artigo, veredito in zip(lote, vereditos):
+            veredito['titulo'] = artigo.get('title', 'Sem título')
+            veredito['ticker'] = ticker
+            resultados.append(veredito)
+        return resultados
+
+    except Exception as e:
+        log_erro(f"  ⚠ {ticker}: lote de {len(lote)} artigos falhou ({e}), analisando individualmente")
+        return [_analisar_artigo(artigo, ticker, contexto) for artigo in lote]
+
+
+def analisar_artigos(artigos, ticker, contexto=None):
+    """
+    Analisa os artigos e devolve um resultado por artigo, na mesma ordem.
+
+    Os artigos são agrupados em lotes por orçamento de tokens
+    (ANALISE_LOTE_MAX_TOKENS) para que instruções e contexto sejam
+    enviados uma vez por lote. Os lotes são enviados em paralelo pelo
+    pool compartilhado (até OPENAI_MAX_CONCORRENCIA requisições
+    simultâneas).
+
+    Args:
+        artigos: Lista de dicionários de artigos
+        ticker: Ticker sendo analisado
+        contexto: Tese estratégica da empresa (de preferência o digest compacto)
 
-    print(f"  ✓ {ticker}: {len(analises)} artigos analisados")
-    return analises
+    Returns:
+        Lista alinhada com `artigos`: análise (dict) ou None para
+        artigos sem corpo ou cuja análise falhou
+    """
+    if not artigos:
+        return []
+
+    # Artigos sem corpo não são enviados ao GPT
+    indices_validos = [i for i, a in enumerate(artigos) if a.get('body', '')]
+    lotes = _montar_lotes([artigos[i] for i in indices_validos], ticker, contexto)
+
+    executor = _obter_executor()
+    futuros = [
+        executor.submit(_analisar_lote, lote, ticker, contexto)
+        for lote in lotes
+    ]
+
+    resultados = [None] * len(artigos)
+    analisados = (r for f in futuros for r in f.result())
+    for indice, resultado in zip(indices_validos, analisados):
+        resultados[indice] = resultado
+
+    total = sum(1 for r in resultados if r is not None)
+    log(f"  ✓ {ticker}: {total} artigos analisados em {len(lotes)} lote(s)")
+    return resultados
+
+
+def analisar_com_gpt(artigos, ticker, contexto=None):
+    """
+    Analisa lista de artigos usando OpenAI GPT, considerando o contexto estratégico.
+
+    Args:
+        artigos: Lista de dicionários de artigos
+        ticker: Ticker sendo analisado
+        contexto: Texto com a tese estratégica da empresa
+
+    Returns:
+        Lista de dicionários com análises
+    """
+    return [r for r in analisar_artigos(artigos, ticker, contexto) if r is not None]
 
 
 def filtrar_top_relevantes(analises, top_n=None):
@@ -141,12 +405,6 @@ def gerar_resumo_executivo(analises_agrupadas, contexto=None):
         por_ticker[ticker].append(analise.get('resumo', ''))
 
     resumos_executivos = {}
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-    }
-
     for ticker, resumos in por_ticker.items():
         try:
             noticias_texto = "\n".join([f"- {r}" for r in resumos if r])
@@ -154,35 +412,22 @@ def gerar_resumo_executivo(analises_agrupadas, contexto=None):
                 continue
 
             ctx_ticker = contexto.get(ticker, "") if contexto else ""
-            ctx_str = f"\nConsidere este contexto da empresa:\n{ctx_ticker}\n" if ctx_ticker else ""
-
-            prompt = f"""Você é um analista sênior de ações. 
-Compile as notícias abaixo sobre {ticker} em um resumo executivo MUITO compacto de no máximo 2 linhas.
-{ctx_str}
-Foque no que é realmente estrutural para a tese de investimento, ignorando ruídos passageiros.
-
-Notícias:
-{noticias_texto}
-
-Responda apenas com o resumo de 2 linhas, sem formatação adicional."""
 
             data = {
                 "model": OPENAI_MODEL,
-                "messages": [{"role": "user", "content": prompt}],
+                "messages": _montar_mensagens(
+                    _INSTRUCOES_RESUMO, ticker, ctx_ticker, f"Notícias:\n{noticias_texto}"
+                ),
                 "temperature": OPENAI_TEMPERATURE,
             }
 
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            response_json = response.json()
-
-            resumo = response_json["choices"][0]["message"]["content"].strip()
+            resumo = _completar_no_pool(data)
             resumos_executivos[ticker] = resumo
 
-            print(f"  ✓ Resumo executivo gerado para {ticker}")
+            log(f"  ✓ Resumo executivo gerado para {ticker}")
 
         except Exception as e:
-            print(f"  ⚠ Erro ao gerar resumo executivo de {ticker}: {e}")
+            log_erro(f"  ⚠ Erro ao gerar resumo executivo de {ticker}: {e}")
             resumos_executivos[ticker] = "Resumo não disponível."
 
     return resumos_executivos
@@ -194,7 +439,7 @@ def gerar_analise_consolidada(analises_por_ticker, contexto=None):
     
     Args:
         analises_por_ticker: Dict {ticker: [lista_de_analises]}
-        contexto: Dict {ticker: contexto_texto}
+        contexto: Dict {ticker: contexto_texto} (o digest compacto basta)
     
     Returns:
         Dict {ticker: {'positivo': str, 'negativo': str}}
@@ -202,12 +447,6 @@ def gerar_analise_consolidada(analises_por_ticker, contexto=None):
     if not analises_por_ticker:
         return {}
     
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-    }
-    
     analises_consolidadas = {}
     
     for ticker, analises in analises_por_ticker.items():
@@ -220,7 +459,6 @@ def gerar_analise_consolidada(analises_por_ticker, contexto=None):
             negativas = [a for a in analises if a.get('sentimento', 0) < 0]
             
             ctx_ticker = contexto.get(ticker, "") if contexto else ""
-            ctx_str = f"\nContexto da empresa:\n{ctx_ticker}\n" if ctx_ticker else ""
             
             resultado = {'positivo': '', 'negativo': ''}
             
@@ -231,28 +469,17 @@ def gerar_analise_consolidada(analises_por_ticker, contexto=None):
                     for a in positivas
                 ])
                 
-                prompt = f"""Você é um analista sênior de ações.
-Consolide as notícias POSITIVAS abaixo sobre {ticker} em um único bloco coeso.
-{ctx_str}
-Crie uma narrativa fluida (não liste bullet points) de até 10 linhas que:
-- Integre os pontos principais sem repetir informações similares
-- Destaque o impacto real para a tese de investimento
-- Seja direta e informativa
-
-Notícias:
-{noticias_texto}
-
-Responda apenas com o texto consolidado, sem título ou formatação."""
-
+                instrucoes = _INSTRUCOES_CONSOLIDADA.format(tipo="POSITIVAS", foco="o impacto real")
                 data = {
                     "model": OPENAI_MODEL,
-                    "messages": [{"role": "user", "content": prompt}],
+                    "messages": _montar_mensagens(
+                        instrucoes, ticker, ctx_ticker, f"Notícias:\n{noticias_texto}"
+                    ),
                     "temperature": OPENAI_TEMPERATURE,
                 }
                 
-                response = requests.post(url, headers=headers, json=data)
-                response.raise_for_status()
-                resultado['positivo'] = response.json()["choices"][0]["message"]["content"].strip()
+                _contar_prompt_com_contexto(ticker, ctx_ticker)
+                resultado['positivo'] = _completar_no_pool(data)
             
             # Consolidar notícias negativas
             if negativas:
@@ -261,35 +488,97 @@ Responda apenas com o texto consolidado, sem título ou formatação."""
                     for a in negativas
                 ])
                 
-                prompt = f"""Você é um analista sênior de ações.
-Consolide as notícias NEGATIVAS abaixo sobre {ticker} em um único bloco coeso.
-{ctx_str}
-Crie uma narrativa fluida (não liste bullet points) de até 10 linhas que:
-- Integre os pontos principais sem repetir informações similares
-- Destaque os riscos reais para a tese de investimento
-- Seja direta e informativa
-
-Notícias:
-{noticias_texto}
-
-Responda apenas com o texto consolidado, sem título ou formatação."""
-
+                instrucoes = _INSTRUCOES_CONSOLIDADA.format(tipo="NEGATIVAS", foco="os riscos reais")
                 data = {
                     "model": OPENAI_MODEL,
-                    "messages": [{"role": "user", "content": prompt}],
+                    "messages": _montar_mensagens(
+                        instrucoes, ticker, ctx_ticker, f"Notícias:\n{noticias_texto}"
+                    ),
                     "temperature": OPENAI_TEMPERATURE,
                 }
                 
-                response = requests.post(url, headers=headers, json=data)
-                response.raise_for_status()
-                resultado['negativo'] = response.json()["choices"][0]["message"]["content"].strip()
+                _contar_prompt_com_contexto(ticker, ctx_ticker)
+                resultado['negativo'] = _completar_no_pool(data)
             
             if resultado['positivo'] or resultado['negativo']:
                 analises_consolidadas[ticker] = resultado
-                print(f"  ✓ Análise consolidada gerada para {ticker}")
+                log(f"  ✓ Análise consolidada gerada para {ticker}")
         
         except Exception as e:
-            print(f"  ⚠ Erro ao gerar análise consolidada de {ticker}: {e}")
+            log_erro(f"  ⚠ Erro ao gerar análise consolidada de {ticker}: {e}")
             continue
     
     return analises_consolidadas
+
+
+def _validar_sintese(conteudo):
+    """Confere se a síntese tem 'resumo', 'positivo' e 'negativo' como textos."""
+    sintese = extrair_json(conteudo)
+    campos = ('resumo', 'positivo', 'negativo')
+    if not isinstance(sintese, dict) or any(not isinstance(sintese.get(c), str) for c in campos):
+        raise ValueError("síntese malformada")
+    return {c: sintese[c].strip() for c in campos}
+
+
+def gerar_sintese_ticker(ticker, analises, contexto=None, contexto_curto=None):
+    """
+    Gera resumo executivo e análise consolidada do ticker em uma única requisição.
+
+    Se a resposta vier malformada ou a chamada falhar, usa as funções
+    separadas (gerar_resumo_executivo e gerar_analise_consolidada).
+
+    Args:
+        ticker: Ticker analisado
+        analises: Lista de análises filtradas (top relevantes) do ticker
+        contexto: Texto com a tese estratégica da empresa
+        contexto_curto: Digest da tese, usado na consolidação do fallback
+            (como no caminho sem síntese unificada); se omitido, usa `contexto`
+
+    Returns:
+        Tupla (resumo, consolidado): o texto do resumo executivo e o dicionário
+        {'positivo': str, 'negativo': str}, ou None se ambos ficarem vazios
+    """
+    if not analises:
+        return "", None
+
+    positivas = [a for a in analises if a.get('sentimento', 0) > 0]
+    negativas = [a for a in analises if a.get('sentimento', 0) < 0]
+
+    def rotulo(analise):
+        if analise.get('sentimento', 0) > 0:
+            return "POSITIVA"
+        if analise.get('sentimento', 0) < 0:
+            return "NEGATIVA"
+        return "NEUTRA"
+
+    try:
+        noticias_texto = "\n".join(
+            f"- [{rotulo(a)}] {a.get('titulo', '')}: {a.get('resumo', '')}" for a in analises
+        )
+
+        data = {
+            "model": OPENAI_MODEL,
+            "messages": _montar_mensagens(
+                _INSTRUCOES_SINTESE, ticker, contexto, f"Notícias:\n{noticias_texto}"
+            ),
+            "temperature": OPENAI_TEMPERATURE,
+        }
+
+        sintese = _completar_no_pool(data, processar=_validar_sintese)
+
+        # Blocos sem notícias do sentimento correspondente ficam vazios
+        consolidado = {
+            'positivo': sintese['positivo'] if positivas else '',
+            'negativo': sintese['negativo'] if negativas else '',
+        }
+        log(f"  ✓ Resumo executivo e análise consolidada gerados para {ticker}")
+        return sintese['resumo'], consolidado if consolidado['positivo'] or consolidado['negativo'] else None
+
+    except Exception as e:
+        log_erro(f"  ⚠ {ticker}: síntese unificada falhou ({e}), gerando resumo e consolidação separadamente")
+        resumo = gerar_resumo_executivo(analises, {ticker: contexto} if contexto else None).get(ticker, "")
+        contexto_consolidacao = contexto_curto or contexto
+        consolidado = gerar_analise_consolidada(
+            {ticker: analises}, {ticker: contexto_consolidacao} if contexto_consolidacao else None
+        ).get(ticker)
+        return resumo, consolidado
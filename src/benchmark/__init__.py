@@ -0,0 +1,10 @@
+"""
+Benchmark offline do pipeline completo.
+
+Roda main.main() de ponta a ponta contra substitutos locais de todos os
+serviços externos (OpenAI, Event Registry, yfinance, SMTP e Google
+Sheets) e mede tempo, chamadas por etapa, memória e emails por segundo.
+
+Uso:
+    python -m src.benchmark --usuarios 100,1000,10000,50000 --tickers 10,50,200,500
+"""
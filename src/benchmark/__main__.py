@@ -0,0 +1,194 @@
+"""
+Runner do benchmark: sobe os servidores falsos, executa cada cenário
+(usuários x tickers) em um subprocesso e consolida as métricas.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from ..utils import log, log_erro
+from .fontes_falsas import gerar_usuarios_csv, universo_tickers
+from .servidor_openai import ServidorOpenAIFalso
+from .servidor_smtp import ServidorSMTPFalso
+
+RAIZ_PROJETO = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+COLUNAS_RELATORIO = [
+    'usuarios', 'tickers', 'parede_s', 'emails', 'emails_por_s', 'rss_pico_mb',
+    'chamadas_openai', 'erros_openai', 'respostas_429', 'consultas_noticias', 'downloads_precos',
+    'historicos_precos', 'conexoes_smtp', 'chamadas_por_etapa', 'codigo_saida',
+]
+
+
+def _lista_inteiros(valor):
+    return [int(v) for v in valor.split(",") if v.strip()]
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline do TradingCore.")
+    parser.add_argument("--usuarios", type=_lista_inteiros, default=[100, 1000, 10000, 50000],
+                        help="Quantidades de usuários, separadas por vírgula")
+    parser.add_argument("--tickers", type=_lista_inteiros, default=[10, 50, 200, 500],
+                        help="Tamanhos do universo de tickers, separados por vírgula")
+    parser.add_argument("--artigos-por-ticker", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=200, help="Latência média da OpenAI falsa")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="Fração de respostas 500 da OpenAI falsa")
+    parser.add_argument("--limite-rpm", type=int, default=0, help="Rate limit de requisições/min da OpenAI falsa")
+    parser.add_argument("--limite-tpm", type=int, default=0, help="Rate limit de tokens/min da OpenAI falsa")
+    parser.add_argument("--env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="Variável de ambiente extra para os cenários (pode repetir)")
+    parser.add_argument("--saida", default=os.path.join(RAIZ_PROJETO, ".cache", "benchmark"),
+                        help="Diretório de trabalho e relatórios")
+    return parser.parse_args(argv)
+
+
+def _ambiente_cenario(diretorio, servidor_openai, servidor_smtp, extras):
+    """Variáveis de ambiente que apontam o pipeline para os substitutos locais."""
+    ambiente = dict(os.environ)
+    ambiente.update({
+        'OPENAI_API_KEY': 'benchmark',
+        'OPENAI_BASE_URL': servidor_openai.url_base,
+        'EVENT_REGISTRY_API_KEY': 'benchmark',
+        'REMETENTE_EMAIL': 'benchmark@benchmark.local',
+        'REMETENTE_SENHA': 'benchmark',
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(servidor_smtp.porta),
+        'SMTP_SSL': 'false',
+        'SHEET_ID': 'benchmark',
+        'CACHE_DIR': os.path.join(diretorio, 'cache'),
+        'CONTEXTO_DB_PATH': os.path.join(diretorio, 'contextos.sqlite3'),
+        'PYTHONIOENCODING': 'utf-8',
+    })
+    for item in extras:
+        chave, _, valor = item.partition("=")
+        ambiente[chave] = valor
+    return ambiente
+
+
+def executar_cenario(usuarios, tickers, args, servidor_openai, servidor_smtp):
+    """
+    Executa um cenário em um subprocesso isolado.
+
+    Returns:
+        Dicionário com as métricas do cenário (colunas de COLUNAS_RELATORIO)
+    """
+    diretorio = os.path.join(args.saida, f"u{usuarios}_t{tickers}")
+    os.makedirs(diretorio, exist_ok=True)
+    usuarios_csv = os.path.join(diretorio, "usuarios.csv")
+    metricas_json = os.path.join(diretorio, "metricas.json")
+    if os.path.exists(metricas_json):
+        os.remove(metricas_json)
+    gerar_usuarios_csv(usuarios_csv, usuarios, universo_tickers(tickers))
+
+    servidor_openai.reiniciar_contadores()
+    servidor_smtp.reiniciar_contadores()
+
+    log(f"▶ Cenário: {usuarios} usuários x {tickers} tickers...", flush=True)
+    with open(os.path.join(diretorio, "execucao.log"), "w", encoding="utf-8") as saida_log:
+        processo = subprocess.run(
+            [
+                sys.executable, "-m", "src.benchmark.cenario",
+                "--usuarios-csv", usuarios_csv,
+                "--tickers", str(tickers),
+                "--artigos-por-ticker", str(args.artigos_por_ticker),
+                "--saida", metricas_json,
+            ],
+            cwd=RAIZ_PROJETO,
+            env=_ambiente_cenario(diretorio, servidor_openai, servidor_smtp, args.env),
+            stdout=saida_log,
+            stderr=subprocess.STDOUT,
+        )
+
+    metricas = {}
+    if os.path.exists(metricas_json):
+        with open(metricas_json, encoding="utf-8") as f:
+            metricas = json.load(f)
+    else:
+        log_erro(f"  ✗ Cenário falhou (código {processo.returncode}); veja {diretorio}/execucao.log")
+
+    parede = metricas.get('parede_s')
+    emails = servidor_smtp.mensagens
+    return {
+        'usuarios': usuarios,
+        'tickers': tickers,
+        'parede_s': round(parede, 2) if parede else None,
+        'emails': emails,
+        'emails_por_s': round(emails / parede, 1) if parede else None,
+        'rss_pico_mb': round(metricas['rss_pico_mb'], 1) if 'rss_pico_mb' in metricas else None,
+        'chamadas_openai': sum(servidor_openai.chamadas.values()),
+        'erros_openai': servidor_openai.erros,
+        'respostas_429': servidor_openai.limitadas,
+        'consultas_noticias': metricas.get('consultas_noticias'),
+        'downloads_precos': metricas.get('downloads_precos'),
+        'historicos_precos': metricas.get('historicos_precos'),
+        'conexoes_smtp': servidor_smtp.conexoes,
+        'chamadas_por_etapa': dict(sorted(servidor_openai.chamadas.items())),
+        'codigo_saida': processo.returncode,
+    }
+
+
+def imprimir_tabela(resultados):
+    """Imprime o resumo dos cenários no console."""
+    log("\n" + "=" * 96)
+    log("📊 RESULTADOS DO BENCHMARK")
+    log("=" * 96)
+    log(f"{'usuários':>9} {'tickers':>8} {'tempo(s)':>9} {'emails':>7} {'emails/s':>9} "
+          f"{'RSS(MB)':>8} {'OpenAI':>7} {'notícias':>9}  etapas")
+    for r in resultados:
+        def fmt(valor):
+            return "-" if valor is None else valor
+        etapas = ", ".join(f"{k}={v}" for k, v in r['chamadas_por_etapa'].items())
+        log(f"{r['usuarios']:>9} {r['tickers']:>8} {fmt(r['parede_s']):>9} {r['emails']:>7} "
+              f"{fmt(r['emails_por_s']):>9} {fmt(r['rss_pico_mb']):>8} {r['chamadas_openai']:>7} "
+              f"{fmt(r['consultas_noticias']):>9}  {etapas}")
+    log("=" * 96)
+
+
+def salvar_relatorios(resultados, diretorio):
+    """Grava os resultados em JSON e CSV."""
+    carimbo = time.strftime("%Y%m%d-%H%M%S")
+    caminho_json = os.path.join(diretorio, f"resultados-{carimbo}.json")
+    caminho_csv = os.path.join(diretorio, f"resultados-{carimbo}.csv")
+
+    with open(caminho_json, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+    with open(caminho_csv, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS_RELATORIO)
+        escritor.writeheader()
+        for r in resultados:
+            escritor.writerow({**r, 'chamadas_por_etapa': json.dumps(r['chamadas_por_etapa'])})
+
+    log(f"✓ Relatórios: {caminho_json} e {caminho_csv}")
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    os.makedirs(args.saida, exist_ok=True)
+
+    servidor_openai = ServidorOpenAIFalso(
+        args.latencia_ms, args.taxa_erro, limite_rpm=args.limite_rpm, limite_tpm=args.limite_tpm
+    ).iniciar()
+    servidor_smtp = ServidorSMTPFalso().iniciar()
+    log(f"✓ OpenAI falsa em {servidor_openai.url_base} "
+          f"(latência {args.latencia_ms:g}ms, erro {args.taxa_erro:.0%})")
+    log(f"✓ SMTP local na porta {servidor_smtp.porta}")
+
+    resultados = []
+    try:
+        for tickers in args.tickers:
+            for usuarios in args.usuarios:
+                resultados.append(executar_cenario(usuarios, tickers, args, servidor_openai, servidor_smtp))
+    finally:
+        servidor_openai.parar()
+        servidor_smtp.parar()
+
+    imprimir_tabela(resultados)
+    salvar_relatorios(resultados, args.saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Executa um cenário do benchmark: roda main.main() de ponta a ponta com as
+fontes falsas instaladas e grava as métricas do processo em JSON.
+
+Chamado pelo runner (python -m src.benchmark) em um subprocesso por
+cenário, com as variáveis de ambiente já apontando para os servidores
+falsos de OpenAI e SMTP.
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+
+
+def _rss_pico_mb():
+    """Pico de memória residente do processo, em MB."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa um cenário do benchmark.")
+    parser.add_argument("--usuarios-csv", required=True)
+    parser.add_argument("--tickers", type=int, required=True)
+    parser.add_argument("--artigos-por-ticker", type=int, default=20)
+    parser.add_argument("--saida", required=True, help="Arquivo JSON com as métricas")
+    args = parser.parse_args(argv)
+
+    from . import fontes_falsas
+    from .. import news_fetcher, price_fetcher
+    import main as pipeline
+
+    fontes_falsas.configurar_noticias(
+        fontes_falsas.FabricaArtigos(fontes_falsas.universo_tickers(args.tickers), args.artigos_por_ticker)
+    )
+    news_fetcher.EventRegistry = fontes_falsas.EventRegistryFalso
+    news_fetcher.QueryArticlesIter = fontes_falsas.QueryArticlesIterFalso
+    price_fetcher.yf = fontes_falsas.YFinanceFalso
+    pipeline.carregar_usuarios_sheets = lambda: fontes_falsas.carregar_usuarios_csv(args.usuarios_csv)
+
+    inicio = time.perf_counter()
+    pipeline.main([])
+    parede = time.perf_counter() - inicio
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump({
+            'parede_s': parede,
+            'rss_pico_mb': _rss_pico_mb(),
+            **fontes_falsas.contadores,
+        }, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Fontes de dados falsas para o benchmark: Event Registry, yfinance e a
+lista de usuários em CSV no lugar do Google Sheets.
+
+Tudo é determinístico (semente fixa), então dois cenários com os mesmos
+parâmetros recebem exatamente os mesmos dados.
+"""
+import csv
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from ..utils import log
+from ..sheets_client import COLUNAS_USUARIO
+
+# Vocabulário de preenchimento dos corpos das notícias
+_VOCABULARIO = (
+    "receita lucro margem guidance dividendos investimento produção vendas demanda custos "
+    "câmbio juros inflação crédito inadimplência regulação governo aquisição fusão expansão "
+    "mercado analistas recomendação resultado trimestre balanço dívida caixa capex consumo "
+    "exportação importação contrato licitação tarifa reajuste sindicato greve fábrica logística"
+).split()
+
+_lock = threading.Lock()
+contadores = {'consultas_noticias': 0, 'artigos_entregues': 0, 'downloads_precos': 0, 'historicos_precos': 0}
+
+
+def codigo_ticker(indice):
+    """Código de ticker sintético no formato da B3 (ex: 'AAAB3')."""
+    letras = "".join(chr(65 + (indice // 26 ** k) % 26) for k in range(3, -1, -1))
+    return f"{letras}3"
+
+
+def universo_tickers(quantidade):
+    """Lista com os `quantidade` primeiros tickers sintéticos."""
+    return [codigo_ticker(i) for i in range(quantidade)]
+
+
+def _contar(chave, valor=1):
+    with _lock:
+        contadores[chave] += valor
+
+
+# ============================================================
+# Event Registry
+# ============================================================
+
+class FabricaArtigos:
+    """
+    Gera as notícias de cada ticker: a maioria sobre a empresa, algumas
+    cópias quase idênticas (republicações) e alguns artigos-lista.
+    """
+
+    def __init__(self, tickers, artigos_por_ticker=20, fracao_copias=0.2, fracao_listas=0.1, semente=7):
+        self.tickers = list(tickers)
+        self.artigos_por_ticker = artigos_por_ticker
+        self.fracao_copias = fracao_copias
+        self.fracao_listas = fracao_listas
+        self.semente = semente
+        self._agora = datetime.now(timezone.utc).replace(microsecond=0)
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def artigos(self, ticker):
+        """Notícias do ticker, das mais recentes para as mais antigas."""
+        with self._cache_lock:
+            if ticker not in self._cache:
+                self._cache[ticker] = self._gerar(ticker)
+            return self._cache[ticker]
+
+    def _gerar(self, ticker):
+        aleatorio = random.Random(f"{self.semente}-{ticker}")
+        artigos = []
+        for i in range(self.artigos_por_ticker):
+            sorteio = aleatorio.random()
+            if artigos and sorteio < self.fracao_copias:
+                # Republicação com pequena edição
+                original = aleatorio.choice(artigos)
+                corpo = original['body'].replace(" mercado ", " mercado local ", 1) + " Fonte: agência."
+                titulo = original['title']
+            elif sorteio < self.fracao_copias + self.fracao_listas:
+                citados = aleatorio.sample(self.tickers, min(10, len(self.tickers)))
+                linhas = [f"{t} {aleatorio.uniform(-5, 5):+.2f}%" for t in set(citados) | {ticker}]
+                corpo = "Fechamento do mercado. Destaques do dia: " + ", ".join(linhas) + "."
+                titulo = "Fechamento: Ibovespa e destaques do pregão"
+            else:
+                palavras = [aleatorio.choice(_VOCABULARIO) for _ in range(300)]
+                for posicao in aleatorio.sample(range(300), 6):
+                    palavras[posicao] = ticker
+                corpo = " ".join(palavras)
+                titulo = f"{ticker}: {' '.join(aleatorio.sample(_VOCABULARIO, 5))}"
+
+            data = self._agora - timedelta(minutes=15 * i + aleatorio.randint(0, 14))
+            artigos.append({
+                'uri': f"bench-{ticker}-{i}",
+                'url': f"https://noticias.benchmark.local/{ticker}/{i}",
+                'title': titulo,
+                'body': corpo,
+                'dateTime': data.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'source': {'title': 'Benchmark'},
+            })
+        return artigos
+
+
+_fabrica = None
+
+
+def configurar_noticias(fabrica):
+    """Define a fábrica usada pelas consultas falsas."""
+    global _fabrica
+    _fabrica = fabrica
+
+
+class EventRegistryFalso:
+    """Substituto de eventregistry.EventRegistry (não faz rede)."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class QueryArticlesIterFalso:
+    """Substituto de eventregistry.QueryArticlesIter para as consultas do news_fetcher."""
+
+    def __init__(self, tickers):
+        self.tickers = tickers
+
+    @classmethod
+    def initWithComplexQuery(cls, query):
+        condicao = query["$query"]["$and"][0]
+        if "$or" in condicao:
+            return cls([c["keyword"] for c in condicao["$or"]])
+        return cls([condicao["keyword"]])
+
+    def execQuery(self, er, maxItems=100, sortBy=None, sortByAsc=True, **kwargs):
+        _contar('consultas_noticias')
+        vistos = set()
+        artigos = []
+        for ticker in self.tickers:
+            for artigo in _fabrica.artigos(ticker):
+                if artigo['uri'] not in vistos:
+                    vistos.add(artigo['uri'])
+                    artigos.append(artigo)
+        artigos.sort(key=lambda a: a['dateTime'], reverse=True)
+        for artigo in artigos[:maxItems]:
+            _contar('artigos_entregues')
+            yield artigo
+
+
+# ============================================================
+# yfinance
+# ============================================================
+
+def _fechamentos(simbolo, dias=5):
+    aleatorio = random.Random(f"preco-{simbolo}")
+    preco = aleatorio.uniform(5, 100)
+    valores = []
+    for _ in range(dias):
+        preco *= 1 + aleatorio.uniform(-0.03, 0.03)
+        valores.append(round(preco, 2))
+    return valores
+
+
+def _datas(dias=5):
+    hoje = pd.Timestamp.now().normalize()
+    return pd.bdate_range(end=hoje, periods=dias)
+
+
+class _TickerFalso:
+    def __init__(self, simbolo):
+        self.simbolo = simbolo
+
+    def history(self, period="5d", **kwargs):
+        _contar('historicos_precos')
+        return pd.DataFrame({'Close': _fechamentos(self.simbolo)}, index=_datas())
+
+
+class YFinanceFalso:
+    """Substituto do módulo yfinance com download() e Ticker()."""
+
+    Ticker = _TickerFalso
+
+    @staticmethod
+    def download(simbolos, period="5d", group_by="column", **kwargs):
+        _contar('downloads_precos')
+        if isinstance(simbolos, str):
+            simbolos = simbolos.split()
+        colunas = pd.MultiIndex.from_product([['Close'], simbolos])
+        valores = list(zip(*[_fechamentos(s) for s in simbolos]))
+        return pd.DataFrame(valores, index=_datas(), columns=colunas)
+
+
+# ============================================================
+# Usuários
+# ============================================================
+
+def gerar_usuarios_csv(caminho, usuarios, tickers, semente=11, max_tickers_por_usuario=5):
+    """
+    Grava um CSV com as colunas da planilha de usuários.
+
+    A popularidade dos tickers segue uma distribuição de Zipf, como na
+    base real: poucos tickers concentram a maioria dos usuários.
+    """
+    aleatorio = random.Random(semente)
+    pesos = [1 / (posicao + 1) for posicao in range(len(tickers))]
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUNAS_USUARIO)
+        for i in range(usuarios):
+            quantidade = aleatorio.randint(1, min(max_tickers_por_usuario, len(tickers)))
+            carteira = list(dict.fromkeys(aleatorio.choices(tickers, weights=pesos, k=quantidade)))
+            escritor.writerow([f"Usuário {i}", f"usuario{i}@benchmark.local", ", ".join(carteira)])
+
+
+def carregar_usuarios_csv(caminho):
+    """Lê o CSV de usuários no mesmo formato devolvido por carregar_usuarios_sheets."""
+    df = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+    log(f"✓ Carregados {len(df)} usuários do CSV {caminho}")
+    return df
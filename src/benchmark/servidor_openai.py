@@ -0,0 +1,272 @@
+"""
+Servidor HTTP falso compatível com o endpoint de chat completions da OpenAI.
+
+Responde cada prompt no formato que o pipeline espera (triagem, lote,
+digest, síntese, texto livre), com latência e taxa de erro configuráveis,
+e conta as requisições por etapa. O bloco `usage` simula o cache de
+prefixo: a partir da segunda vez que a mesma mensagem de sistema aparece,
+seus tokens contam como cache, desde que ela tenha ao menos
+MIN_TOKENS_CACHE tokens (abaixo disso a OpenAI não usa cache).
+
+Com limites de RPM/TPM, imita o rate limit da OpenAI: saldo reposto
+continuamente (o limite inteiro a cada 60s), cabeçalhos x-ratelimit-*
+em toda resposta e 429 com Retry-After quando o saldo acaba.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PADRAO_NOTICIA_LOTE = re.compile(r"Notícia \[(\d+)\]")
+
+# Cache de prefixo da OpenAI: mínimo de 1024 tokens, em blocos de 128
+MIN_TOKENS_CACHE = 1024
+BLOCO_TOKENS_CACHE = 128
+
+
+def tokens_em_cache(tokens_prefixo):
+    """
+    Tokens de um prefixo repetido que a OpenAI atende do cache.
+
+    Returns:
+        0 abaixo de MIN_TOKENS_CACHE; acima, o prefixo arredondado para
+        baixo em blocos de BLOCO_TOKENS_CACHE
+    """
+    if tokens_prefixo < MIN_TOKENS_CACHE:
+        return 0
+    excedente = tokens_prefixo - MIN_TOKENS_CACHE
+    return MIN_TOKENS_CACHE + excedente // BLOCO_TOKENS_CACHE * BLOCO_TOKENS_CACHE
+
+
+def classificar_prompt(mensagens):
+    """
+    Identifica a etapa do pipeline a partir das mensagens.
+
+    Returns:
+        Nome da etapa ('contexto', 'digest', 'triagem', 'triagem_lote',
+        'sintese', 'resumo', 'consolidada' ou 'outros')
+    """
+    sistema = " ".join(m.get("content", "") for m in mensagens if m.get("role") == "system")
+    usuario = " ".join(m.get("content", "") for m in mensagens if m.get("role") == "user")
+
+    if "Equity Research" in usuario:
+        return "contexto"
+    if '"kpis"' in usuario:
+        return "digest"
+    if _PADRAO_NOTICIA_LOTE.search(usuario):
+        return "triagem_lote"
+    if '"relevancia_score"' in sistema:
+        return "triagem"
+    if '"positivo"' in sistema:
+        return "sintese"
+    if "resumo executivo" in sistema:
+        return "resumo"
+    if "Consolide as notícias" in sistema:
+        return "consolidada"
+    return "outros"
+
+
+def _veredito(semente, indice=None):
+    """Veredito de triagem determinístico para o texto informado."""
+    valor = int(hashlib.sha256(semente.encode("utf-8")).hexdigest()[:8], 16)
+    score = valor % 11
+    veredito = {
+        "relevante": score >= 4,
+        "relevancia_score": score,
+        "resumo": f"Impacto estimado {score}/10 para a tese.",
+        "sentimento": round(((valor >> 8) % 201 - 100) / 100, 2),
+    }
+    if indice is not None:
+        veredito = {"indice": indice, **veredito}
+    return veredito
+
+
+def gerar_resposta(etapa, mensagens):
+    """Gera o conteúdo da resposta no formato esperado pela etapa."""
+    usuario = " ".join(m.get("content", "") for m in mensagens if m.get("role") == "user")
+
+    if etapa == "contexto":
+        return (
+            "1. MODELO DE NEGÓCIO: receita recorrente e diversificada.\n"
+            "2. KPIs CHAVE: margem, volume, câmbio, Selic.\n"
+            "3. TESES DE INVESTIMENTO: dividendos e crescimento moderado.\n"
+            "4. RISCOS PRINCIPAIS: regulação, ciclo econômico, concorrência.\n"
+            "5. O QUE BUSCAR EM NOTÍCIAS: resultados, guidance, M&A; ignorar oscilações diárias."
+        )
+    if etapa == "digest":
+        return json.dumps({
+            "kpis": ["margem operacional", "volume vendido", "câmbio"],
+            "drivers": ["dividendos", "Selic"],
+            "riscos": ["regulação", "concorrência"],
+            "ruido": ["oscilação diária da ação"],
+        }, ensure_ascii=False)
+    if etapa == "triagem_lote":
+        partes = re.split(r"Notícia \[\d+\]:", usuario)[1:]
+        return json.dumps([_veredito(parte, i) for i, parte in enumerate(partes)], ensure_ascii=False)
+    if etapa == "triagem":
+        return json.dumps(_veredito(usuario), ensure_ascii=False)
+    if etapa == "sintese":
+        return json.dumps({
+            "resumo": "Notícias do dia reforçam a tese, com riscos pontuais.",
+            "positivo": "Resultados e guidance apontam para melhora operacional.",
+            "negativo": "Pressão regulatória segue como principal risco.",
+        }, ensure_ascii=False)
+    return "Texto consolidado de teste para o benchmark."
+
+
+class ServidorOpenAIFalso:
+    """
+    Servidor de chat completions em uma thread própria.
+
+    Args:
+        latencia_ms: Latência média de cada resposta
+        taxa_erro: Fração das requisições respondidas com 500/429
+        semente: Semente do gerador de erros e jitter
+        limite_rpm: Requisições por minuto antes do 429 (0 = sem limite)
+        limite_tpm: Tokens por minuto antes do 429 (0 = sem limite)
+    """
+
+    def __init__(self, latencia_ms=200, taxa_erro=0.0, semente=42, limite_rpm=0, limite_tpm=0):
+        self.latencia_ms = latencia_ms
+        self.taxa_erro = taxa_erro
+        self.limite_rpm = limite_rpm
+        self.limite_tpm = limite_tpm
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._prefixos = set()
+        self._saldos = {'requests': float(limite_rpm), 'tokens': float(limite_tpm)}
+        self._saldos_em = time.monotonic()
+        self.chamadas = Counter()
+        self.erros = 0
+        self.limitadas = 0
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._criar_handler())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url_base(self):
+        """URL para OPENAI_BASE_URL."""
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/v1"
+
+    def _consumir_limite(self, tokens):
+        """
+        Debita a requisição dos saldos de requisições e tokens, se couber.
+
+        Returns:
+            Tupla (aceita, cabeçalhos x-ratelimit-*, segundos até liberar)
+        """
+        limites = {'requests': self.limite_rpm, 'tokens': self.limite_tpm}
+        custos = {'requests': 1, 'tokens': tokens}
+        with self._lock:
+            agora = time.monotonic()
+            for nome, limite in limites.items():
+                self._saldos[nome] = min(limite, self._saldos[nome] + (agora - self._saldos_em) * limite / 60)
+            self._saldos_em = agora
+            ativos = [nome for nome, limite in limites.items() if limite]
+            aceita = all(self._saldos[nome] >= min(custos[nome], limites[nome]) for nome in ativos)
+            liberar = 0.0
+            if aceita:
+                for nome in ativos:
+                    self._saldos[nome] -= custos[nome]
+            else:
+                liberar = max((min(custos[nome], limites[nome]) - self._saldos[nome]) * 60 / limites[nome]
+                              for nome in ativos)
+            saldos = dict(self._saldos)
+
+        headers = {}
+        for nome in ativos:
+            headers[f"x-ratelimit-limit-{nome}"] = str(limites[nome])
+            headers[f"x-ratelimit-remaining-{nome}"] = str(max(int(saldos[nome]), 0))
+        return aceita, headers, max(liberar, 0.0)
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo, headers=None):
+                dados = json.dumps(corpo).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                for nome, valor in (headers or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(tamanho) or b"{}")
+                mensagens = payload.get("messages", [])
+                etapa = classificar_prompt(mensagens)
+                tokens_prompt = sum(len(m.get("content", "")) for m in mensagens) // 4 + 1
+
+                aceita, headers, liberar = servidor._consumir_limite(
+                    tokens_prompt + (payload.get("max_tokens") or 0)
+                )
+                if not aceita:
+                    with servidor._lock:
+                        servidor.limitadas += 1
+                    headers["retry-after-ms"] = str(int(liberar * 1000) + 1)
+                    self._responder(429, {"error": {"message": "rate limit simulado"}}, headers)
+                    return
+
+                with servidor._lock:
+                    jitter = servidor._aleatorio.uniform(0.5, 1.5)
+                    falhar = servidor._aleatorio.random() < servidor.taxa_erro
+                time.sleep(servidor.latencia_ms / 1000 * jitter)
+
+                if falhar:
+                    with servidor._lock:
+                        servidor.erros += 1
+                    self._responder(500, {"error": {"message": "erro simulado"}}, headers)
+                    return
+
+                sistema = "".join(m.get("content", "") for m in mensagens if m.get("role") == "system")
+                with servidor._lock:
+                    servidor.chamadas[etapa] += 1
+                    em_cache = sistema in servidor._prefixos
+                    servidor._prefixos.add(sistema)
+
+                conteudo = gerar_resposta(etapa, mensagens)
+                tokens_resposta = len(conteudo) // 4 + 1
+                self._responder(200, {
+                    "choices": [{"message": {"role": "assistant", "content": conteudo}}],
+                    "usage": {
+                        "prompt_tokens": tokens_prompt,
+                        "completion_tokens": tokens_resposta,
+                        "total_tokens": tokens_prompt + tokens_resposta,
+                        "prompt_tokens_details": {"cached_tokens": tokens_em_cache(len(sistema) // 4) if em_cache else 0},
+                    },
+                }, headers)
+
+        return Handler
+
+    def iniciar(self):
+        """Sobe o servidor em segundo plano."""
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def reiniciar_contadores(self):
+        """Zera contadores e prefixos vistos (entre cenários)."""
+        with self._lock:
+            self.chamadas = Counter()
+            self.erros = 0
+            self.limitadas = 0
+            self._prefixos = set()
+            self._saldos = {'requests': float(self.limite_rpm), 'tokens': float(self.limite_tpm)}
+            self._saldos_em = time.monotonic()
+
+    def parar(self):
+        """Encerra o servidor."""
+        self._servidor.shutdown()
+        self._servidor.server_close()
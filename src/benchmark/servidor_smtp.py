@@ -0,0 +1,93 @@
+"""
+Servidor SMTP local que aceita e descarta as mensagens (sink).
+
+Implementa só o necessário para o smtplib: EHLO/HELO, AUTH PLAIN/LOGIN,
+MAIL, RCPT, DATA, RSET, NOOP e QUIT. Conta as mensagens recebidas.
+"""
+import socketserver
+import threading
+
+
+class ServidorSMTPFalso:
+    """Sink SMTP em uma thread própria, uma thread por conexão."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mensagens = 0
+        self.conexoes = 0
+        self._servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._criar_handler())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def porta(self):
+        """Porta para SMTP_PORT."""
+        return self._servidor.server_address[1]
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def _enviar(self, linha):
+                self.wfile.write(f"{linha}\r\n".encode("ascii"))
+                self.wfile.flush()
+
+            def handle(self):
+                with servidor._lock:
+                    servidor.conexoes += 1
+                self._enviar("220 benchmark ESMTP")
+                while True:
+                    linha = self.rfile.readline()
+                    if not linha:
+                        return
+                    comando = linha.decode("utf-8", "replace").strip()
+                    verbo = comando.split(" ", 1)[0].upper()
+
+                    if verbo == "EHLO":
+                        self._enviar("250-benchmark")
+                        self._enviar("250 AUTH PLAIN LOGIN")
+                    elif verbo == "AUTH":
+                        partes = comando.split()
+                        if len(partes) >= 2 and partes[1].upper() == "LOGIN":
+                            # Usuário e senha em duas etapas (base64)
+                            if len(partes) == 2:
+                                self._enviar("334 VXNlcm5hbWU6")
+                                self.rfile.readline()
+                            self._enviar("334 UGFzc3dvcmQ6")
+                            self.rfile.readline()
+                        self._enviar("235 Authentication successful")
+                    elif verbo == "DATA":
+                        self._enviar("354 End data with <CR><LF>.<CR><LF>")
+                        while True:
+                            dado = self.rfile.readline()
+                            if not dado or dado in (b".\r\n", b".\n"):
+                                break
+                        with servidor._lock:
+                            servidor.mensagens += 1
+                        self._enviar("250 OK")
+                    elif verbo == "QUIT":
+                        self._enviar("221 Bye")
+                        return
+                    elif verbo in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                        self._enviar("250 OK")
+                    else:
+                        self._enviar("502 Command not implemented")
+
+        return Handler
+
+    def iniciar(self):
+        """Sobe o servidor em segundo plano."""
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def reiniciar_contadores(self):
+        """Zera os contadores (entre cenários)."""
+        with self._lock:
+            self.mensagens = 0
+            self.conexoes = 0
+
+    def parar(self):
+        """Encerra o servidor."""
+        self._servidor.shutdown()
+        self._servidor.server_close()
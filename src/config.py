@@ -11,6 +11,16 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.2"))
+OPENAI_MAX_CONCORRENCIA = int(os.getenv("OPENAI_MAX_CONCORRENCIA", "8"))
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_TIMEOUT_CONEXAO = float(os.getenv("OPENAI_TIMEOUT_CONEXAO", "10"))
+OPENAI_TIMEOUT_LEITURA = float(os.getenv("OPENAI_TIMEOUT_LEITURA", "120"))
+OPENAI_MAX_TENTATIVAS = int(os.getenv("OPENAI_MAX_TENTATIVAS", "5"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1.0"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "60"))
+# Limites do tier da conta (0 = sem limite); os cabeçalhos x-ratelimit-* ajustam em tempo real
+OPENAI_LIMITE_RPM = int(os.getenv("OPENAI_LIMITE_RPM", "500"))
+OPENAI_LIMITE_TPM = int(os.getenv("OPENAI_LIMITE_TPM", "200000"))
 
 # Event Registry API
 EVENT_REGISTRY_API_KEY = os.getenv("EVENT_REGISTRY_API_KEY")
@@ -20,16 +30,91 @@ REMETENTE_EMAIL = os.getenv("REMETENTE_EMAIL")
 REMETENTE_SENHA = os.getenv("REMETENTE_SENHA")
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+# false = conexão SMTP simples (com STARTTLS se o servidor oferecer)
+SMTP_SSL = os.getenv("SMTP_SSL", "true").lower() == "true"
+SMTP_POOL_CONEXOES = int(os.getenv("SMTP_POOL_CONEXOES", "3"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "60"))
 
 # Google Sheets Configuration
 SHEET_ID = os.getenv("SHEET_ID")
 
+# Diretório de caches locais (respostas de IA, etc.)
+CACHE_DIR = os.getenv(
+    "CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+)
+
+# Cache persistente de respostas da OpenAI
+LLM_CACHE_ATIVO = os.getenv("LLM_CACHE_ATIVO", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_TTL_HORAS = float(os.getenv("LLM_CACHE_TTL_HORAS", "72"))
+LLM_CACHE_MAX_ENTRADAS = int(os.getenv("LLM_CACHE_MAX_ENTRADAS", "50000"))
+
+# Cache de preços do dia (Yahoo Finance)
+PRECOS_CACHE_ATIVO = os.getenv("PRECOS_CACHE_ATIVO", "true").lower() == "true"
+
+# Snapshot local da planilha de usuários
+SHEETS_SNAPSHOT_PATH = os.getenv("SHEETS_SNAPSHOT_PATH", os.path.join(CACHE_DIR, "usuarios_snapshot.json"))
+SHEETS_OFFLINE = os.getenv("SHEETS_OFFLINE", "false").lower() == "true"
+SHEETS_TIMEOUT = float(os.getenv("SHEETS_TIMEOUT", "30"))
+
+# Base de contextos estratégicos (tese de cada ticker, versionada no repositório)
+CONTEXTO_DB_PATH = os.getenv(
+    "CONTEXTO_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "contexts", "contextos.sqlite3")
+)
+CONTEXTO_TTL_DIAS = float(os.getenv("CONTEXTO_TTL_DIAS", "30"))
+CONTEXTO_LRU_MAX = int(os.getenv("CONTEXTO_LRU_MAX", "256"))
+# Teto do resumo estruturado (digest) da tese usado nos prompts de análise
+CONTEXTO_DIGEST_MAX_TOKENS = int(os.getenv("CONTEXTO_DIGEST_MAX_TOKENS", "200"))
+
+# Telemetria (relatório JSON + arquivo do Prometheus ao fim de cada execução)
+TELEMETRIA_ATIVA = os.getenv("TELEMETRIA_ATIVA", "true").lower() == "true"
+TELEMETRIA_DIR = os.getenv("TELEMETRIA_DIR", os.path.join(CACHE_DIR, "telemetria"))
+TELEMETRIA_MAX_SPANS = int(os.getenv("TELEMETRIA_MAX_SPANS", "20000"))
+# false = sem saída no console (a telemetria continua sendo gravada)
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+
+# Checkpoints de execução (retomada com --resume) e registro de envios
+EXECUCOES_DIR = os.getenv("EXECUCOES_DIR", os.path.join(CACHE_DIR, "execucoes"))
+EXECUCOES_RETENCAO_DIAS = float(os.getenv("EXECUCOES_RETENCAO_DIAS", "7"))
+
 # Processing Parameters
 MAX_NOTICIAS_POR_TICKER = int(os.getenv("MAX_NOTICIAS_POR_TICKER", "20"))
 TOP_N_RELEVANTES = int(os.getenv("TOP_N_RELEVANTES", "5"))
 RELEVANCIA_MIN = float(os.getenv("RELEVANCIA_MIN", "0.0"))
 HORAS_RETROATIVAS = int(os.getenv("HORAS_RETROATIVAS", "24"))
 
+# Pré-filtro léxico local antes da análise por IA
+PREFILTRO_ATIVO = os.getenv("PREFILTRO_ATIVO", "true").lower() == "true"
+PREFILTRO_LIMIAR = float(os.getenv("PREFILTRO_LIMIAR", "0.15"))
+PREFILTRO_MAX_ARTIGOS = int(os.getenv("PREFILTRO_MAX_ARTIGOS", "15"))
+
+# Agrupamento de notícias quase duplicadas (similaridade de Jaccard estimada)
+DEDUP_ATIVO = os.getenv("DEDUP_ATIVO", "true").lower() == "true"
+DEDUP_LIMIAR = float(os.getenv("DEDUP_LIMIAR", "0.7"))
+
+# Ingestão incremental (marca d'água por ticker, para execuções intradiárias)
+INGESTAO_INCREMENTAL = os.getenv("INGESTAO_INCREMENTAL", "false").lower() == "true"
+INGESTAO_PATH = os.getenv("INGESTAO_PATH", os.path.join(CACHE_DIR, "ingestao.sqlite3"))
+
+# Paralelismo do pipeline por ticker
+TICKERS_WORKERS = int(os.getenv("TICKERS_WORKERS", "4"))
+
+# Envio em streaming: cada email sai assim que os tickers do usuário ficam prontos
+ENVIO_STREAMING = os.getenv("ENVIO_STREAMING", "true").lower() == "true"
+
+# Busca combinada de notícias (vários tickers por consulta ao Event Registry)
+NOTICIAS_BUSCA_EM_LOTE = os.getenv("NOTICIAS_BUSCA_EM_LOTE", "true").lower() == "true"
+NOTICIAS_TICKERS_POR_CONSULTA = int(os.getenv("NOTICIAS_TICKERS_POR_CONSULTA", "10"))
+
+# Análise em lote (várias notícias por requisição; 0 desativa)
+ANALISE_LOTE_MAX_TOKENS = int(os.getenv("ANALISE_LOTE_MAX_TOKENS", "8000"))
+ANALISE_LOTE_MAX_ARTIGOS = int(os.getenv("ANALISE_LOTE_MAX_ARTIGOS", "10"))
+
+# Resumo executivo + análise consolidada em uma única requisição por ticker
+SINTESE_UNIFICADA = os.getenv("SINTESE_UNIFICADA", "true").lower() == "true"
+
 
 def validar_configuracoes():
     """Valida se todas as configurações obrigatórias estão presentes."""
@@ -49,5 +134,6 @@ def validar_configuracoes():
             "Verifique seu arquivo .env"
         )
     
-    print("✓ Todas as configurações foram carregadas com sucesso!")
+    if LOG_CONSOLE:
+        print("✓ Todas as configurações foram carregadas com sucesso!")
 
@@ -1,35 +1,334 @@
+"""
+Base de contextos estratégicos (teses) de cada ticker.
+
+Todas as teses ficam em um único banco SQLite indexado por ticker, com a
+data de geração e o modelo usado. As consultas passam por um LRU em
+memória, e uma tese é regenerada apenas quando fica mais velha que
+CONTEXTO_TTL_DIAS.
+
+Cada tese também ganha um digest: um resumo estruturado e curto (KPIs,
+drivers, riscos e ruído) usado nos prompts repetidos por notícia, no
+lugar do texto completo.
+"""
+import glob
+import json
 import os
-import requests
-from .config import OPENAI_API_KEY
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from .openai_client import completar
+from .utils import estimar_tokens, extrair_json, log, log_erro
+from .config import (
+    CONTEXTO_DB_PATH,
+    CONTEXTO_TTL_DIAS,
+    CONTEXTO_LRU_MAX,
+    CONTEXTO_DIGEST_MAX_TOKENS,
+    OPENAI_MODEL
+)
 
 CONTEXT_DIR = os.path.join(os.path.dirname(__file__), "contexts")
 
-def carregar_contexto(ticker):
+# Modelo usado para gerar as teses
+MODELO_CONTEXTO = "gpt-4o"
+
+# Seções do digest, na ordem em que aparecem no prompt
+SECOES_DIGEST = (
+    ('kpis', 'KPIs'),
+    ('drivers', 'Drivers'),
+    ('riscos', 'Riscos'),
+    ('ruido', 'Ruído (ignorar)'),
+)
+
+_conexao = None
+_lock = threading.Lock()
+_lru = OrderedDict()
+
+
+def _data_geracao_importada(ticker, file_path):
+    """
+    Data de geração atribuída a uma tese migrada de .txt.
+
+    Parte da data de modificação do arquivo e recua cada ticker um
+    deslocamento fixo dentro do TTL, derivado do nome. Assim as teses
+    importadas juntas vencem em dias diferentes, em vez de todas no
+    mesmo dia.
+    """
+    base = os.path.getmtime(file_path)
+    if CONTEXTO_TTL_DIAS <= 0:
+        return base
+    deslocamento = zlib.crc32(ticker.encode("utf-8")) % max(int(CONTEXTO_TTL_DIAS), 1)
+    return base - deslocamento * 86400
+
+
+def _importar_arquivos_txt(conexao):
     """
-    Carrega o contexto de um ticker do arquivo local .txt.
+    Migra arquivos contexts/<TICKER>.txt legados para o banco.
+
+    Executado só quando o banco é criado, ou seja, apenas em cópias locais
+    antigas: o repositório versiona contextos.sqlite3, que é a fonte das
+    teses (os .txt não são mais lidos depois da migração). A data de
+    geração é espalhada entre os tickers (ver _data_geracao_importada).
     """
-    file_path = os.path.join(CONTEXT_DIR, f"{ticker}.txt")
-    if os.path.exists(file_path):
+    registros = []
+    for file_path in sorted(glob.glob(os.path.join(CONTEXT_DIR, "*.txt"))):
+        ticker = os.path.splitext(os.path.basename(file_path))[0]
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
+                contexto = f.read()
+        except Exception as e:
+            log_erro(f"  ⚠ Erro ao ler arquivo de contexto para {ticker}: {e}")
+            continue
+        if contexto.strip():
+            registros.append((ticker, contexto, _data_geracao_importada(ticker, file_path), MODELO_CONTEXTO))
+
+    if registros:
+        conexao.executemany(
+            "INSERT OR IGNORE INTO contextos (ticker, contexto, gerado_em, modelo) VALUES (?, ?, ?, ?)",
+            registros
+        )
+        log(f"  ✓ {len(registros)} contextos migrados de arquivos .txt para a base")
+
+
+def _obter_conexao():
+    """Abre (uma única vez) a base de contextos, criando-a se necessário."""
+    global _conexao
+    if _conexao is None:
+        novo = not os.path.exists(CONTEXTO_DB_PATH)
+        os.makedirs(os.path.dirname(CONTEXTO_DB_PATH) or ".", exist_ok=True)
+        # Journal padrão (sem WAL): a base é um único arquivo versionado no git
+        conexao = sqlite3.connect(CONTEXTO_DB_PATH, timeout=30, check_same_thread=False)
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS contextos (
+                ticker TEXT PRIMARY KEY,
+                contexto TEXT NOT NULL,
+                gerado_em REAL NOT NULL,
+                modelo TEXT NOT NULL,
+                digest TEXT
+            )
+        """)
+        colunas = {linha[1] for linha in conexao.execute("PRAGMA table_info(contextos)")}
+        if 'digest' not in colunas:
+            conexao.execute("ALTER TABLE contextos ADD COLUMN digest TEXT")
+        if novo:
+            _importar_arquivos_txt(conexao)
+        conexao.commit()
+        _conexao = conexao
+    return _conexao
+
+
+def _guardar_no_lru(ticker, registro):
+    """Guarda o registro no LRU, descartando o menos usado se estiver cheio."""
+    _lru[ticker] = registro
+    _lru.move_to_end(ticker)
+    while len(_lru) > max(CONTEXTO_LRU_MAX, 1):
+        _lru.popitem(last=False)
+
+
+def obter_registro(ticker):
+    """
+    Retorna o contexto de um ticker com seus metadados.
+
+    Returns:
+        Dicionário {contexto, gerado_em, modelo, digest} ou None se não existir
+    """
+    with _lock:
+        if ticker in _lru:
+            _lru.move_to_end(ticker)
+            return _lru[ticker]
+
+        try:
+            linha = _obter_conexao().execute(
+                "SELECT contexto, gerado_em, modelo, digest FROM contextos WHERE ticker = ?", (ticker,)
+            ).fetchone()
         except Exception as e:
-            print(f"  ⚠ Erro ao ler arquivo de contexto para {ticker}: {e}")
+            log_erro(f"  ⚠ Erro ao ler contexto de {ticker}: {e}")
+            return None
+        if linha is None:
             return None
-    return None
 
-def gerar_contexto_ia(ticker):
+        registro = {
+            'contexto': linha[0],
+            'gerado_em': linha[1],
+            'modelo': linha[2],
+            'digest': json.loads(linha[3]) if linha[3] else None,
+        }
+        _guardar_no_lru(ticker, registro)
+        return registro
+
+
+def salvar_contexto(ticker, contexto, modelo=MODELO_CONTEXTO):
     """
-    Usa o GPT-4o (modelo inteligente) para gerar uma tese estratégica para o ticker.
-    Salva o resultado em um arquivo .txt local.
+    Grava (ou substitui) o contexto de um ticker em uma única transação.
+
+    O digest anterior é descartado e volta a ser gerado no próximo uso.
     """
-    print(f"  🧠 Gerando tese estratégica para {ticker} via GPT-4o...")
-    
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
+    registro = {'contexto': contexto, 'gerado_em': time.time(), 'modelo': modelo, 'digest': None}
+    with _lock:
+        conexao = _obter_conexao()
+        with conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO contextos (ticker, contexto, gerado_em, modelo) VALUES (?, ?, ?, ?)",
+                (ticker, contexto, registro['gerado_em'], modelo)
+            )
+        _guardar_no_lru(ticker, registro)
+
+
+def idade_dias(registro):
+    """Idade de um registro de contexto, em dias."""
+    return (time.time() - registro['gerado_em']) / 86400
+
+
+def contexto_expirado(registro):
+    """Indica se o contexto passou de CONTEXTO_TTL_DIAS (0 desativa a expiração)."""
+    return CONTEXTO_TTL_DIAS > 0 and idade_dias(registro) > CONTEXTO_TTL_DIAS
+
+
+def formatar_digest(digest):
+    """
+    Converte o digest em texto compacto, respeitando CONTEXTO_DIGEST_MAX_TOKENS.
+
+    Se passar do teto, descarta o último item da seção com mais itens
+    (em empate, a seção menos importante, de baixo para cima).
+    """
+    secoes = {chave: [str(item).strip() for item in digest.get(chave, []) if str(item).strip()]
+              for chave, _ in SECOES_DIGEST}
+
+    def renderizar():
+        return "\n".join(
+            f"{rotulo}: {'; '.join(secoes[chave])}" for chave, rotulo in SECOES_DIGEST if secoes[chave]
+        )
+
+    texto = renderizar()
+    while estimar_tokens(texto) > CONTEXTO_DIGEST_MAX_TOKENS and any(secoes.values()):
+        ordem = [chave for chave, _ in SECOES_DIGEST]
+        maior = max(ordem, key=lambda chave: (len(secoes[chave]), ordem.index(chave)))
+        secoes[maior].pop()
+        texto = renderizar()
+    return texto
+
+
+def _validar_digest(conteudo):
+    """Confere se a resposta tem as quatro seções do digest como listas."""
+    digest = extrair_json(conteudo)
+    if not isinstance(digest, dict) or any(not isinstance(digest.get(c), list) for c, _ in SECOES_DIGEST):
+        raise ValueError("digest malformado")
+    return {chave: digest[chave] for chave, _ in SECOES_DIGEST}
+
+
+def gerar_digest(ticker, contexto):
+    """
+    Resume a tese em um digest estruturado com o modelo de análise (OPENAI_MODEL).
+
+    Returns:
+        Dicionário {kpis, drivers, riscos, ruido} (listas de frases curtas) ou None se falhar
+    """
+    palavras = max(CONTEXTO_DIGEST_MAX_TOKENS // 2, 40)
+    prompt = f"""
+Resuma a tese estratégica abaixo sobre {ticker} em itens curtos (3 a 8 palavras cada),
+para orientar a triagem de notícias. Use no máximo {palavras} palavras no total.
+
+Tese:
+\"\"\"{contexto}\"\"\"
+
+Responda EXCLUSIVAMENTE em JSON, no seguinte formato:
+
+{{
+  "kpis": ["indicadores que movem o resultado"],
+  "drivers": ["fatores externos e teses de investimento"],
+  "riscos": ["principais riscos para a tese"],
+  "ruido": ["tipos de notícia que não importam para a tese"]
+}}
+"""
+
+    data = {
+        "model": OPENAI_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0,
     }
+
+    try:
+        return completar(data, processar=_validar_digest)
+    except Exception as e:
+        log_erro(f"  ⚠ Erro ao gerar digest do contexto de {ticker}: {e}")
+        return None
+
+
+def garantir_digest(ticker, contexto=None):
+    """
+    Retorna o digest da tese do ticker em texto compacto, gerando-o se preciso.
+
+    Args:
+        ticker: Ticker da empresa
+        contexto: Tese completa (padrão: a da base)
+
+    Returns:
+        Texto do digest ou None se não houver tese ou a geração falhar
+    """
+    registro = obter_registro(ticker)
+    if registro is None:
+        return None
+    # Uma tese diferente da gravada (ex: regeneração falhou) não tem digest salvo
+    if contexto is not None and contexto != registro['contexto']:
+        return None
+    if registro['digest']:
+        return formatar_digest(registro['digest'])
+
+    digest = gerar_digest(ticker, registro['contexto'])
+    if digest is None:
+        return None
+
+    with _lock:
+        conexao = _obter_conexao()
+        with conexao:
+            conexao.execute(
+                "UPDATE contextos SET digest = ? WHERE ticker = ? AND gerado_em = ?",
+                (json.dumps(digest, ensure_ascii=False), ticker, registro['gerado_em'])
+            )
+        registro['digest'] = digest
+    log(f"  ✓ Digest do contexto de {ticker} gerado")
+    return formatar_digest(digest)
+
+
+def estimar_economia_digest(prompts_por_ticker):
+    """
+    Estima os tokens de prompt economizados por usar o digest no lugar da tese.
+
+    Args:
+        prompts_por_ticker: Dicionário {ticker: número de prompts enviados com contexto}
+
+    Returns:
+        Tupla (tokens_economizados, prompts_com_digest)
+    """
+    tokens = 0
+    prompts = 0
+    for ticker, quantidade in prompts_por_ticker.items():
+        registro = obter_registro(ticker)
+        if not registro or not registro['digest']:
+            continue
+        diferenca = estimar_tokens(registro['contexto']) - estimar_tokens(formatar_digest(registro['digest']))
+        tokens += max(diferenca, 0) * quantidade
+        prompts += quantidade
+    return tokens, prompts
+
+
+def carregar_contexto(ticker):
+    """
+    Carrega o contexto de um ticker da base local.
+    """
+    registro = obter_registro(ticker)
+    return registro['contexto'] if registro else None
+
+def gerar_contexto_ia(ticker, forcar=False):
+    """
+    Usa o GPT-4o (modelo inteligente) para gerar uma tese estratégica para o ticker.
+    Salva o resultado na base de contextos.
+
+    Com forcar=True o cache de respostas é ignorado na leitura, garantindo
+    uma tese nova (usado pela atualização mensal).
+    """
+    log(f"  🧠 Gerando tese estratégica para {ticker} via GPT-4o...")
     
     prompt = f"""
 Você é um analista sênior de Equity Research da B3. 
@@ -48,37 +347,39 @@ Limite a resposta a no máximo 500 palavras. Seja direto e focado no mercado fin
 """
     
     data = {
-        "model": "gpt-4o", # Usamos o modelo forte para inteligência estratégica
+        "model": MODELO_CONTEXTO, # Usamos o modelo forte para inteligência estratégica
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.3,
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        response_json = response.json()
-        
-        contexto = response_json["choices"][0]["message"]["content"].strip()
+        contexto = completar(data, ler_cache=not forcar)
         
-        # Salvar o arquivo
-        os.makedirs(CONTEXT_DIR, exist_ok=True)
-        file_path = os.path.join(CONTEXT_DIR, f"{ticker}.txt")
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(contexto)
-            
-        print(f"  ✓ Contexto para {ticker} gerado e salvo com sucesso.")
+        salvar_contexto(ticker, contexto, MODELO_CONTEXTO)
+
+        log(f"  ✓ Contexto para {ticker} gerado e salvo com sucesso.")
         return contexto
         
     except Exception as e:
-        print(f"  ✗ Erro ao gerar contexto para {ticker}: {e}")
+        log_erro(f"  ✗ Erro ao gerar contexto para {ticker}: {e}")
         return None
 
 def garantir_contexto(ticker):
     """
-    Tenta carregar o contexto localmente. Se não existir, gera via IA.
+    Carrega o contexto da base local. Se não existir, gera via IA.
+
+    Um contexto mais velho que CONTEXTO_TTL_DIAS é regenerado; se a
+    geração falhar, o contexto antigo continua sendo usado.
     """
-    contexto = carregar_contexto(ticker)
-    if contexto:
-        return contexto
-    return gerar_contexto_ia(ticker)
+    registro = obter_registro(ticker)
+    if registro is None:
+        return gerar_contexto_ia(ticker)
+    if not contexto_expirado(registro):
+        return registro['contexto']
 
+    log(f"  ⌛ Contexto de {ticker} tem {idade_dias(registro):.0f} dias, regenerando...")
+    novo = gerar_contexto_ia(ticker, forcar=True)
+    if novo:
+        return novo
+    log_erro(f"  ⚠ Mantendo contexto anterior de {ticker}")
+    return registro['contexto']
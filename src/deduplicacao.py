@@ -0,0 +1,169 @@
+"""
+Agrupamento de notícias quase duplicadas (MinHash + LSH).
+
+Matérias de agência republicadas por vários veículos chegam com pequenas
+edições. Cada corpo vira um conjunto de shingles (sequências de palavras),
+resumido por uma assinatura MinHash; o LSH por bandas encontra os pares
+candidatos sem comparar todos contra todos, então o custo cresce de forma
+quase linear com o número de artigos.
+
+Só o representante de cada grupo (o corpo mais longo) segue para a análise,
+e o veredito dele vale para as cópias.
+"""
+import re
+import threading
+import zlib
+import numpy as np
+from .utils import log
+from .config import DEDUP_ATIVO, DEDUP_LIMIAR
+from .telemetria import incrementar
+
+# Palavras por shingle
+TAMANHO_SHINGLE = 5
+# Assinatura MinHash = BANDAS_LSH x LINHAS_POR_BANDA permutações
+BANDAS_LSH = 16
+LINHAS_POR_BANDA = 4
+NUM_PERMUTACOES = BANDAS_LSH * LINHAS_POR_BANDA
+
+# Hash universal (a*x + b) mod p sobre shingles de 32 bits; com p < 2^32
+# o produto cabe em uint64 sem estouro
+_PRIMO = np.uint64(4294967291)
+_gerador = np.random.default_rng(20240601)
+_COEF_A = _gerador.integers(1, int(_PRIMO), size=(NUM_PERMUTACOES, 1), dtype=np.uint64)
+_COEF_B = _gerador.integers(0, int(_PRIMO), size=(NUM_PERMUTACOES, 1), dtype=np.uint64)
+
+_PADRAO_PALAVRA = re.compile(r"\w+", re.UNICODE)
+
+_lock = threading.Lock()
+_estatisticas = {'artigos': 0, 'duplicatas': 0}
+
+
+def _shingles(texto):
+    """Hashes (32 bits) dos shingles de palavras do texto normalizado."""
+    palavras = _PADRAO_PALAVRA.findall(texto.lower())
+    if not palavras:
+        return np.empty(0, dtype=np.uint64)
+    if len(palavras) <= TAMANHO_SHINGLE:
+        trechos = {" ".join(palavras)}
+    else:
+        trechos = {
+            " ".join(palavras[i:i + TAMANHO_SHINGLE])
+            for i in range(len(palavras) - TAMANHO_SHINGLE + 1)
+        }
+    return np.fromiter((zlib.crc32(t.encode("utf-8")) for t in trechos), dtype=np.uint64, count=len(trechos))
+
+
+def _assinatura(shingles):
+    """Assinatura MinHash (NUM_PERMUTACOES valores) de um conjunto de shingles."""
+    return ((_COEF_A * shingles[np.newaxis, :] + _COEF_B) % _PRIMO).min(axis=1)
+
+
+def _raiz(pais, i):
+    """Busca da raiz no union-find, com compressão de caminho."""
+    while pais[i] != i:
+        pais[i] = pais[pais[i]]
+        i = pais[i]
+    return i
+
+
+def agrupar_quase_duplicatas(artigos, ticker=None):
+    """
+    Agrupa os artigos cujos corpos são quase idênticos.
+
+    Args:
+        artigos: Lista de dicionários de artigos
+        ticker: Ticker dos artigos (apenas para o log)
+
+    Returns:
+        Lista de grupos (listas de artigos), com o representante (corpo
+        mais longo) na primeira posição. Os grupos seguem a ordem do
+        primeiro artigo de cada um na lista original.
+    """
+    if not DEDUP_ATIVO or len(artigos) < 2:
+        return [[artigo] for artigo in artigos]
+
+    assinaturas = {}
+    for i, artigo in enumerate(artigos):
+        shingles = _shingles(artigo.get('body', ''))
+        if shingles.size:
+            assinaturas[i] = _assinatura(shingles)
+
+    # LSH: artigos que coincidem em alguma banda inteira viram candidatos
+    pais = list(range(len(artigos)))
+    baldes = {}
+    for i, assinatura in assinaturas.items():
+        for banda in range(BANDAS_LSH):
+            trecho = assinatura[banda * LINHAS_POR_BANDA:(banda + 1) * LINHAS_POR_BANDA]
+            baldes.setdefault((banda, trecho.tobytes()), []).append(i)
+
+    # Cada par do balde é comparado (uma vez): o primeiro do balde pode
+    # não ser parecido com dois outros que são quase-duplicatas entre si
+    comparados = set()
+    for indices in baldes.values():
+        for posicao, j in enumerate(indices):
+            for i in indices[:posicao]:
+                if (i, j) in comparados:
+                    continue
+                comparados.add((i, j))
+                # Fração de posições iguais estima a similaridade de Jaccard
+                if np.mean(assinaturas[i] == assinaturas[j]) >= DEDUP_LIMIAR:
+                    raiz_i, raiz_j = _raiz(pais, i), _raiz(pais, j)
+                    if raiz_i != raiz_j:
+                        pais[max(raiz_i, raiz_j)] = min(raiz_i, raiz_j)
+
+    por_raiz = {}
+    for i in range(len(artigos)):
+        por_raiz.setdefault(_raiz(pais, i), []).append(i)
+
+    grupos = []
+    for indices in por_raiz.values():
+        indices.sort(key=lambda i: -len(artigos[i].get('body', '')))
+        grupos.append([artigos[i] for i in indices])
+
+    duplicatas = len(artigos) - len(grupos)
+    with _lock:
+        _estatisticas['artigos'] += len(artigos)
+        _estatisticas['duplicatas'] += duplicatas
+    incrementar("artigos_descartados_total", duplicatas, motivo="quase_duplicata")
+
+    if duplicatas and ticker:
+        log(f"  🔁 {ticker}: {duplicatas} quase-duplicatas agrupadas ({len(artigos)} notícias em {len(grupos)} grupos)")
+    return grupos
+
+
+def propagar_vereditos(grupos, resultados):
+    """
+    Estende o veredito de cada representante às cópias do seu grupo.
+
+    As cópias recebem a mesma análise marcada com 'duplicata': True,
+    para que fiquem registradas sem disputar o top-N.
+
+    Args:
+        grupos: Grupos de agrupar_quase_duplicatas
+        resultados: Lista alinhada com os grupos (análise do representante,
+            ou o marcador de falha/descarte, que as cópias herdam)
+
+    Returns:
+        Tupla (artigos, resultados) com todos os artigos dos grupos, alinhados
+    """
+    artigos = []
+    expandidos = []
+    for grupo, resultado in zip(grupos, resultados):
+        for posicao, artigo in enumerate(grupo):
+            artigos.append(artigo)
+            if not isinstance(resultado, dict) or posicao == 0:
+                expandidos.append(resultado)
+            else:
+                expandidos.append(dict(resultado, titulo=artigo.get('title', 'Sem título'), duplicata=True))
+    return artigos, expandidos
+
+
+def obter_estatisticas():
+    """
+    Retorna quantos artigos foram agrupados e quantas cópias foram evitadas.
+
+    Returns:
+        Dicionário {'artigos': int, 'duplicatas': int}
+    """
+    with _lock:
+        return dict(_estatisticas)
@@ -3,62 +3,35 @@ Módulo para geração e envio de emails HTML.
 """
 import smtplib
 import ssl
+import threading
+from functools import lru_cache
 from email.message import EmailMessage
-from .config import REMETENTE_EMAIL, REMETENTE_SENHA, SMTP_SERVER, SMTP_PORT
-from .utils import formatar_timestamp
+from .config import (
+    REMETENTE_EMAIL,
+    REMETENTE_SENHA,
+    SMTP_SERVER,
+    SMTP_PORT,
+    SMTP_SSL,
+    SMTP_POOL_CONEXOES,
+    SMTP_TIMEOUT
+)
+from .utils import formatar_timestamp, log, log_erro
+from .telemetria import medir, incrementar
 
 
-def gerar_email_html(usuario, analises_agrupadas, resumo_executivo=None, precos_dados=None, analises_consolidadas=None):
-    """
-    Gera HTML formatado para o email com as análises de notícias.
-
-    Args:
-        usuario: Dicionário com dados do usuário (nome, email, etc)
-        analises_agrupadas: Lista de análises de todos os tickers
-        resumo_executivo: Dicionário {ticker: resumo_compacto}
-        precos_dados: Dicionário {ticker: {preco_fechamento, variacao_percentual, sucesso}}
-        analises_consolidadas: Dicionário {ticker: {'positivo': str, 'negativo': str}}
-
-    Returns:
-        String com HTML formatado
-    """
-    nome = usuario.get('Qual seu nome completo?', 'Investidor')
-    if resumo_executivo is None:
-        resumo_executivo = {}
-    if precos_dados is None:
-        precos_dados = {}
-    if analises_consolidadas is None:
-        analises_consolidadas = {}
-
-    def sentimento_info(valor):
-        """Converte sentimento em emoji e cor."""
-        if valor > 0.3:
-            return "🟢", "#28a745", "Positivo"
-        elif valor < -0.3:
-            return "🔴", "#dc3545", "Negativo"
-        else:
-            return "🟡", "#ffc107", "Neutro"
-
-    # Agrupa por ticker
-    por_ticker = {}
-    for analise in analises_agrupadas:
-        ticker = analise.get('ticker', 'Unknown')
-        if ticker not in por_ticker:
-            por_ticker[ticker] = []
-        por_ticker[ticker].append(analise)
-
-    # Construir HTML
-    html = f"""
+# Estrutura fixa do email (CSS + cabeçalho), montada uma única vez.
+# O nome do usuário é a única parte variável e entra entre as duas metades.
+_CABECALHO_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <style>
-        * {{
+        * {
             box-sizing: border-box;
-        }}
-        body {{
+        }
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif;
             line-height: 1.6;
             color: #333;
@@ -67,208 +40,208 @@ def gerar_email_html(usuario, analises_agrupadas, resumo_executivo=None, precos_
             padding: 10px;
             background-color: #f4f4f4;
             -webkit-text-size-adjust: 100%;
-        }}
-        .container {{
+        }
+        .container {
             background: white;
             padding: 20px;
             border-radius: 10px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
             width: 100%;
-        }}
-        .header {{
+        }
+        .header {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 15px;
             border-radius: 10px 10px 0 0;
             margin: -20px -20px 15px -20px;
-        }}
-        .header h1 {{
+        }
+        .header h1 {
             margin: 0;
             font-size: 20px;
             word-wrap: break-word;
-        }}
-        .header p {{
+        }
+        .header p {
             margin: 8px 0 0 0;
             font-size: 14px;
-        }}
-        .intro {{
+        }
+        .intro {
             font-size: 14px;
             margin-bottom: 15px;
-        }}
-        .ticker-section {{
+        }
+        .ticker-section {
             margin: 15px 0;
             padding: 15px;
             background: #f8f9fa;
             border-radius: 8px;
             border-left: 4px solid #667eea;
-        }}
-        .ticker-title {{
+        }
+        .ticker-title {
             font-size: 18px;
             font-weight: bold;
             color: #667eea;
             margin-bottom: 12px;
-        }}
-        .noticia {{
+        }
+        .noticia {
             background: white;
             padding: 12px;
             margin: 10px 0;
             border-radius: 6px;
             border: 1px solid #e0e0e0;
-        }}
-        .noticia-titulo {{
+        }
+        .noticia-titulo {
             font-weight: bold;
             margin-bottom: 8px;
             color: #333;
             font-size: 14px;
             line-height: 1.4;
             word-wrap: break-word;
-        }}
-        .noticia-resumo {{
+        }
+        .noticia-resumo {
             margin-bottom: 10px;
             color: #666;
             font-size: 13px;
             line-height: 1.5;
-        }}
-        .noticia.consolidada {{
+        }
+        .noticia.consolidada {
             background: white;
             padding: 15px;
             margin: 10px 0;
             border-radius: 6px;
             border-left: 3px solid #667eea;
-        }}
-        .noticia.consolidada .noticia-titulo {{
+        }
+        .noticia.consolidada .noticia-titulo {
             font-size: 15px;
             margin-bottom: 10px;
-        }}
-        .noticia.consolidada .noticia-resumo {{
+        }
+        .noticia.consolidada .noticia-resumo {
             line-height: 1.7;
             text-align: justify;
-        }}
-        .sentimento {{
+        }
+        .sentimento {
             display: inline-block;
             padding: 4px 10px;
             border-radius: 20px;
             font-size: 11px;
             font-weight: bold;
-        }}
-        .footer {{
+        }
+        .footer {
             margin-top: 20px;
             padding-top: 15px;
             border-top: 2px solid #e0e0e0;
             font-size: 11px;
             color: #666;
             text-align: center;
-        }}
-        .no-news {{
+        }
+        .no-news {
             text-align: center;
             padding: 15px;
             color: #666;
             font-style: italic;
             font-size: 14px;
-        }}
-        .resumo-executivo {{
+        }
+        .resumo-executivo {
             background: linear-gradient(135deg, #f5f7fa 0%, #e4e8ec 100%);
             padding: 15px;
             border-radius: 8px;
             margin: 15px 0;
             border: 2px solid #667eea;
-        }}
-        .resumo-executivo h2 {{
+        }
+        .resumo-executivo h2 {
             color: #667eea;
             margin: 0 0 12px 0;
             font-size: 16px;
-        }}
-        .resumo-item {{
+        }
+        .resumo-item {
             padding: 10px 0;
             border-bottom: 1px solid #ddd;
-        }}
-        .resumo-item:last-child {{
+        }
+        .resumo-item:last-child {
             border-bottom: none;
-        }}
-        .resumo-ticker {{
+        }
+        .resumo-ticker {
             font-weight: bold;
             color: #333;
             font-size: 14px;
             margin-bottom: 5px;
-        }}
-        .preco-info {{
+        }
+        .preco-info {
             display: inline-block;
             margin-left: 10px;
             font-size: 13px;
             font-weight: normal;
-        }}
-        .preco-valor {{
+        }
+        .preco-valor {
             color: #666;
-        }}
-        .variacao-positiva {{
+        }
+        .variacao-positiva {
             color: #28a745;
             font-weight: bold;
-        }}
-        .variacao-negativa {{
+        }
+        .variacao-negativa {
             color: #dc3545;
             font-weight: bold;
-        }}
-        .variacao-neutra {{
+        }
+        .variacao-neutra {
             color: #666;
             font-weight: bold;
-        }}
-        .resumo-texto {{
+        }
+        .resumo-texto {
             color: #555;
             font-size: 13px;
             margin-top: 5px;
             line-height: 1.5;
-        }}
-        .section-title {{
+        }
+        .section-title {
             color: #667eea;
             margin: 20px 0 15px 0;
             font-size: 16px;
             font-weight: bold;
-        }}
-        @media only screen and (max-width: 600px) {{
-            body {{
+        }
+        @media only screen and (max-width: 600px) {
+            body {
                 padding: 5px;
-            }}
-            .container {{
+            }
+            .container {
                 padding: 15px;
                 border-radius: 8px;
-            }}
-            .header {{
+            }
+            .header {
                 padding: 12px;
                 margin: -15px -15px 12px -15px;
                 border-radius: 8px 8px 0 0;
-            }}
-            .header h1 {{
+            }
+            .header h1 {
                 font-size: 18px;
-            }}
-            .ticker-section {{
+            }
+            .ticker-section {
                 padding: 12px;
                 margin: 12px 0;
-            }}
-            .ticker-title {{
+            }
+            .ticker-title {
                 font-size: 16px;
-            }}
-            .noticia {{
+            }
+            .noticia {
                 padding: 10px;
-            }}
-            .noticia-titulo {{
+            }
+            .noticia-titulo {
                 font-size: 13px;
-            }}
-            .noticia-resumo {{
+            }
+            .noticia-resumo {
                 font-size: 12px;
-            }}
-            .resumo-executivo {{
+            }
+            .resumo-executivo {
                 padding: 12px;
-            }}
-            .resumo-executivo h2 {{
+            }
+            .resumo-executivo h2 {
                 font-size: 15px;
-            }}
-            .resumo-ticker {{
+            }
+            .resumo-ticker {
                 font-size: 13px;
-            }}
-            .resumo-texto {{
+            }
+            .resumo-texto {
                 font-size: 12px;
-            }}
-        }}
+            }
+        }
     </style>
 </head>
 <body>
@@ -280,113 +253,352 @@ def gerar_email_html(usuario, analises_agrupadas, resumo_executivo=None, precos_
 
         <p class="intro">Aqui está o resumo das notícias mais relevantes sobre suas ações nas últimas 24 horas:</p>
 """
+_CABECALHO_ANTES_NOME, _CABECALHO_DEPOIS_NOME = _CABECALHO_HTML.split("{nome}")
 
-    # Adiciona seção de Resumo Executivo se houver
-    if resumo_executivo:
-        html += """
+_INICIO_RESUMO_EXECUTIVO = """
         <div class="resumo-executivo">
             <h2>📋 Resumo Executivo</h2>
 """
-        for ticker, resumo in resumo_executivo.items():
-            # Buscar dados de preço para este ticker
-            preco_html = ""
-            if ticker in precos_dados and precos_dados[ticker]['sucesso']:
-                preco = precos_dados[ticker]['preco_fechamento']
-                variacao = precos_dados[ticker]['variacao_percentual']
-                
-                # Determinar classe CSS baseado na variação
-                if variacao > 0:
-                    variacao_class = "variacao-positiva"
-                    variacao_sinal = "+"
-                elif variacao < 0:
-                    variacao_class = "variacao-negativa"
-                    variacao_sinal = ""
-                else:
-                    variacao_class = "variacao-neutra"
-                    variacao_sinal = ""
-                
-                preco_html = f"""<span class="preco-info">
-                    <span class="preco-valor">R$ {preco:.2f}</span> 
-                    <span class="{variacao_class}">({variacao_sinal}{variacao:.2f}%)</span>
-                </span>"""
-            
-            html += f"""
-            <div class="resumo-item">
-                <div class="resumo-ticker">{ticker}{preco_html}</div>
-                <div class="resumo-texto">{resumo}</div>
-            </div>
-"""
-        html += """
+
+_FIM_RESUMO_EXECUTIVO = """
         </div>
 
         <h3 class="section-title">📰 Notícias Detalhadas</h3>
 """
 
-    if not analises_agrupadas:
-        html += """
+_SEM_NOTICIAS = """
         <div class="no-news">
             <p>😴 Nenhuma notícia relevante encontrada para seus tickers no período.</p>
         </div>
 """
-    else:
-        # Agrupar por ticker
-        por_ticker = {}
-        for analise in analises_agrupadas:
-            ticker = analise.get('ticker', 'Unknown')
-            if ticker not in por_ticker:
-                por_ticker[ticker] = []
-            por_ticker[ticker].append(analise)
+
+
+@lru_cache(maxsize=4096)
+def _renderizar_item_resumo(ticker, resumo, preco=None, variacao=None):
+    """
+    Renderiza o item de um ticker no Resumo Executivo (com badge de preço).
+
+    O fragmento é igual para todos os usuários, então fica em cache e
+    é renderizado uma única vez por execução.
+    """
+    preco_html = ""
+    if preco is not None and variacao is not None:
+        # Determinar classe CSS baseado na variação
+        if variacao > 0:
+            variacao_class = "variacao-positiva"
+            variacao_sinal = "+"
+        elif variacao < 0:
+            variacao_class = "variacao-negativa"
+            variacao_sinal = ""
+        else:
+            variacao_class = "variacao-neutra"
+            variacao_sinal = ""
         
-        for ticker in por_ticker.keys():
-            consolidado = analises_consolidadas.get(ticker, {})
-            
-            if not consolidado or (not consolidado.get('positivo') and not consolidado.get('negativo')):
-                continue
-            
-            html += f"""
+        preco_html = f"""<span class="preco-info">
+                    <span class="preco-valor">R$ {preco:.2f}</span> 
+                    <span class="{variacao_class}">({variacao_sinal}{variacao:.2f}%)</span>
+                </span>"""
+    
+    return f"""
+            <div class="resumo-item">
+                <div class="resumo-ticker">{ticker}{preco_html}</div>
+                <div class="resumo-texto">{resumo}</div>
+            </div>
+"""
+
+
+@lru_cache(maxsize=4096)
+def _renderizar_secao_ticker(ticker, positivo, negativo):
+    """
+    Renderiza a seção de notícias consolidadas (blocos positivo/negativo)
+    de um ticker. Também fica em cache por ser igual para todos os usuários.
+    """
+    html = f"""
         <div class="ticker-section">
             <div class="ticker-title">{ticker}</div>
 """
-            
-            # Bloco Positivo
-            if consolidado.get('positivo'):
-                html += f"""
+    
+    # Bloco Positivo
+    if positivo:
+        html += f"""
             <div class="noticia consolidada">
                 <div class="noticia-titulo">🟢 Pontos Positivos</div>
-                <div class="noticia-resumo">{consolidado['positivo']}</div>
+                <div class="noticia-resumo">{positivo}</div>
             </div>
 """
-            
-            # Bloco Negativo
-            if consolidado.get('negativo'):
-                html += f"""
+    
+    # Bloco Negativo
+    if negativo:
+        html += f"""
             <div class="noticia consolidada">
                 <div class="noticia-titulo">🔴 Pontos de Atenção</div>
-                <div class="noticia-resumo">{consolidado['negativo']}</div>
+                <div class="noticia-resumo">{negativo}</div>
             </div>
 """
-            
-            html += """
+    
+    html += """
         </div>
 """
+    return html
 
-    html += f"""
+
+@lru_cache(maxsize=16)
+def _renderizar_rodape(timestamp):
+    """Renderiza o rodapé (muda apenas com o timestamp, em minutos)."""
+    return f"""
         <div class="footer">
             <p><strong>TradingCore</strong> - Sistema Automatizado de Análise de Notícias</p>
             <p>Este email foi gerado automaticamente. As análises são baseadas em IA e não constituem recomendação de investimento.</p>
-            <p>Data: {formatar_timestamp()}</p>
+            <p>Data: {timestamp}</p>
         </div>
     </div>
 </body>
 </html>
 """
 
-    return html
+
+def gerar_corpo_email_html(analises_agrupadas, resumo_executivo=None, precos_dados=None, analises_consolidadas=None):
+    """
+    Gera o HTML do email a partir da saudação, sem o nome do usuário.
+
+    O resultado é igual para todos os usuários com os mesmos tickers e
+    pode ser reaproveitado com personalizar_email_html.
+
+    Args:
+        analises_agrupadas: Lista de análises de todos os tickers
+        resumo_executivo: Dicionário {ticker: resumo_compacto}
+        precos_dados: Dicionário {ticker: {preco_fechamento, variacao_percentual, sucesso}}
+        analises_consolidadas: Dicionário {ticker: {'positivo': str, 'negativo': str}}
+
+    Returns:
+        String com o HTML que segue o nome do usuário
+    """
+    if resumo_executivo is None:
+        resumo_executivo = {}
+    if precos_dados is None:
+        precos_dados = {}
+    if analises_consolidadas is None:
+        analises_consolidadas = {}
+
+    partes = [_CABECALHO_DEPOIS_NOME]
+
+    # Adiciona seção de Resumo Executivo se houver
+    if resumo_executivo:
+        partes.append(_INICIO_RESUMO_EXECUTIVO)
+        for ticker, resumo in resumo_executivo.items():
+            # Buscar dados de preço para este ticker
+            preco = variacao = None
+            if ticker in precos_dados and precos_dados[ticker]['sucesso']:
+                preco = precos_dados[ticker]['preco_fechamento']
+                variacao = precos_dados[ticker]['variacao_percentual']
+            partes.append(_renderizar_item_resumo(ticker, resumo, preco, variacao))
+        partes.append(_FIM_RESUMO_EXECUTIVO)
+
+    if not analises_agrupadas:
+        partes.append(_SEM_NOTICIAS)
+    else:
+        # Tickers na ordem em que aparecem nas análises
+        tickers = dict.fromkeys(a.get('ticker', 'Unknown') for a in analises_agrupadas)
+        
+        for ticker in tickers:
+            consolidado = analises_consolidadas.get(ticker, {})
+            
+            if not consolidado or (not consolidado.get('positivo') and not consolidado.get('negativo')):
+                continue
+            
+            partes.append(_renderizar_secao_ticker(
+                ticker, consolidado.get('positivo') or '', consolidado.get('negativo') or ''
+            ))
+
+    partes.append(_renderizar_rodape(formatar_timestamp()))
+
+    return "".join(partes)
+
+
+def personalizar_email_html(corpo_html, usuario):
+    """
+    Completa o corpo gerado por gerar_corpo_email_html com a saudação do usuário.
+
+    Returns:
+        String com HTML formatado
+    """
+    nome = usuario.get('Qual seu nome completo?', 'Investidor')
+    return f"{_CABECALHO_ANTES_NOME}{nome}{corpo_html}"
+
+
+def gerar_email_html(usuario, analises_agrupadas, resumo_executivo=None, precos_dados=None, analises_consolidadas=None):
+    """
+    Gera HTML formatado para o email com as análises de notícias.
+
+    O email é montado juntando a estrutura fixa, o nome do usuário e os
+    fragmentos de cada ticker, que são renderizados uma vez e reaproveitados
+    entre usuários.
+
+    Args:
+        usuario: Dicionário com dados do usuário (nome, email, etc)
+        analises_agrupadas: Lista de análises de todos os tickers
+        resumo_executivo: Dicionário {ticker: resumo_compacto}
+        precos_dados: Dicionário {ticker: {preco_fechamento, variacao_percentual, sucesso}}
+        analises_consolidadas: Dicionário {ticker: {'positivo': str, 'negativo': str}}
+
+    Returns:
+        String com HTML formatado
+    """
+    corpo = gerar_corpo_email_html(analises_agrupadas, resumo_executivo, precos_dados, analises_consolidadas)
+    return personalizar_email_html(corpo, usuario)
+
+
+def _conexao_perdida(erro):
+    """Indica se o erro significa que a conexão SMTP não pode mais ser usada."""
+    if isinstance(erro, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(erro, smtplib.SMTPResponseException):
+        # 421: servidor encerrando o canal
+        return erro.smtp_code == 421
+    # Erros de socket/SSL (SMTPException também herda de OSError)
+    return isinstance(erro, OSError) and not isinstance(erro, smtplib.SMTPException)
+
+
+class PoolSMTP:
+    """
+    Pool de conexões SMTP autenticadas reutilizadas entre mensagens.
+
+    Abre até `tamanho` conexões sob demanda (uma por thread enviando em
+    paralelo) e reconecta de forma transparente se o servidor derrubar
+    uma conexão ociosa.
+    """
+
+    def __init__(self, tamanho):
+        self._tamanho = max(tamanho, 1)
+        # Conexões ociosas (a última devolvida é a primeira reutilizada)
+        self._livres = []
+        self._abertas = 0
+        # Protege _livres/_abertas e acorda quem espera uma vaga
+        self._condicao = threading.Condition()
+        self._contexto_ssl = ssl.create_default_context()
+
+    def _conectar(self):
+        """Abre e autentica uma nova conexão."""
+        with medir("smtp_conexao"):
+            if SMTP_SSL:
+                server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=self._contexto_ssl, timeout=SMTP_TIMEOUT)
+            else:
+                server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            try:
+                if not SMTP_SSL:
+                    server.ehlo()
+                    # Porta de submissão (587): sobe para TLS se o servidor oferecer
+                    if server.has_extn('starttls'):
+                        server.starttls(context=self._contexto_ssl)
+                server.login(REMETENTE_EMAIL, REMETENTE_SENHA)
+            except Exception:
+                server.close()
+                raise
+        return server
+
+    def _obter(self):
+        """
+        Retorna uma conexão livre, abrindo uma nova se o pool ainda não estiver cheio.
+
+        Com o pool cheio, espera uma conexão ser devolvida ou descartada
+        (o descarte libera a vaga para abrir outra).
+        """
+        with self._condicao:
+            while not self._livres and self._abertas >= self._tamanho:
+                self._condicao.wait()
+            if self._livres:
+                return self._livres.pop()
+            self._abertas += 1
+
+        try:
+            return self._conectar()
+        except Exception:
+            self._liberar_vaga()
+            raise
+
+    def _devolver(self, server):
+        """Devolve uma conexão saudável ao pool e acorda quem espera."""
+        with self._condicao:
+            self._livres.append(server)
+            self._condicao.notify()
+
+    def _liberar_vaga(self):
+        with self._condicao:
+            self._abertas -= 1
+            self._condicao.notify()
+
+    def _descartar(self, server):
+        """Fecha uma conexão quebrada e libera sua vaga no pool."""
+        try:
+            server.close()
+        except Exception:
+            pass
+        self._liberar_vaga()
+
+    def enviar(self, msg):
+        """
+        Envia uma mensagem usando uma conexão do pool.
+
+        Se a conexão tiver caído, abre outra e tenta mais uma vez.
+
+        Raises:
+            smtplib.SMTPException / OSError se o envio falhar
+        """
+        for tentativa in range(2):
+            server = self._obter()
+            try:
+                with medir("smtp"):
+                    server.send_message(msg)
+            except Exception as e:
+                if _conexao_perdida(e):
+                    self._descartar(server)
+                    if tentativa == 0:
+                        incrementar("smtp_reconexoes_total")
+                        continue
+                else:
+                    self._devolver(server)
+                raise
+            self._devolver(server)
+            return
+
+    def fechar(self):
+        """Encerra todas as conexões ociosas do pool."""
+        with self._condicao:
+            ociosas, self._livres = self._livres, []
+        for server in ociosas:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+            self._liberar_vaga()
+
+
+# Pool compartilhado pelo processo (criado sob demanda)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _obter_pool():
+    """Retorna o pool SMTP compartilhado."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolSMTP(SMTP_POOL_CONEXOES)
+        return _pool
+
+
+def fechar_conexoes_smtp():
+    """Encerra as conexões SMTP abertas ao final do envio."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
 
 
 def enviar_email(destinatario, assunto, corpo_html):
     """
-    Envia email via SMTP do Gmail.
+    Envia email via SMTP do Gmail, reutilizando conexões do pool compartilhado.
 
     Args:
         destinatario: Email do destinatário
@@ -404,16 +616,14 @@ def enviar_email(destinatario, assunto, corpo_html):
         msg['From'] = REMETENTE_EMAIL
         msg['To'] = destinatario
 
-        context = ssl.create_default_context()
-
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context) as server:
-            server.login(REMETENTE_EMAIL, REMETENTE_SENHA)
-            server.send_message(msg)
+        _obter_pool().enviar(msg)
 
-        print(f"  ✓ Email enviado para {destinatario}")
+        log(f"  ✓ Email enviado para {destinatario}")
+        incrementar("emails_total", resultado="enviado")
         return True
 
     except Exception as e:
-        print(f"  ✗ Erro ao enviar email para {destinatario}: {e}")
+        log_erro(f"  ✗ Erro ao enviar email para {destinatario}: {e}")
+        incrementar("emails_total", resultado="falha")
         return False
 
@@ -0,0 +1,377 @@
+"""
+Checkpoint de execução e registro de envios (retomada de execuções).
+
+Cada execução tem um identificador (run ID) e um diretório próprio em
+EXECUCOES_DIR com:
+  - manifesto.json: período de busca e horário de início
+  - tickers/<TICKER>.json: resultado da fase 1 de cada ticker
+  - precos.json: preços usados nos emails
+  - envios.sqlite3: registro durável dos emails já entregues
+  - shards/<i>-de-<N>.json: marca de conclusão de cada shard da fase 1
+
+Se a execução cair no meio (SMTP fora do ar, OOM, timeout do CI),
+`python main.py --resume` reaproveita o que já foi feito: os tickers com
+checkpoint não voltam ao Event Registry nem à OpenAI, e quem já recebeu
+o email não recebe de novo.
+
+O mesmo diretório serve à execução em shards (`--shard i/N`): vários
+processos, na mesma máquina ou em hosts com EXECUCOES_DIR em um sistema
+de arquivos compartilhado, gravam a fase 1 da sua fatia de tickers e um
+coordenador (`--coordenar`) junta tudo e faz a fase 2.
+"""
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from .utils import log_erro
+from .config import EXECUCOES_DIR, EXECUCOES_RETENCAO_DIAS
+
+
+def novo_run_id():
+    """Identificador de uma nova execução (ex: '20240115-090000')."""
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def ultimo_run_id(diretorio=None):
+    """
+    Retorna o run ID da execução mais recente com checkpoint.
+
+    Returns:
+        String com o run ID ou None se não houver execuções
+    """
+    diretorio = diretorio or EXECUCOES_DIR
+    if not os.path.isdir(diretorio):
+        return None
+    execucoes = [
+        nome for nome in os.listdir(diretorio)
+        if os.path.exists(os.path.join(diretorio, nome, "manifesto.json"))
+    ]
+    if not execucoes:
+        return None
+    return max(execucoes, key=lambda nome: os.path.getmtime(os.path.join(diretorio, nome, "manifesto.json")))
+
+
+def limpar_execucoes_antigas(diretorio=None, manter=None):
+    """
+    Remove os diretórios de execuções mais antigas que EXECUCOES_RETENCAO_DIAS.
+
+    Args:
+        diretorio: Diretório das execuções (padrão: EXECUCOES_DIR)
+        manter: Run ID que nunca deve ser removido (a execução atual)
+
+    Returns:
+        Quantidade de execuções removidas
+    """
+    diretorio = diretorio or EXECUCOES_DIR
+    if EXECUCOES_RETENCAO_DIAS <= 0 or not os.path.isdir(diretorio):
+        return 0
+    limite = time.time() - EXECUCOES_RETENCAO_DIAS * 86400
+    removidas = 0
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        if nome == manter or not os.path.isdir(caminho):
+            continue
+        try:
+            if os.path.getmtime(caminho) < limite:
+                shutil.rmtree(caminho)
+                removidas += 1
+        except OSError as e:
+            log_erro(f"  ⚠ Erro ao remover execução antiga {nome}: {e}")
+    return removidas
+
+
+def parsear_shard(valor):
+    """
+    Converte 'i/N' (1 <= i <= N) em tupla (i, N).
+
+    Raises:
+        ValueError se o formato for inválido
+    """
+    partes = valor.split("/")
+    if len(partes) != 2 or not all(p.strip().isdigit() for p in partes):
+        raise ValueError(f"Shard inválido: {valor!r} (use i/N, ex: 2/4)")
+    indice, total = int(partes[0]), int(partes[1])
+    if not 1 <= indice <= total:
+        raise ValueError(f"Shard inválido: {valor!r} (i precisa estar entre 1 e N)")
+    return indice, total
+
+
+def particionar_tickers(tickers, total, assinantes=None):
+    """
+    Divide os tickers em `total` fatias de forma determinística.
+
+    Sem `assinantes`, cada ticker vai para a fatia crc32(ticker) % total:
+    a divisão não depende da lista de usuários, então processos que leram
+    a planilha em momentos diferentes continuam concordando. Com
+    `assinantes`, os tickers mais acompanhados são distribuídos primeiro,
+    sempre para a fatia com menos assinantes somados (equilibra a carga
+    quando poucos tickers concentram os usuários).
+
+    Args:
+        tickers: Iterável de tickers
+        total: Número de fatias
+        assinantes: Counter opcional {ticker: número de usuários}
+
+    Returns:
+        Lista com `total` listas ordenadas de tickers (fatia i-1 = shard i)
+    """
+    fatias = [[] for _ in range(total)]
+    if assinantes is None:
+        for ticker in tickers:
+            fatias[zlib.crc32(ticker.encode("utf-8")) % total].append(ticker)
+    else:
+        cargas = [0] * total
+        for ticker in sorted(tickers, key=lambda t: (-assinantes.get(t, 0), t)):
+            destino = min(range(total), key=lambda i: (cargas[i], i))
+            fatias[destino].append(ticker)
+            cargas[destino] += max(assinantes.get(ticker, 0), 1)
+    return [sorted(fatia) for fatia in fatias]
+
+
+def _gravar_json_atomico(caminho, dados):
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log_erro(f"  ⚠ Checkpoint ilegível ({os.path.basename(caminho)}): {e}")
+        return None
+
+
+class CheckpointExecucao:
+    """
+    Checkpoint de uma execução identificada por `run_id`.
+
+    Os arquivos são gravados de forma atômica (arquivo temporário +
+    os.replace), então um processo interrompido nunca deixa um
+    checkpoint pela metade.
+    """
+
+    def __init__(self, run_id, diretorio=None):
+        if not re.fullmatch(r"[\w.-]+", run_id):
+            raise ValueError(f"Run ID inválido: {run_id!r} (use letras, números, '.', '-' ou '_')")
+        self.run_id = run_id
+        self.diretorio = os.path.join(diretorio or EXECUCOES_DIR, run_id)
+        self._dir_tickers = os.path.join(self.diretorio, "tickers")
+        os.makedirs(self._dir_tickers, exist_ok=True)
+        self._lock = threading.Lock()
+        self._envios = None
+
+    # ---------------------------------------------------------
+    # Manifesto
+    # ---------------------------------------------------------
+
+    def carregar_manifesto(self):
+        """Retorna o manifesto da execução ou None se ainda não existir."""
+        return _ler_json(os.path.join(self.diretorio, "manifesto.json"))
+
+    def salvar_manifesto(self, **dados):
+        """Grava o manifesto (ex: data_inicio, data_fim) junto com o horário de início."""
+        manifesto = {'run_id': self.run_id, 'iniciado_em': datetime.now().isoformat(timespec='seconds'), **dados}
+        _gravar_json_atomico(os.path.join(self.diretorio, "manifesto.json"), manifesto)
+        return manifesto
+
+    def obter_ou_criar_manifesto(self, **dados):
+        """
+        Cria o manifesto só se ele ainda não existir e retorna o que valer.
+
+        Usado pelos shards: o primeiro processo define o período e os
+        demais adotam o mesmo. A criação usa os.link, que falha se o
+        arquivo já existir, inclusive entre hosts.
+        """
+        caminho = os.path.join(self.diretorio, "manifesto.json")
+        manifesto = self.carregar_manifesto()
+        if manifesto is not None:
+            return manifesto
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({'run_id': self.run_id, 'iniciado_em': datetime.now().isoformat(timespec='seconds'), **dados},
+                      f, ensure_ascii=False)
+        try:
+            os.link(temporario, caminho)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temporario)
+        return self.carregar_manifesto()
+
+    # ---------------------------------------------------------
+    # Fase 1 (por ticker)
+    # ---------------------------------------------------------
+
+    def _caminho_ticker(self, ticker):
+        """
+        Caminho do checkpoint de um ticker.
+
+        Os tickers vêm da planilha dos usuários; nomes fora do padrão do
+        run_id (ex: com '/' ou '..') ficariam fora do diretório da execução.
+
+        Returns:
+            Caminho do arquivo ou None se o ticker não for um nome válido
+        """
+        if not re.fullmatch(r"[\w.-]+", ticker) or ticker in (".", ".."):
+            return None
+        return os.path.join(self._dir_tickers, f"{ticker}.json")
+
+    def salvar_ticker(self, ticker, contexto, analises, resumo, consolidado):
+        """Grava o resultado da fase 1 de um ticker."""
+        caminho = self._caminho_ticker(ticker)
+        if caminho is None:
+            log_erro(f"  ⚠ Ticker inválido para checkpoint: {ticker!r}")
+            return
+        try:
+            _gravar_json_atomico(caminho, {
+                'ticker': ticker,
+                'contexto': contexto,
+                'analises': analises,
+                'resumo': resumo,
+                'consolidado': consolidado,
+            })
+        except Exception as e:
+            log_erro(f"  ⚠ Erro ao gravar checkpoint de {ticker}: {e}")
+
+    def carregar_tickers(self, tickers):
+        """
+        Carrega os checkpoints da fase 1 disponíveis.
+
+        Args:
+            tickers: Tickers de interesse
+
+        Returns:
+            Dicionário {ticker: (contexto, analises, resumo, consolidado)}
+        """
+        resultados = {}
+        for ticker in tickers:
+            caminho = self._caminho_ticker(ticker)
+            dados = _ler_json(caminho) if caminho else None
+            if dados is not None:
+                resultados[ticker] = (dados['contexto'], dados['analises'], dados['resumo'], dados['consolidado'])
+        return resultados
+
+    # ---------------------------------------------------------
+    # Shards
+    # ---------------------------------------------------------
+
+    def registrar_shard(self, indice, total, tickers, concluidos):
+        """Marca o shard como concluído (com os tickers da fatia e quantos terminaram sem erro)."""
+        diretorio = os.path.join(self.diretorio, "shards")
+        os.makedirs(diretorio, exist_ok=True)
+        _gravar_json_atomico(os.path.join(diretorio, f"{indice}-de-{total}.json"), {
+            'indice': indice,
+            'total': total,
+            'tickers': list(tickers),
+            'concluidos': concluidos,
+            'host': os.uname().nodename if hasattr(os, "uname") else "",
+            'pid': os.getpid(),
+            'concluido_em': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def shards_concluidos(self):
+        """
+        Lê as marcas dos shards que já terminaram.
+
+        Returns:
+            Tupla (total_esperado ou None, {indice: marca})
+        """
+        diretorio = os.path.join(self.diretorio, "shards")
+        if not os.path.isdir(diretorio):
+            return None, {}
+        marcas = {}
+        for nome in os.listdir(diretorio):
+            if nome.endswith(".json"):
+                marca = _ler_json(os.path.join(diretorio, nome))
+                if marca:
+                    marcas[marca['indice']] = marca
+        totais = {marca['total'] for marca in marcas.values()}
+        return (max(totais) if totais else None), marcas
+
+    def aguardar_shards(self, espera_max, intervalo=5):
+        """
+        Espera até todos os shards registrarem conclusão ou `espera_max` segundos.
+
+        Returns:
+            Tupla (total_esperado ou None, {indice: marca}) do último estado lido
+        """
+        limite = time.monotonic() + espera_max
+        while True:
+            total, marcas = self.shards_concluidos()
+            if total is not None and len(marcas) >= total:
+                return total, marcas
+            if time.monotonic() >= limite:
+                return total, marcas
+            time.sleep(min(intervalo, max(limite - time.monotonic(), 0)))
+
+    # ---------------------------------------------------------
+    # Preços
+    # ---------------------------------------------------------
+
+    def carregar_precos(self):
+        """Retorna os preços gravados na execução ou None."""
+        return _ler_json(os.path.join(self.diretorio, "precos.json"))
+
+    def salvar_precos(self, precos):
+        """Grava os preços usados nos emails da execução."""
+        try:
+            _gravar_json_atomico(os.path.join(self.diretorio, "precos.json"), precos)
+        except Exception as e:
+            log_erro(f"  ⚠ Erro ao gravar checkpoint de preços: {e}")
+
+    # ---------------------------------------------------------
+    # Registro de envios
+    # ---------------------------------------------------------
+
+    def _obter_envios(self):
+        if self._envios is None:
+            conexao = sqlite3.connect(
+                os.path.join(self.diretorio, "envios.sqlite3"), timeout=30, check_same_thread=False
+            )
+            # Journal padrão (sem WAL): o diretório pode estar em um sistema de arquivos de rede
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS envios (
+                    email TEXT PRIMARY KEY,
+                    enviado_em TEXT NOT NULL,
+                    noticias INTEGER NOT NULL
+                )
+            """)
+            conexao.commit()
+            self._envios = conexao
+        return self._envios
+
+    def emails_enviados(self):
+        """Conjunto (em minúsculas) dos emails já entregues nesta execução."""
+        with self._lock:
+            linhas = self._obter_envios().execute("SELECT email FROM envios").fetchall()
+        return {email for (email,) in linhas}
+
+    def registrar_envio(self, email, noticias):
+        """Registra (com commit imediato) que o email foi entregue."""
+        try:
+            with self._lock:
+                conexao = self._obter_envios()
+                conexao.execute(
+                    "INSERT OR REPLACE INTO envios (email, enviado_em, noticias) VALUES (?, ?, ?)",
+                    (email.strip().lower(), datetime.now().isoformat(timespec='seconds'), noticias)
+                )
+                conexao.commit()
+        except Exception as e:
+            log_erro(f"  ⚠ Erro ao registrar envio para {email}: {e}")
+
+    def fechar(self):
+        """Fecha o registro de envios."""
+        with self._lock:
+            if self._envios is not None:
+                self._envios.close()
+                self._envios = None
@@ -0,0 +1,160 @@
+"""
+Ingestão incremental de notícias com marca d'água por ticker.
+
+Guarda, para cada ticker, o horário do artigo mais recente já analisado
+e as análises da janela de HORAS_RETROATIVAS. Assim, uma nova execução
+busca só o que saiu depois da marca e reaproveita o restante.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from .config import INGESTAO_PATH, HORAS_RETROATIVAS
+
+_conexao = None
+_lock = threading.Lock()
+
+# Resultado de um artigo deixado de fora de propósito (sem corpo, cópia de
+# um artigo descartado, reprovado no pré-filtro). Diferente de None (falha
+# na análise), ele conta como visto e não segura a marca d'água.
+DESCARTADO = object()
+
+
+def _inicio_janela():
+    """Início da janela de análise (UTC, mesmo formato do Event Registry)."""
+    inicio = datetime.now(timezone.utc) - timedelta(hours=HORAS_RETROATIVAS)
+    return inicio.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _obter_conexao():
+    """Abre (uma única vez) o banco de ingestão e descarta artigos fora da janela."""
+    global _conexao
+    if _conexao is None:
+        os.makedirs(os.path.dirname(INGESTAO_PATH) or ".", exist_ok=True)
+        conexao = sqlite3.connect(INGESTAO_PATH, timeout=30, check_same_thread=False)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS marcas (
+                ticker TEXT PRIMARY KEY,
+                ultimo_artigo TEXT NOT NULL
+            )
+        """)
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS artigos (
+                ticker TEXT NOT NULL,
+                uri TEXT NOT NULL,
+                data_artigo TEXT NOT NULL,
+                analise TEXT NOT NULL,
+                PRIMARY KEY (ticker, uri)
+            )
+        """)
+        conexao.execute("DELETE FROM artigos WHERE data_artigo < ?", (_inicio_janela(),))
+        conexao.commit()
+        _conexao = conexao
+    return _conexao
+
+
+def _chave_artigo(artigo):
+    """Identificador estável do artigo (URI do Event Registry ou URL)."""
+    return artigo.get('uri') or artigo.get('url') or artigo.get('title', '')
+
+
+def obter_marcas(tickers):
+    """
+    Retorna a marca d'água (dateTime do último artigo analisado) de cada ticker.
+
+    Returns:
+        Dicionário {ticker: dateTime_iso ou None}
+    """
+    with _lock:
+        conexao = _obter_conexao()
+        marcas = dict(conexao.execute("SELECT ticker, ultimo_artigo FROM marcas").fetchall())
+
+    # A marca nunca recua para antes da janela atual
+    inicio = _inicio_janela()
+    return {t: max(marcas[t], inicio) if t in marcas else None for t in tickers}
+
+
+def filtrar_novos(ticker, artigos):
+    """
+    Remove os artigos que já foram analisados para o ticker.
+
+    Returns:
+        Lista de artigos ainda não vistos
+    """
+    if not artigos:
+        return []
+    with _lock:
+        conexao = _obter_conexao()
+        vistos = {
+            linha[0] for linha in conexao.execute(
+                "SELECT uri FROM artigos WHERE ticker = ?", (ticker,)
+            )
+        }
+    return [a for a in artigos if _chave_artigo(a) not in vistos]
+
+
+def registrar(ticker, artigos, resultados):
+    """
+    Grava as análises novas e avança a marca d'água do ticker.
+
+    Artigos DESCARTADO são gravados sem análise (não voltam a ser
+    analisados) e não seguram a marca. Artigos cuja análise falhou (None)
+    não são gravados: a marca para no artigo falho mais antigo, mesmo que
+    a marca salva já estivesse depois dele, para que ele seja buscado de novo.
+
+    Args:
+        ticker: Ticker analisado
+        artigos: Lista de artigos novos
+        resultados: Lista alinhada com `artigos` (análise, DESCARTADO ou None)
+    """
+    vistos = [(a, r) for a, r in zip(artigos, resultados) if r is not None]
+    falhos = [a.get('dateTime', '') for a, r in zip(artigos, resultados) if r is None and a.get('dateTime')]
+
+    datas = [a.get('dateTime', '') for a, _ in vistos if a.get('dateTime')]
+    if not datas and not falhos:
+        return
+    nova_marca = min(falhos) if falhos else max(datas)
+
+    with _lock:
+        conexao = _obter_conexao()
+        conexao.executemany(
+            "INSERT OR REPLACE INTO artigos (ticker, uri, data_artigo, analise) VALUES (?, ?, ?, ?)",
+            [
+                (ticker, _chave_artigo(a), a.get('dateTime', ''),
+                 json.dumps(None if r is DESCARTADO else r, ensure_ascii=False))
+                for a, r in vistos
+            ]
+        )
+        if falhos:
+            # Recuar é intencional: a próxima busca volta até o artigo falho
+            conexao.execute(
+                "INSERT OR REPLACE INTO marcas (ticker, ultimo_artigo) VALUES (?, ?)",
+                (ticker, nova_marca)
+            )
+        else:
+            conexao.execute(
+                "INSERT INTO marcas (ticker, ultimo_artigo) VALUES (?, ?) "
+                "ON CONFLICT(ticker) DO UPDATE SET ultimo_artigo = MAX(ultimo_artigo, excluded.ultimo_artigo)",
+                (ticker, nova_marca)
+            )
+        conexao.commit()
+
+
+def analises_janela(ticker):
+    """
+    Retorna todas as análises do ticker dentro da janela atual,
+    das mais recentes para as mais antigas.
+
+    Returns:
+        Lista de dicionários de análise (mesmo formato de analisar_com_gpt)
+    """
+    with _lock:
+        conexao = _obter_conexao()
+        linhas = conexao.execute(
+            "SELECT analise FROM artigos WHERE ticker = ? AND data_artigo >= ? AND analise != 'null' "
+            "ORDER BY data_artigo DESC",
+            (ticker, _inicio_janela())
+        ).fetchall()
+    return [json.loads(linha[0]) for linha in linhas]
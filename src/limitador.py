@@ -0,0 +1,205 @@
+"""
+Limitador de taxa da OpenAI (requisições e tokens por minuto).
+
+Dois baldes de fichas (token bucket) compartilhados pelo processo: um de
+requisições (RPM) e um de tokens (TPM). Antes de cada chamada,
+`openai_client.enviar_chat` reserva uma requisição e a estimativa de
+tokens da chamada; se algum balde não tiver saldo, a thread espera o
+reabastecimento em vez de tomar um 429.
+
+Os baldes se ajustam à conta real:
+  - x-ratelimit-limit-*: capacidade do balde (o limite do tier)
+  - x-ratelimit-remaining-*: saldo informado pelo servidor, que já
+    desconta o consumo de outros processos (ex: shards em paralelo)
+  - Retry-After em um 429: pausa todas as threads, não só a que recebeu
+  - usage.total_tokens: corrige a estimativa depois da resposta
+"""
+import re
+import threading
+import time
+from .config import OPENAI_LIMITE_RPM, OPENAI_LIMITE_TPM, OPENAI_BACKOFF_MAX
+from .telemetria import incrementar, observar
+from .utils import estimar_tokens
+
+# Tokens de resposta presumidos quando a chamada não define max_tokens
+TOKENS_RESPOSTA_PADRAO = 400
+
+_PADRAO_DURACAO = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def _ler_duracao(valor):
+    """
+    Converte durações no formato dos cabeçalhos da OpenAI ('1s', '6m0s', '120ms').
+
+    Returns:
+        Segundos (float) ou None se o formato não for reconhecido
+    """
+    if not valor:
+        return None
+    partes = _PADRAO_DURACAO.findall(valor)
+    if not partes:
+        try:
+            return float(valor)
+        except ValueError:
+            return None
+    multiplicadores = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(numero) * multiplicadores[unidade] for numero, unidade in partes)
+
+
+def _ler_inteiro(headers, nome):
+    valor = headers.get(nome)
+    try:
+        return int(float(valor)) if valor is not None else None
+    except ValueError:
+        return None
+
+
+def estimar_tokens_chamada(data):
+    """
+    Estima os tokens que uma chamada consome do limite TPM.
+
+    A OpenAI conta o prompt mais o máximo de tokens da resposta.
+
+    Args:
+        data: Payload do chat completion
+
+    Returns:
+        Número estimado de tokens
+    """
+    prompt = sum(estimar_tokens(m.get("content") or "") for m in data.get("messages", []))
+    resposta = data.get("max_completion_tokens") or data.get("max_tokens") or TOKENS_RESPOSTA_PADRAO
+    return prompt + resposta
+
+
+class _Balde:
+    """Balde de fichas que enche continuamente até `capacidade` por minuto."""
+
+    def __init__(self, capacidade):
+        self.capacidade = float(capacidade)
+        self.saldo = float(capacidade)
+        self.atualizado = time.monotonic()
+
+    def reabastecer(self, agora):
+        taxa = self.capacidade / 60.0
+        self.saldo = min(self.capacidade, self.saldo + (agora - self.atualizado) * taxa)
+        self.atualizado = agora
+
+    def espera_para(self, quantidade):
+        """Segundos até o saldo cobrir `quantidade` (0 se já cobre)."""
+        if self.saldo >= quantidade:
+            return 0.0
+        return (quantidade - self.saldo) / (self.capacidade / 60.0)
+
+
+class LimitadorTaxa:
+    """
+    Limitador de requisições e tokens por minuto, seguro entre threads.
+
+    Args:
+        limite_rpm: Requisições por minuto (0 desliga o balde de requisições)
+        limite_tpm: Tokens por minuto (0 desliga o balde de tokens)
+    """
+
+    def __init__(self, limite_rpm, limite_tpm):
+        self._lock = threading.Lock()
+        self._requisicoes = _Balde(limite_rpm) if limite_rpm > 0 else None
+        self._tokens = _Balde(limite_tpm) if limite_tpm > 0 else None
+        self._pausado_ate = 0.0
+
+    def reservar(self, tokens):
+        """
+        Bloqueia até haver saldo para uma requisição com `tokens` tokens e o debita.
+
+        Chamadas maiores que a capacidade do balde esperam o balde cheio
+        (em vez de esperar para sempre).
+
+        Returns:
+            Segundos esperados
+        """
+        espera_total = 0.0
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                espera = max(self._pausado_ate - agora, 0.0)
+                for balde, quantidade in ((self._requisicoes, 1), (self._tokens, tokens)):
+                    if balde is not None:
+                        balde.reabastecer(agora)
+                        espera = max(espera, balde.espera_para(min(quantidade, balde.capacidade)))
+                if espera <= 0:
+                    if self._requisicoes is not None:
+                        self._requisicoes.saldo -= 1
+                    if self._tokens is not None:
+                        self._tokens.saldo -= min(tokens, self._tokens.capacidade)
+                    break
+            time.sleep(espera)
+            espera_total += espera
+
+        if espera_total:
+            incrementar("openai_limitador_esperas_total")
+            observar("openai_limitador_espera_segundos", espera_total)
+        return espera_total
+
+    def ajustar_tokens(self, estimados, reais):
+        """Corrige o balde de tokens com o consumo real informado em usage.total_tokens."""
+        if self._tokens is None or reais is None:
+            return
+        with self._lock:
+            self._tokens.saldo -= reais - estimados
+
+    def atualizar(self, headers):
+        """
+        Sincroniza os baldes com os cabeçalhos x-ratelimit-* de uma resposta.
+
+        O limite passa a ser a capacidade do balde e o saldo nunca fica
+        acima do restante informado pelo servidor.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            for balde, sufixo in ((self._requisicoes, "requests"), (self._tokens, "tokens")):
+                if balde is None:
+                    continue
+                limite = _ler_inteiro(headers, f"x-ratelimit-limit-{sufixo}")
+                restante = _ler_inteiro(headers, f"x-ratelimit-remaining-{sufixo}")
+                balde.reabastecer(agora)
+                if limite:
+                    balde.capacidade = float(limite)
+                    balde.saldo = min(balde.saldo, balde.capacidade)
+                if restante is not None:
+                    balde.saldo = min(balde.saldo, float(restante))
+
+    def pausar(self, segundos, headers=None):
+        """
+        Suspende todas as reservas por `segundos` (Retry-After de um 429).
+
+        Sem Retry-After, usa x-ratelimit-reset-requests/tokens quando houver.
+        A pausa é limitada a OPENAI_BACKOFF_MAX, como o backoff de cada
+        chamada, para que um cabeçalho absurdo não trave todas as threads.
+        """
+        if headers is not None:
+            resets = [
+                _ler_duracao(headers.get(f"x-ratelimit-reset-{sufixo}"))
+                for sufixo in ("requests", "tokens")
+            ]
+            resets = [r for r in resets if r is not None]
+            if resets and segundos is None:
+                segundos = max(resets)
+        if not segundos:
+            return
+        segundos = min(segundos, OPENAI_BACKOFF_MAX)
+        with self._lock:
+            self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+        incrementar("openai_limitador_pausas_total")
+
+
+# Limitador compartilhado pelo processo (criado sob demanda)
+_limitador = None
+_limitador_lock = threading.Lock()
+
+
+def obter_limitador():
+    """Retorna o limitador compartilhado, configurado por OPENAI_LIMITE_RPM/TPM."""
+    global _limitador
+    with _limitador_lock:
+        if _limitador is None:
+            _limitador = LimitadorTaxa(OPENAI_LIMITE_RPM, OPENAI_LIMITE_TPM)
+        return _limitador
@@ -0,0 +1,147 @@
+"""
+Cache persistente (SQLite) para respostas da OpenAI.
+
+A chave é o hash do payload completo da requisição (modelo, temperatura
+e mensagens), que já inclui o corpo do artigo, o ticker e o contexto.
+Assim, qualquer mudança em um desses itens gera uma nova entrada.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from .utils import log_erro
+from .config import (
+    LLM_CACHE_ATIVO,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_HORAS,
+    LLM_CACHE_MAX_ENTRADAS
+)
+
+# Verifica o limite de tamanho a cada N gravações
+_INTERVALO_EVICCAO = 100
+
+_conexao = None
+_lock = threading.Lock()
+_gravacoes = 0
+_estatisticas = {'hits': 0, 'misses': 0}
+
+
+def gerar_chave(payload):
+    """
+    Gera a chave de cache (SHA-256) para um payload de chat completion.
+    """
+    serializado = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+
+def _obter_conexao():
+    """Abre (uma única vez) a conexão SQLite e remove entradas expiradas."""
+    global _conexao
+    if _conexao is None:
+        os.makedirs(os.path.dirname(LLM_CACHE_PATH) or ".", exist_ok=True)
+        conexao = sqlite3.connect(LLM_CACHE_PATH, timeout=30, check_same_thread=False)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                conteudo TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        conexao.execute("CREATE INDEX IF NOT EXISTS idx_acessado_em ON respostas (acessado_em)")
+        conexao.execute(
+            "DELETE FROM respostas WHERE criado_em < ?",
+            (time.time() - LLM_CACHE_TTL_HORAS * 3600,)
+        )
+        _aplicar_limite(conexao)
+        conexao.commit()
+        _conexao = conexao
+    return _conexao
+
+
+def _aplicar_limite(conexao):
+    """Remove as entradas acessadas há mais tempo quando o cache passa do limite."""
+    total = conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+    excesso = total - LLM_CACHE_MAX_ENTRADAS
+    if excesso > 0:
+        conexao.execute(
+            "DELETE FROM respostas WHERE chave IN "
+            "(SELECT chave FROM respostas ORDER BY acessado_em ASC LIMIT ?)",
+            (excesso,)
+        )
+
+
+def buscar(payload):
+    """
+    Busca a resposta em cache para um payload.
+
+    Returns:
+        Conteúdo da resposta (str) ou None se não houver entrada válida
+    """
+    if not LLM_CACHE_ATIVO:
+        return None
+
+    chave = gerar_chave(payload)
+    agora = time.time()
+    try:
+        with _lock:
+            conexao = _obter_conexao()
+            linha = conexao.execute(
+                "SELECT conteudo, criado_em FROM respostas WHERE chave = ?",
+                (chave,)
+            ).fetchone()
+
+            if linha and agora - linha[1] <= LLM_CACHE_TTL_HORAS * 3600:
+                conexao.execute(
+                    "UPDATE respostas SET acessado_em = ? WHERE chave = ?",
+                    (agora, chave)
+                )
+                conexao.commit()
+                _estatisticas['hits'] += 1
+                return linha[0]
+
+            _estatisticas['misses'] += 1
+            return None
+    except sqlite3.Error as e:
+        log_erro(f"  ⚠ Erro ao ler cache de IA: {e}")
+        return None
+
+
+def salvar(payload, conteudo):
+    """
+    Grava a resposta de um payload no cache.
+    """
+    global _gravacoes
+    if not LLM_CACHE_ATIVO:
+        return
+
+    chave = gerar_chave(payload)
+    agora = time.time()
+    try:
+        with _lock:
+            conexao = _obter_conexao()
+            conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, conteudo, criado_em, acessado_em) "
+                "VALUES (?, ?, ?, ?)",
+                (chave, conteudo, agora, agora)
+            )
+            _gravacoes += 1
+            if _gravacoes % _INTERVALO_EVICCAO == 0:
+                _aplicar_limite(conexao)
+            conexao.commit()
+    except sqlite3.Error as e:
+        log_erro(f"  ⚠ Erro ao gravar cache de IA: {e}")
+
+
+def obter_estatisticas():
+    """
+    Retorna os contadores de acertos e falhas do cache nesta execução.
+
+    Returns:
+        Dicionário {'hits': int, 'misses': int}
+    """
+    with _lock:
+        return dict(_estatisticas)
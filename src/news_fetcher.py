@@ -1,11 +1,48 @@
 """
 Módulo para busca de notícias usando Event Registry API.
 """
+import re
+import threading
 from eventregistry import EventRegistry, QueryArticlesIter
-from .config import EVENT_REGISTRY_API_KEY, MAX_NOTICIAS_POR_TICKER
+from .telemetria import medir
+from .utils import log, log_erro
+from .config import (
+    EVENT_REGISTRY_API_KEY,
+    MAX_NOTICIAS_POR_TICKER,
+    NOTICIAS_TICKERS_POR_CONSULTA
+)
 
+# Cliente compartilhado (criado sob demanda)
+_cliente = None
+_cliente_lock = threading.Lock()
 
-def buscar_noticias(ticker, data_inicio, data_fim, max_items=None):
+
+def _obter_cliente():
+    """Retorna o cliente EventRegistry compartilhado pelo processo."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = EventRegistry(apiKey=EVENT_REGISTRY_API_KEY)
+        return _cliente
+
+
+def _parametros_incrementais(data_inicio, desde):
+    """
+    Ajusta a consulta para a busca incremental.
+
+    Com uma marca d'água, a data inicial avança até o dia da marca e os
+    resultados vêm ordenados por data, para que a paginação pare no
+    primeiro artigo anterior à marca.
+
+    Returns:
+        Tupla (data_inicio, argumentos_extras_de_execQuery)
+    """
+    if not desde:
+        return data_inicio, {}
+    return max(data_inicio, desde[:10]), {"sortBy": "date", "sortByAsc": False}
+
+
+def buscar_noticias(ticker, data_inicio, data_fim, max_items=None, desde=None):
     """
     Busca notícias sobre um ticker específico usando Event Registry API.
 
@@ -14,6 +51,8 @@ def buscar_noticias(ticker, data_inicio, data_fim, max_items=None):
         data_inicio: Data início no formato YYYY-MM-DD
         data_fim: Data fim no formato YYYY-MM-DD
         max_items: Número máximo de artigos a retornar
+        desde: Marca d'água (dateTime ISO); se informada, só artigos
+            publicados a partir dela são retornados
 
     Returns:
         Lista de dicionários com artigos
@@ -21,8 +60,10 @@ def buscar_noticias(ticker, data_inicio, data_fim, max_items=None):
     if max_items is None:
         max_items = MAX_NOTICIAS_POR_TICKER
 
+    data_inicio, extras = _parametros_incrementais(data_inicio, desde)
+
     try:
-        er = EventRegistry(apiKey=EVENT_REGISTRY_API_KEY)
+        er = _obter_cliente()
 
         query = {
             "$query": {
@@ -42,13 +83,141 @@ def buscar_noticias(ticker, data_inicio, data_fim, max_items=None):
         q = QueryArticlesIter.initWithComplexQuery(query)
         artigos = []
 
-        for article in q.execQuery(er, maxItems=max_items):
-            artigos.append(article)
+        with medir("event_registry", tickers=1):
+            for article in q.execQuery(er, maxItems=max_items, **extras):
+                # Ordenado por data: o restante já foi visto em execuções anteriores
+                if desde and article.get('dateTime', '') < desde:
+                    break
+                artigos.append(article)
 
-        print(f"  ✓ {ticker}: {len(artigos)} notícias encontradas")
+        log(f"  ✓ {ticker}: {len(artigos)} notícias encontradas")
         return artigos
 
     except Exception as e:
-        print(f"  ✗ Erro ao buscar notícias de {ticker}: {e}")
+        log_erro(f"  ✗ Erro ao buscar notícias de {ticker}: {e}")
         return []
 
+
+def _buscar_grupo(grupo, data_inicio, data_fim, max_items, resultado, desde):
+    """
+    Executa uma única consulta com os tickers do grupo unidos por OR e
+    distribui cada artigo para todos os tickers citados no corpo.
+
+    Returns:
+        Tickers que ficaram abaixo de `max_items` porque a consulta bateu
+        no teto compartilhado (podem ter mais artigos fora do que voltou)
+    """
+    er = _obter_cliente()
+    marcas = [desde.get(t) for t in grupo]
+    # Só dá para parar cedo se todos os tickers do grupo tiverem marca
+    marca_grupo = min(marcas) if all(marcas) else None
+    data_inicio, extras = _parametros_incrementais(data_inicio, marca_grupo)
+    padroes = {t: re.compile(rf"\b{re.escape(t)}\b", re.IGNORECASE) for t in grupo}
+
+    query = {
+        "$query": {
+            "$and": [
+                {
+                    "$or": [{"keyword": t, "keywordLoc": "body"} for t in grupo]
+                },
+                {
+                    "dateStart": data_inicio,
+                    "dateEnd": data_fim
+                }
+            ]
+        }
+    }
+
+    q = QueryArticlesIter.initWithComplexQuery(query)
+    pendentes = set(grupo)
+    teto = max_items * len(grupo)
+    recebidos = 0
+    esgotou = True
+
+    with medir("event_registry", tickers=len(grupo)):
+        for article in q.execQuery(er, maxItems=teto, **extras):
+            recebidos += 1
+            data_artigo = article.get('dateTime', '')
+            if marca_grupo and data_artigo < marca_grupo:
+                # Ordenado por data: daqui para trás tudo já foi visto
+                esgotou = False
+                break
+            body = article.get('body', '')
+            for ticker in list(pendentes):
+                if desde.get(ticker) and data_artigo < desde[ticker]:
+                    continue
+                if padroes[ticker].search(body):
+                    resultado[ticker].append(article)
+                    if len(resultado[ticker]) >= max_items:
+                        pendentes.discard(ticker)
+            # Todos os tickers do grupo já atingiram o limite
+            if not pendentes:
+                break
+
+    # Um ticker com muitas notícias pode ter ocupado o teto compartilhado
+    if esgotou and recebidos >= teto:
+        return pendentes
+    return set()
+
+
+def _completar_ticker(ticker, data_inicio, data_fim, max_items, resultado, desde):
+    """
+    Consulta individual para completar um ticker que ficou abaixo do limite
+    na busca combinada, sem repetir artigos que já vieram.
+    """
+    vistos = {a.get('uri') or a.get('url') for a in resultado[ticker]}
+    for artigo in buscar_noticias(ticker, data_inicio, data_fim, max_items, desde=desde.get(ticker)):
+        if len(resultado[ticker]) >= max_items:
+            break
+        chave = artigo.get('uri') or artigo.get('url')
+        if chave not in vistos:
+            vistos.add(chave)
+            resultado[ticker].append(artigo)
+
+
+def buscar_noticias_multiplos(tickers, data_inicio, data_fim, max_items=None, desde=None):
+    """
+    Busca notícias de vários tickers com consultas combinadas.
+
+    Os tickers são agrupados (NOTICIAS_TICKERS_POR_CONSULTA por consulta)
+    e cada artigo retornado é roteado para todos os tickers cujo código
+    aparece no corpo, respeitando o limite de artigos por ticker.
+    Se a consulta de um grupo bater no teto compartilhado, os tickers que
+    ficaram abaixo do limite são completados com consultas individuais;
+    se ela falhar, seus tickers são buscados um a um.
+
+    Args:
+        tickers: Lista ou set de tickers
+        data_inicio: Data início no formato YYYY-MM-DD
+        data_fim: Data fim no formato YYYY-MM-DD
+        max_items: Número máximo de artigos por ticker
+        desde: Dicionário {ticker: marca d'água} para busca incremental
+
+    Returns:
+        Dicionário {ticker: lista_de_artigos}
+    """
+    if max_items is None:
+        max_items = MAX_NOTICIAS_POR_TICKER
+    if desde is None:
+        desde = {}
+
+    ordenados = sorted(tickers)
+    resultado = {t: [] for t in ordenados}
+    tamanho = max(NOTICIAS_TICKERS_POR_CONSULTA, 1)
+
+    for i in range(0, len(ordenados), tamanho):
+        grupo = ordenados[i:i + tamanho]
+        try:
+            incompletos = _buscar_grupo(grupo, data_inicio, data_fim, max_items, resultado, desde)
+            for ticker in sorted(incompletos):
+                _completar_ticker(ticker, data_inicio, data_fim, max_items, resultado, desde)
+            for ticker in grupo:
+                log(f"  ✓ {ticker}: {len(resultado[ticker])} notícias encontradas")
+        except Exception as e:
+            log_erro(f"  ✗ Erro na busca combinada ({', '.join(grupo)}): {e}")
+            for ticker in grupo:
+                resultado[ticker] = buscar_noticias(
+                    ticker, data_inicio, data_fim, max_items, desde=desde.get(ticker)
+                )
+
+    return resultado
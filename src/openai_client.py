@@ -0,0 +1,256 @@
+"""
+Cliente HTTP compartilhado para a API da OpenAI.
+
+Todas as chamadas de IA passam por aqui: uma única sessão com
+conexões keep-alive, timeouts configuráveis, o limitador de taxa
+compartilhado (RPM/TPM), novas tentativas com backoff exponencial
+(respeitando Retry-After) e o cache persistente.
+
+Também acumula o uso de tokens informado pela API, incluindo os tokens
+de prompt atendidos pelo cache de prefixo da OpenAI.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from . import llm_cache
+from .telemetria import medir, incrementar
+from .limitador import obter_limitador, estimar_tokens_chamada
+from .utils import log_erro
+from .config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_MAX_CONCORRENCIA,
+    TICKERS_WORKERS,
+    OPENAI_TIMEOUT_CONEXAO,
+    OPENAI_TIMEOUT_LEITURA,
+    OPENAI_MAX_TENTATIVAS,
+    OPENAI_BACKOFF_BASE,
+    OPENAI_BACKOFF_MAX
+)
+
+# Respostas que valem uma nova tentativa
+STATUS_RETENTAVEIS = {408, 409, 429, 500, 502, 503, 504}
+
+_sessao = None
+_sessao_lock = threading.Lock()
+
+# Uso da API nesta execução (requisições que chegaram à OpenAI)
+_uso_lock = threading.Lock()
+_uso = {
+    'requisicoes': 0,
+    'prompt_tokens': 0,
+    'cached_tokens': 0,
+    'com_cache': 0,
+    'latencia_com_cache': 0.0,
+    'latencia_sem_cache': 0.0,
+}
+
+
+def _obter_sessao():
+    """Retorna a sessão HTTP compartilhada (pool de conexões keep-alive)."""
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            sessao = requests.Session()
+            # Uma conexão por thread que pode estar em voo: o pool de análise
+            # mais as threads dos tickers (contexto e digest chamam a API direto)
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=max(OPENAI_MAX_CONCORRENCIA, 1) + max(TICKERS_WORKERS, 1)
+            )
+            sessao.mount("https://", adapter)
+            sessao.mount("http://", adapter)
+            sessao.headers.update({
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+            })
+            _sessao = sessao
+        return _sessao
+
+
+def _ler_retry_after(response):
+    """
+    Lê o tempo de espera sugerido pelo servidor.
+
+    Returns:
+        Segundos a esperar ou None se o cabeçalho não existir
+    """
+    if response is None:
+        return None
+
+    valor_ms = response.headers.get("retry-after-ms")
+    if valor_ms:
+        try:
+            return float(valor_ms) / 1000
+        except ValueError:
+            pass
+
+    valor = response.headers.get("Retry-After")
+    if not valor:
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(valor).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+
+def _tempo_espera(tentativa, response=None):
+    """Backoff exponencial com jitter, ou o Retry-After informado pelo servidor."""
+    retry_after = _ler_retry_after(response)
+    if retry_after is not None:
+        return min(retry_after, OPENAI_BACKOFF_MAX)
+    teto = min(OPENAI_BACKOFF_BASE * (2 ** tentativa), OPENAI_BACKOFF_MAX)
+    return random.uniform(teto / 2, teto)
+
+
+def _registrar_uso(response_json, latencia):
+    """Acumula tokens de prompt, tokens em cache e latência de uma resposta."""
+    usage = response_json.get("usage") or {}
+    detalhes = usage.get("prompt_tokens_details") or {}
+    cached = detalhes.get("cached_tokens") or 0
+
+    incrementar("openai_tokens_total", usage.get("prompt_tokens") or 0, tipo="prompt")
+    incrementar("openai_tokens_total", usage.get("completion_tokens") or 0, tipo="completion")
+    incrementar("openai_tokens_total", cached, tipo="prompt_em_cache")
+
+    with _uso_lock:
+        _uso['requisicoes'] += 1
+        _uso['prompt_tokens'] += usage.get("prompt_tokens") or 0
+        _uso['cached_tokens'] += cached
+        if cached:
+            _uso['com_cache'] += 1
+            _uso['latencia_com_cache'] += latencia
+        else:
+            _uso['latencia_sem_cache'] += latencia
+
+
+def obter_estatisticas():
+    """
+    Retorna o uso da API nesta execução e o efeito do cache de prefixo.
+
+    Returns:
+        Dicionário com 'requisicoes', 'prompt_tokens', 'cached_tokens',
+        'taxa_cache' (fração dos tokens de prompt em cache), 'com_cache'
+        (requisições com algum token em cache), 'latencia_media_com_cache',
+        'latencia_media_sem_cache' e 'economia_latencia_s' (estimativa)
+    """
+    with _uso_lock:
+        uso = dict(_uso)
+
+    sem_cache = uso['requisicoes'] - uso['com_cache']
+    media_com = uso['latencia_com_cache'] / uso['com_cache'] if uso['com_cache'] else None
+    media_sem = uso['latencia_sem_cache'] / sem_cache if sem_cache else None
+    economia = 0.0
+    if media_com is not None and media_sem is not None:
+        economia = max(media_sem - media_com, 0.0) * uso['com_cache']
+
+    return {
+        'requisicoes': uso['requisicoes'],
+        'prompt_tokens': uso['prompt_tokens'],
+        'cached_tokens': uso['cached_tokens'],
+        'taxa_cache': uso['cached_tokens'] / uso['prompt_tokens'] if uso['prompt_tokens'] else 0.0,
+        'com_cache': uso['com_cache'],
+        'latencia_media_com_cache': media_com,
+        'latencia_media_sem_cache': media_sem,
+        'economia_latencia_s': economia,
+    }
+
+
+def enviar_chat(data):
+    """
+    Envia um chat completion com novas tentativas em erros transitórios.
+
+    Cada tentativa espera antes no limitador de taxa compartilhado, que
+    é realimentado pelos cabeçalhos de cada resposta.
+
+    Args:
+        data: Payload da requisição (model, messages, temperature...)
+
+    Returns:
+        JSON da resposta
+
+    Raises:
+        requests.HTTPError / requests.RequestException após esgotar as tentativas
+    """
+    url = f"{OPENAI_BASE_URL.rstrip('/')}/chat/completions"
+    sessao = _obter_sessao()
+    timeout = (OPENAI_TIMEOUT_CONEXAO, OPENAI_TIMEOUT_LEITURA)
+    tentativas = max(OPENAI_MAX_TENTATIVAS, 1)
+    limitador = obter_limitador()
+    tokens_estimados = estimar_tokens_chamada(data)
+
+    for tentativa in range(tentativas):
+        ultima = tentativa == tentativas - 1
+        limitador.reservar(tokens_estimados)
+        try:
+            inicio = time.monotonic()
+            with medir("openai", modelo=data.get("model")):
+                response = sessao.post(url, json=data, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if ultima:
+                incrementar("openai_falhas_total", motivo=e.__class__.__name__)
+                raise
+            incrementar("openai_retentativas_total", motivo=e.__class__.__name__)
+            espera = _tempo_espera(tentativa)
+            log_erro(f"  ⚠ Falha de conexão com a OpenAI ({e.__class__.__name__}), nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+            continue
+
+        incrementar("openai_respostas_total", status=response.status_code)
+        limitador.atualizar(response.headers)
+        if response.status_code == 429:
+            # Todas as threads param, não só a que recebeu o 429
+            limitador.pausar(_ler_retry_after(response), response.headers)
+        if response.status_code in STATUS_RETENTAVEIS and not ultima:
+            incrementar("openai_retentativas_total", motivo=response.status_code)
+            espera = _tempo_espera(tentativa, response)
+            log_erro(f"  ⚠ OpenAI respondeu {response.status_code}, nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+            continue
+
+        if response.status_code >= 400:
+            incrementar("openai_falhas_total", motivo=response.status_code)
+        response.raise_for_status()
+        response_json = response.json()
+        limitador.ajustar_tokens(tokens_estimados, (response_json.get("usage") or {}).get("total_tokens"))
+        _registrar_uso(response_json, time.monotonic() - inicio)
+        return response_json
+
+
+def completar(data, processar=None, ler_cache=True):
+    """
+    Envia um chat completion, consultando antes o cache persistente.
+
+    A resposta só é gravada no cache depois que `processar` a aceita,
+    para que respostas malformadas não sejam reaproveitadas.
+
+    Args:
+        data: Payload da requisição
+        processar: Função aplicada ao texto da resposta (padrão: strip)
+        ler_cache: Se False, ignora o cache na leitura (mas grava a resposta nova)
+
+    Returns:
+        Resultado de processar(conteudo)
+    """
+    if processar is None:
+        processar = str.strip
+
+    if ler_cache:
+        conteudo = llm_cache.buscar(data)
+        if conteudo is not None:
+            incrementar("llm_cache_total", resultado="hit")
+            return processar(conteudo)
+        incrementar("llm_cache_total", resultado="miss")
+
+    response_json = enviar_chat(data)
+    conteudo = response_json["choices"][0]["message"]["content"]
+
+    resultado = processar(conteudo)
+    llm_cache.salvar(data, conteudo)
+    return resultado
@@ -0,0 +1,175 @@
+"""
+Pré-filtro léxico local das notícias, antes de qualquer chamada de IA.
+
+O Event Registry devolve qualquer artigo que cite o ticker no corpo,
+inclusive fechamentos de mercado e tabelas em que ele aparece uma única
+vez. Cada artigo recebe aqui uma nota de 0 a 1 a partir de:
+
+- densidade de menções ao ticker no texto;
+- menções no título (ticker ou termos centrais da tese);
+- similaridade TF-IDF entre o artigo e a tese da empresa;
+- detecção de artigos-lista (muitos tickers diferentes citados).
+
+Só os artigos acima de PREFILTRO_LIMIAR seguem para a IA, limitados
+aos PREFILTRO_MAX_ARTIGOS de maior nota.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from .utils import log
+from .config import PREFILTRO_ATIVO, PREFILTRO_LIMIAR, PREFILTRO_MAX_ARTIGOS
+from .telemetria import incrementar
+
+# Pesos das features na nota final
+PESO_DENSIDADE = 0.35
+PESO_TITULO = 0.25
+PESO_SIMILARIDADE = 0.40
+
+# Penalidade para artigos-lista (fechamentos de mercado, tabelas)
+FATOR_LISTA = 0.3
+MIN_TICKERS_LISTA = 8
+
+# Menções por 100 palavras que já contam como densidade máxima
+DENSIDADE_SATURACAO = 1.0
+# Similaridade de cosseno que já conta como similaridade máxima
+SIMILARIDADE_SATURACAO = 0.2
+# Termos mais característicos da tese procurados no título
+TERMOS_TITULO = 8
+
+_PADRAO_PALAVRA = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+_PADRAO_TICKER = re.compile(r"\b[A-Z]{4}\d{1,2}\b")
+
+_STOPWORDS = frozenset("""
+que para com uma por mais dos das nos nas como mas foi são ser tem seu sua seus suas pelo pela
+pelos pelas este esta isso esse essa entre sobre após até também já ainda quando onde sem
+muito bem pode podem está estão fazer feito ano anos dia dias hoje ontem disse segundo
+the and for with that this from are was were has have will its their about after into
+""".split())
+
+_lock = threading.Lock()
+_estatisticas = {'avaliados': 0, 'descartados': 0}
+
+
+def _palavras(texto):
+    """Tokeniza o texto em palavras minúsculas, sem stopwords."""
+    return [p for p in _PADRAO_PALAVRA.findall(texto.lower()) if p not in _STOPWORDS]
+
+
+def _vetor_tfidf(contagem, idf):
+    """Vetor TF-IDF normalizado (dicionário termo -> peso)."""
+    vetor = {termo: (1 + math.log(freq)) * idf.get(termo, 0.0) for termo, freq in contagem.items()}
+    norma = math.sqrt(sum(peso * peso for peso in vetor.values()))
+    if not norma:
+        return {}
+    return {termo: peso / norma for termo, peso in vetor.items()}
+
+
+def _cosseno(a, b):
+    """Similaridade de cosseno entre dois vetores já normalizados."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(peso * b.get(termo, 0.0) for termo, peso in a.items())
+
+
+def pontuar_artigos(artigos, ticker, contexto=None):
+    """
+    Calcula a nota léxica (0 a 1) de cada artigo para o ticker.
+
+    O IDF é calculado sobre os próprios artigos mais a tese, então os
+    termos comuns a todas as notícias do dia pesam pouco.
+
+    Args:
+        artigos: Lista de dicionários de artigos
+        ticker: Ticker buscado
+        contexto: Tese estratégica da empresa (opcional)
+
+    Returns:
+        Lista de notas alinhada com `artigos`
+    """
+    if not artigos:
+        return []
+
+    contagens = [Counter(_palavras(a.get('body', ''))) for a in artigos]
+    contagem_contexto = Counter(_palavras(contexto)) if contexto else Counter()
+
+    documentos = contagens + ([contagem_contexto] if contagem_contexto else [])
+    frequencia_documentos = Counter(termo for contagem in documentos for termo in contagem)
+    total_documentos = len(documentos)
+    idf = {
+        termo: math.log((1 + total_documentos) / (1 + df)) + 1
+        for termo, df in frequencia_documentos.items()
+    }
+
+    vetor_contexto = _vetor_tfidf(contagem_contexto, idf) if contagem_contexto else {}
+    termos_centrais = {
+        termo for termo, _ in sorted(vetor_contexto.items(), key=lambda item: -item[1])[:TERMOS_TITULO]
+    }
+
+    padrao_ticker = re.compile(rf"\b{re.escape(ticker)}\b", re.IGNORECASE)
+    notas = []
+    for artigo, contagem in zip(artigos, contagens):
+        corpo = artigo.get('body', '')
+        titulo = artigo.get('title', '') or ''
+
+        total_palavras = max(sum(contagem.values()), 1)
+        mencoes = len(padrao_ticker.findall(corpo))
+        densidade = min(mencoes * 100 / total_palavras / DENSIDADE_SATURACAO, 1.0)
+
+        palavras_titulo = set(_palavras(titulo))
+        no_titulo = 1.0 if padrao_ticker.search(titulo) or palavras_titulo & termos_centrais else 0.0
+
+        if vetor_contexto:
+            similaridade = min(_cosseno(_vetor_tfidf(contagem, idf), vetor_contexto) / SIMILARIDADE_SATURACAO, 1.0)
+            nota = PESO_DENSIDADE * densidade + PESO_TITULO * no_titulo + PESO_SIMILARIDADE * similaridade
+        else:
+            nota = (PESO_DENSIDADE * densidade + PESO_TITULO * no_titulo) / (PESO_DENSIDADE + PESO_TITULO)
+
+        if len(set(_PADRAO_TICKER.findall(corpo)) - {ticker.upper()}) >= MIN_TICKERS_LISTA:
+            nota *= FATOR_LISTA
+
+        notas.append(nota)
+    return notas
+
+
+def selecionar_indices(artigos, ticker, contexto=None):
+    """
+    Escolhe as notícias com nota léxica suficiente para a análise por IA.
+
+    Args:
+        artigos: Lista de dicionários de artigos
+        ticker: Ticker buscado
+        contexto: Tese estratégica da empresa (opcional)
+
+    Returns:
+        Índices dos artigos aprovados, em ordem crescente
+    """
+    if not PREFILTRO_ATIVO or not artigos:
+        return list(range(len(artigos)))
+
+    notas = pontuar_artigos(artigos, ticker, contexto)
+    aprovados = [i for i, nota in enumerate(notas) if nota >= PREFILTRO_LIMIAR]
+    if PREFILTRO_MAX_ARTIGOS > 0 and len(aprovados) > PREFILTRO_MAX_ARTIGOS:
+        aprovados = sorted(aprovados, key=lambda i: -notas[i])[:PREFILTRO_MAX_ARTIGOS]
+        aprovados.sort()
+
+    descartados = len(artigos) - len(aprovados)
+    with _lock:
+        _estatisticas['avaliados'] += len(artigos)
+        _estatisticas['descartados'] += descartados
+    incrementar("artigos_descartados_total", descartados, motivo="prefiltro")
+
+    if descartados:
+        log(f"  🧹 {ticker}: {descartados}/{len(artigos)} notícias descartadas pelo pré-filtro")
+    return aprovados
+
+
+def obter_estatisticas():
+    """
+    Retorna quantos artigos o pré-filtro avaliou e descartou nesta execução.
+
+    Returns:
+        Dicionário {'avaliados': int, 'descartados': int}
+    """
+    with _lock:
+        return dict(_estatisticas)
@@ -1,8 +1,20 @@
 """
 Módulo para buscar preços e variações do Yahoo Finance.
 """
+import json
+import os
+import pandas as pd
+import pytz
 import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime
+from .utils import log, log_erro
+from .config import CACHE_DIR, PRECOS_CACHE_ATIVO
+from .telemetria import medir
+
+
+def _simbolo_yahoo(ticker):
+    """Adiciona .SA para tickers da B3."""
+    return f"{ticker}.SA" if not ticker.endswith('.SA') else ticker
 
 
 def buscar_preco_e_variacao(ticker):
@@ -19,15 +31,15 @@ def buscar_preco_e_variacao(ticker):
             - sucesso: Boolean indicando se a busca foi bem-sucedida
     """
     try:
-        # Adiciona .SA para tickers da B3
-        ticker_yahoo = f"{ticker}.SA" if not ticker.endswith('.SA') else ticker
+        ticker_yahoo = _simbolo_yahoo(ticker)
         
         # Buscar dados dos últimos 5 dias (para garantir que pegamos o último dia útil)
         stock = yf.Ticker(ticker_yahoo)
-        hist = stock.history(period="5d")
+        with medir("yfinance", chamada="history"):
+            hist = stock.history(period="5d")
         
         if hist.empty or len(hist) < 2:
-            print(f"  ⚠ {ticker}: Dados insuficientes no Yahoo Finance")
+            log_erro(f"  ⚠ {ticker}: Dados insuficientes no Yahoo Finance")
             return {
                 'preco_fechamento': None,
                 'variacao_percentual': None,
@@ -41,7 +53,7 @@ def buscar_preco_e_variacao(ticker):
         # Calcular variação percentual
         variacao_pct = ((preco_atual - preco_anterior) / preco_anterior) * 100
         
-        print(f"  ✓ {ticker}: R$ {preco_atual:.2f} ({variacao_pct:+.2f}%)")
+        log(f"  ✓ {ticker}: R$ {preco_atual:.2f} ({variacao_pct:+.2f}%)")
         
         return {
             'preco_fechamento': float(preco_atual),
@@ -50,7 +62,7 @@ def buscar_preco_e_variacao(ticker):
         }
         
     except Exception as e:
-        print(f"  ✗ Erro ao buscar preço de {ticker}: {e}")
+        log_erro(f"  ✗ Erro ao buscar preço de {ticker}: {e}")
         return {
             'preco_fechamento': None,
             'variacao_percentual': None,
@@ -58,10 +70,103 @@ def buscar_preco_e_variacao(ticker):
         }
 
 
+def _caminho_cache_precos():
+    """Arquivo de cache de preços do dia (timezone de São Paulo)."""
+    hoje = datetime.now(pytz.timezone('America/Sao_Paulo')).strftime('%Y-%m-%d')
+    return os.path.join(CACHE_DIR, "precos", f"{hoje}.json")
+
+
+def _carregar_cache_precos():
+    """
+    Carrega os preços já obtidos hoje.
+
+    Returns:
+        Dicionário {ticker: {preco_fechamento, variacao_percentual, sucesso}}
+    """
+    caminho = _caminho_cache_precos()
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        log_erro(f"  ⚠ Erro ao ler cache de preços: {e}")
+        return {}
+
+
+def _salvar_cache_precos(precos):
+    """Grava (de forma atômica) os preços obtidos com sucesso no cache do dia."""
+    caminho = _caminho_cache_precos()
+    try:
+        cache = _carregar_cache_precos()
+        cache.update({t: p for t, p in precos.items() if p['sucesso']})
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+    except Exception as e:
+        log_erro(f"  ⚠ Erro ao gravar cache de preços: {e}")
+
+
+def _baixar_precos_em_lote(tickers):
+    """
+    Baixa os últimos 5 dias de todos os tickers em uma única requisição
+    e calcula fechamento e variação de forma vetorizada.
+
+    Returns:
+        Dicionário {ticker: {preco_fechamento, variacao_percentual, sucesso}}
+        apenas com os tickers que tiveram dados suficientes
+    """
+    simbolos = {ticker: _simbolo_yahoo(ticker) for ticker in tickers}
+    with medir("yfinance", chamada="download", tickers=len(simbolos)):
+        dados = yf.download(
+            list(simbolos.values()),
+            period="5d",
+            auto_adjust=True,
+            group_by="column",
+            progress=False,
+            threads=True
+        )
+    if dados is None or dados.empty:
+        return {}
+
+    fechamentos = dados['Close']
+    if isinstance(fechamentos, pd.Series):
+        fechamentos = fechamentos.to_frame(name=next(iter(simbolos.values())))
+
+    # Ordem de cada cotação válida contada a partir do fim (1 = última)
+    validos = fechamentos.notna()
+    ordem = validos[::-1].cumsum()[::-1]
+    precos_atuais = fechamentos.where(validos & (ordem == 1)).max()
+    precos_anteriores = fechamentos.where(validos & (ordem == 2)).max()
+    variacoes = (precos_atuais - precos_anteriores) / precos_anteriores * 100
+
+    precos = {}
+    for ticker, simbolo in simbolos.items():
+        preco_atual = precos_atuais.get(simbolo)
+        variacao_pct = variacoes.get(simbolo)
+        if preco_atual is None or variacao_pct is None or pd.isna(preco_atual) or pd.isna(variacao_pct):
+            continue
+
+        log(f"  ✓ {ticker}: R$ {preco_atual:.2f} ({variacao_pct:+.2f}%)")
+        precos[ticker] = {
+            'preco_fechamento': float(preco_atual),
+            'variacao_percentual': float(variacao_pct),
+            'sucesso': True
+        }
+
+    return precos
+
+
 def buscar_precos_multiplos(tickers):
     """
     Busca preços e variações para múltiplos tickers.
     
+    Usa primeiro o cache do dia; os tickers restantes são baixados em
+    uma única requisição ao Yahoo Finance e só os que faltarem são
+    buscados individualmente.
+    
     Args:
         tickers: Lista ou set de tickers
         
@@ -71,17 +176,35 @@ def buscar_precos_multiplos(tickers):
     if not tickers:
         return {}
     
-    print(f"\n{'='*60}")
-    print(f"💰 BUSCANDO PREÇOS DE {len(tickers)} TICKERS")
-    print(f"{'='*60}")
+    log(f"\n{'='*60}")
+    log(f"💰 BUSCANDO PREÇOS DE {len(tickers)} TICKERS")
+    log(f"{'='*60}")
     
-    precos = {}
-    for ticker in sorted(tickers):
-        precos[ticker] = buscar_preco_e_variacao(ticker)
+    cache = _carregar_cache_precos() if PRECOS_CACHE_ATIVO else {}
+    encontrados = {t: cache[t] for t in tickers if t in cache}
+    pendentes = sorted(t for t in tickers if t not in encontrados)
+    
+    if encontrados:
+        log(f"  💾 {len(encontrados)} preços reaproveitados do cache do dia")
+    
+    if pendentes:
+        try:
+            encontrados.update(_baixar_precos_em_lote(pendentes))
+        except Exception as e:
+            log_erro(f"  ⚠ Erro no download em lote, buscando individualmente: {e}")
+        
+        novos = {}
+        for ticker in pendentes:
+            novos[ticker] = encontrados.get(ticker) or buscar_preco_e_variacao(ticker)
+        encontrados.update(novos)
+        
+        if PRECOS_CACHE_ATIVO:
+            _salvar_cache_precos(novos)
+    
+    precos = {ticker: encontrados[ticker] for ticker in sorted(tickers)}
     
     # Estatísticas
     sucessos = sum(1 for p in precos.values() if p['sucesso'])
-    print(f"\n✓ Preços obtidos: {sucessos}/{len(tickers)}")
+    log(f"\n✓ Preços obtidos: {sucessos}/{len(tickers)}")
     
     return precos
-
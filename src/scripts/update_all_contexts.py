@@ -1,40 +1,108 @@
+import argparse
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Adicionar a raiz do projeto ao path para importar src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from src.config import CONTEXTO_TTL_DIAS
 from src.sheets_client import carregar_usuarios_sheets
-from src.utils import extrair_tickers_unicos
-from src.context_manager import gerar_contexto_ia
+from src.utils import contar_assinantes, parsear_tickers, log, log_erro
+from src.context_manager import gerar_contexto_ia, obter_registro, idade_dias
 
-def main():
-    print("\n" + "="*60)
-    print("🔄 INICIANDO ATUALIZAÇÃO GLOBAL DE CONTEXTOS")
-    print("="*60)
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Regenera as teses estratégicas dos tickers.")
+    parser.add_argument(
+        "--stale-only", action="store_true",
+        help="Regenera apenas contextos inexistentes ou mais velhos que --max-age-days"
+    )
+    parser.add_argument(
+        "--max-age-days", type=float, default=CONTEXTO_TTL_DIAS,
+        help=f"Idade máxima de um contexto no modo --stale-only (padrão: {CONTEXTO_TTL_DIAS:g})"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1,
+        help="Número de contextos gerados em paralelo (padrão: 1)"
+    )
+    parser.add_argument(
+        "--tickers", default="",
+        help="Lista de tickers separados por vírgula (padrão: todos os da planilha)"
+    )
+    return parser.parse_args(argv)
+
+
+def selecionar_tickers(assinantes, stale_only, max_age_days):
+    """
+    Escolhe os tickers a regenerar, dos mais acompanhados para os menos.
+
+    Args:
+        assinantes: Dicionário {ticker: número de usuários}
+        stale_only: Se True, ignora contextos com até max_age_days dias
+        max_age_days: Idade máxima aceita no modo stale_only
+
+    Returns:
+        Lista de tickers em ordem de prioridade
+    """
+    selecionados = []
+    for ticker in assinantes:
+        if stale_only:
+            registro = obter_registro(ticker)
+            if registro and idade_dias(registro) <= max_age_days:
+                continue
+        selecionados.append(ticker)
+    return sorted(selecionados, key=lambda t: (-assinantes[t], t))
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+
+    log("\n" + "="*60)
+    log("🔄 INICIANDO ATUALIZAÇÃO GLOBAL DE CONTEXTOS")
+    log("="*60)
     
-    # 1. Carregar usuários para descobrir todos os tickers
-    print("📊 Carregando tickers da planilha...")
+    # 1. Carregar usuários para descobrir os tickers e quantos usuários seguem cada um
+    log("📊 Carregando tickers da planilha...")
     df_usuarios = carregar_usuarios_sheets()
-    
-    if df_usuarios.empty:
-        print("✗ Nenhum usuário encontrado!")
+    assinantes = contar_assinantes(df_usuarios) if not df_usuarios.empty else {}
+
+    filtro = parsear_tickers(args.tickers)
+    if filtro:
+        assinantes = {t: assinantes.get(t, 0) for t in filtro}
+
+    if not assinantes:
+        log_erro("✗ Nenhum ticker encontrado!")
         return
-        
-    tickers_unicos = extrair_tickers_unicos(df_usuarios)
-    print(f"✓ {len(tickers_unicos)} tickers únicos encontrados.")
-    
-    # 2. Forçar a regeneração de todos os contextos
-    for ticker in sorted(tickers_unicos):
-        try:
-            gerar_contexto_ia(ticker)
-        except Exception as e:
-            print(f"✗ Erro ao atualizar {ticker}: {e}")
-            
-    print("\n" + "="*60)
-    print("✅ ATUALIZAÇÃO CONCLUÍDA!")
-    print("="*60 + "\n")
+    log(f"✓ {len(assinantes)} tickers únicos encontrados.")
+
+    # 2. Escolher o que regenerar, priorizando os tickers com mais usuários
+    tickers = selecionar_tickers(assinantes, args.stale_only, args.max_age_days)
+    if args.stale_only:
+        log(f"✓ {len(tickers)} contextos inexistentes ou com mais de {args.max_age_days:g} dias")
+    if not tickers:
+        log("✓ Todos os contextos estão atualizados.")
+        return
+
+    # 3. Regenerar (cada tese é gravada na base em uma única transação)
+    falhas = []
+    with ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as executor:
+        futures = {executor.submit(gerar_contexto_ia, ticker, True): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                if not future.result():
+                    falhas.append(ticker)
+            except Exception as e:
+                log_erro(f"✗ Erro ao atualizar {ticker}: {e}")
+                falhas.append(ticker)
+
+    log("\n" + "="*60)
+    log("✅ ATUALIZAÇÃO CONCLUÍDA!")
+    log(f"   Contextos atualizados: {len(tickers) - len(falhas)}/{len(tickers)}")
+    if falhas:
+        log_erro(f"   Falhas: {', '.join(sorted(falhas))}")
+    log("="*60 + "\n")
 
 if __name__ == "__main__":
     main()
-
@@ -1,11 +1,21 @@
 """
 Cliente para integração com Google Sheets.
+
+Mantém um snapshot local da planilha de usuários junto com a data de
+modificação informada pelo Google. A planilha só é baixada de novo
+quando muda, e o snapshot também serve de fallback (ou modo offline)
+quando o Google está lento ou fora do ar.
 """
+import json
+import os
+from datetime import datetime
 import gspread
 import pandas as pd
 from google.oauth2.service_account import Credentials
-import os
-from .config import SHEET_ID
+from gspread.utils import rowcol_to_a1
+from .utils import log, log_erro
+from .config import SHEET_ID, SHEETS_SNAPSHOT_PATH, SHEETS_OFFLINE, SHEETS_TIMEOUT
+from .telemetria import medir
 
 # Scopes necessários para Google Sheets
 SCOPES = [
@@ -13,32 +23,158 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+# Únicas colunas usadas pelo pipeline
+COLUNAS_USUARIO = ['Qual seu nome completo?', 'Qual seu e-mail?', 'Ticker 1']
+
+
+def _autorizar():
+    """Autentica no Google e retorna o cliente gspread."""
+    # Tentar carregar credenciais do arquivo
+    creds_file = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', 'config/credentials.json')
+
+    if os.path.exists(creds_file):
+        creds = Credentials.from_service_account_file(creds_file, scopes=SCOPES)
+    else:
+        # Fallback para autenticação padrão (para Google Colab)
+        from google.auth import default
+        creds, _ = default()
+
+    gc = gspread.authorize(creds)
+    if hasattr(gc, 'set_timeout'):
+        gc.set_timeout(SHEETS_TIMEOUT)
+    return gc
+
+
+def _ler_snapshot():
+    """
+    Lê o snapshot local da planilha.
+
+    Returns:
+        Dicionário {sheet_id, revisao, salvo_em, colunas, linhas} ou None
+    """
+    if not os.path.exists(SHEETS_SNAPSHOT_PATH):
+        return None
+    try:
+        with open(SHEETS_SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get('sheet_id') != SHEET_ID:
+            return None
+        return snapshot
+    except Exception as e:
+        log_erro(f"⚠ Erro ao ler snapshot da planilha: {e}")
+        return None
+
+
+def _salvar_snapshot(revisao, colunas, linhas):
+    """Grava o snapshot de forma atômica (arquivo temporário + rename)."""
+    try:
+        os.makedirs(os.path.dirname(SHEETS_SNAPSHOT_PATH) or ".", exist_ok=True)
+        temporario = f"{SHEETS_SNAPSHOT_PATH}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({
+                'sheet_id': SHEET_ID,
+                'revisao': revisao,
+                'salvo_em': datetime.now().isoformat(timespec='seconds'),
+                'colunas': colunas,
+                'linhas': linhas,
+            }, f, ensure_ascii=False)
+        os.replace(temporario, SHEETS_SNAPSHOT_PATH)
+    except Exception as e:
+        log_erro(f"⚠ Erro ao gravar snapshot da planilha: {e}")
+
+
+def _snapshot_para_dataframe(snapshot):
+    """Converte o snapshot em DataFrame no mesmo formato da planilha."""
+    return pd.DataFrame(snapshot['linhas'], columns=snapshot['colunas'])
+
 
-def carregar_usuarios_sheets():
+def _revisao_planilha(spreadsheet):
+    """
+    Retorna a data da última modificação da planilha (Drive API).
+
+    Returns:
+        String com o timestamp ou None se não for possível obtê-lo
+    """
+    try:
+        if hasattr(spreadsheet, 'get_lastUpdateTime'):
+            return spreadsheet.get_lastUpdateTime()
+        return spreadsheet.lastUpdateTime
+    except Exception as e:
+        log_erro(f"⚠ Não foi possível obter a data de modificação da planilha: {e}")
+        return None
+
+
+def _baixar_colunas_usuario(worksheet):
+    """
+    Baixa apenas as colunas usadas pelo pipeline.
+
+    Returns:
+        Tupla (colunas, linhas) com o cabeçalho e as linhas de dados
+    """
+    cabecalho = worksheet.row_values(1)
+    colunas = [c for c in COLUNAS_USUARIO if c in cabecalho]
+    if not colunas:
+        raise ValueError("nenhuma das colunas esperadas foi encontrada na planilha")
+
+    # Faixas de coluna inteira (ex: "B:B"), uma por coluna usada
+    faixas = []
+    for coluna in colunas:
+        letra = rowcol_to_a1(1, cabecalho.index(coluna) + 1).rstrip('0123456789')
+        faixas.append(f"{letra}:{letra}")
+
+    valores = worksheet.batch_get(faixas)
+
+    # Células vazias vêm como [] e linhas finais vazias são omitidas
+    por_coluna = [[celula[0] if celula else '' for celula in faixa] for faixa in valores]
+    total_linhas = max(len(c) for c in por_coluna)
+    por_coluna = [c + [''] * (total_linhas - len(c)) for c in por_coluna]
+
+    linhas = [list(linha) for linha in zip(*por_coluna)][1:]
+    return colunas, linhas
+
+
+def carregar_usuarios_sheets(offline=None):
     """
     Carrega dados dos usuários do Google Sheets e retorna um DataFrame.
+
+    Usa o snapshot local quando a planilha não mudou desde o último
+    download, em modo offline ou se o Google falhar.
+
+    Args:
+        offline: Se True, usa apenas o snapshot local (padrão: SHEETS_OFFLINE)
     """
+    if offline is None:
+        offline = SHEETS_OFFLINE
+
+    snapshot = _ler_snapshot()
+
+    if offline:
+        if snapshot:
+            log(f"✓ Modo offline: {len(snapshot['linhas'])} usuários do snapshot de {snapshot['salvo_em']}")
+            return _snapshot_para_dataframe(snapshot)
+        log_erro("✗ Modo offline sem snapshot local da planilha")
+        return pd.DataFrame()
+
     try:
-        # Tentar carregar credenciais do arquivo
-        creds_file = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', 'config/credentials.json')
-        
-        if os.path.exists(creds_file):
-            creds = Credentials.from_service_account_file(creds_file, scopes=SCOPES)
-        else:
-            # Fallback para autenticação padrão (para Google Colab)
-            from google.auth import default
-            creds, _ = default()
-        
-        gc = gspread.authorize(creds)
-
-        spreadsheet = gc.open_by_key(SHEET_ID)
-        worksheet = spreadsheet.get_worksheet(0)
-        rows = worksheet.get_all_values()
-
-        df = pd.DataFrame(rows[1:], columns=rows[0])
-        print(f"✓ Carregados {len(df)} usuários do Google Sheets")
+        with medir("google_sheets"):
+            gc = _autorizar()
+            spreadsheet = gc.open_by_key(SHEET_ID)
+
+            revisao = _revisao_planilha(spreadsheet)
+            if snapshot and revisao and snapshot.get('revisao') == revisao:
+                log(f"✓ Planilha sem alterações desde {revisao}: {len(snapshot['linhas'])} usuários do snapshot local")
+                return _snapshot_para_dataframe(snapshot)
+
+            worksheet = spreadsheet.get_worksheet(0)
+            colunas, linhas = _baixar_colunas_usuario(worksheet)
+        _salvar_snapshot(revisao, colunas, linhas)
+
+        df = pd.DataFrame(linhas, columns=colunas)
+        log(f"✓ Carregados {len(df)} usuários do Google Sheets")
         return df
     except Exception as e:
-        print(f"✗ Erro ao carregar Google Sheets: {e}")
+        log_erro(f"✗ Erro ao carregar Google Sheets: {e}")
+        if snapshot:
+            log_erro(f"⚠ Usando snapshot local de {snapshot['salvo_em']}")
+            return _snapshot_para_dataframe(snapshot)
         return pd.DataFrame()
-
@@ -0,0 +1,216 @@
+"""
+Telemetria da execução: spans de tempo, contadores e histogramas de latência.
+
+Cada etapa do pipeline e cada chamada externa (OpenAI, Event Registry,
+yfinance, Sheets, SMTP) é medida com `medir(...)`. No fim da execução,
+`gravar_relatorio()` escreve um relatório JSON e um arquivo texto no
+formato do Prometheus (para o textfile collector do node_exporter).
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from .utils import log_erro
+from .config import TELEMETRIA_ATIVA, TELEMETRIA_DIR, TELEMETRIA_MAX_SPANS
+
+PREFIXO_METRICAS = "tradingcore"
+
+# Limites (segundos) dos buckets dos histogramas de latência
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_inicio = time.time()
+_inicio_monotonico = time.monotonic()
+_contadores = {}
+_amostras = {}
+_spans = []
+_spans_descartados = 0
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def incrementar(nome, valor=1, **rotulos):
+    """
+    Soma `valor` ao contador `nome` com os rótulos informados.
+
+    Exemplo: incrementar("artigos_descartados_total", 3, motivo="prefiltro")
+    """
+    if not TELEMETRIA_ATIVA or not valor:
+        return
+    chave = _chave(nome, rotulos)
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def observar(nome, valor, **rotulos):
+    """Registra uma amostra (em segundos) no histograma `nome`."""
+    if not TELEMETRIA_ATIVA:
+        return
+    chave = _chave(nome, rotulos)
+    with _lock:
+        _amostras.setdefault(chave, []).append(valor)
+
+
+@contextmanager
+def medir(operacao, **rotulos):
+    """
+    Mede a duração de um bloco como um span.
+
+    Alimenta o histograma 'duracao_segundos' e o contador 'operacoes_total'
+    (com resultado 'ok' ou 'erro'); exceções são propagadas normalmente.
+
+    Args:
+        operacao: Nome da etapa ou do serviço externo (ex: "openai", "fase1")
+        **rotulos: Rótulos extras (ex: ticker="PETR4")
+    """
+    if not TELEMETRIA_ATIVA:
+        yield
+        return
+
+    global _spans_descartados
+    inicio = time.monotonic()
+    resultado = "ok"
+    try:
+        yield
+    except BaseException:
+        resultado = "erro"
+        raise
+    finally:
+        duracao = time.monotonic() - inicio
+        observar("duracao_segundos", duracao, operacao=operacao)
+        incrementar("operacoes_total", operacao=operacao, resultado=resultado)
+        with _lock:
+            if len(_spans) < TELEMETRIA_MAX_SPANS:
+                _spans.append({
+                    'operacao': operacao,
+                    'inicio_s': round(inicio - _inicio_monotonico, 4),
+                    'duracao_s': round(duracao, 4),
+                    'resultado': resultado,
+                    'thread': threading.current_thread().name,
+                    **{k: str(v) for k, v in rotulos.items()},
+                })
+            else:
+                _spans_descartados += 1
+
+
+def _percentil(ordenadas, fracao):
+    if not ordenadas:
+        return None
+    return ordenadas[min(int(fracao * len(ordenadas)), len(ordenadas) - 1)]
+
+
+def gerar_relatorio():
+    """
+    Monta o relatório da execução.
+
+    Returns:
+        Dicionário com 'inicio', 'duracao_s', 'contadores', 'histogramas',
+        'spans' e 'spans_descartados'
+    """
+    with _lock:
+        contadores = dict(_contadores)
+        amostras = {chave: sorted(valores) for chave, valores in _amostras.items()}
+        spans = list(_spans)
+        descartados = _spans_descartados
+
+    return {
+        'inicio': datetime.fromtimestamp(_inicio).isoformat(timespec='seconds'),
+        'duracao_s': round(time.monotonic() - _inicio_monotonico, 3),
+        'contadores': [
+            {'nome': nome, 'rotulos': dict(rotulos), 'valor': valor}
+            for (nome, rotulos), valor in sorted(contadores.items())
+        ],
+        'histogramas': [
+            {
+                'nome': nome,
+                'rotulos': dict(rotulos),
+                'contagem': len(valores),
+                'soma': round(sum(valores), 4),
+                'p50': round(statistics.median(valores), 4),
+                'p95': round(_percentil(valores, 0.95), 4),
+                'max': round(valores[-1], 4),
+            }
+            for (nome, rotulos), valores in sorted(amostras.items())
+        ],
+        'spans': spans,
+        'spans_descartados': descartados,
+    }
+
+
+def _formatar_rotulos(rotulos, extra=None):
+    itens = list(rotulos) + ([extra] if extra else [])
+    if not itens:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in itens) + "}"
+
+
+def gerar_prometheus():
+    """Converte contadores e histogramas para o formato texto do Prometheus."""
+    with _lock:
+        contadores = dict(_contadores)
+        amostras = {chave: list(valores) for chave, valores in _amostras.items()}
+
+    linhas = []
+    for nome in sorted({nome for nome, _ in contadores}):
+        metrica = f"{PREFIXO_METRICAS}_{nome}"
+        linhas.append(f"# TYPE {metrica} counter")
+        for (n, rotulos), valor in sorted(contadores.items()):
+            if n == nome:
+                linhas.append(f"{metrica}{_formatar_rotulos(rotulos)} {valor}")
+
+    for nome in sorted({nome for nome, _ in amostras}):
+        metrica = f"{PREFIXO_METRICAS}_{nome}"
+        linhas.append(f"# TYPE {metrica} histogram")
+        for (n, rotulos), valores in sorted(amostras.items()):
+            if n != nome:
+                continue
+            for limite in BUCKETS_LATENCIA:
+                quantidade = sum(1 for v in valores if v <= limite)
+                linhas.append(f"{metrica}_bucket{_formatar_rotulos(rotulos, ('le', limite))} {quantidade}")
+            linhas.append(f"{metrica}_bucket{_formatar_rotulos(rotulos, ('le', '+Inf'))} {len(valores)}")
+            linhas.append(f"{metrica}_sum{_formatar_rotulos(rotulos)} {sum(valores)}")
+            linhas.append(f"{metrica}_count{_formatar_rotulos(rotulos)} {len(valores)}")
+
+    linhas.append(f"# TYPE {PREFIXO_METRICAS}_ultima_execucao_timestamp gauge")
+    linhas.append(f"{PREFIXO_METRICAS}_ultima_execucao_timestamp {int(time.time())}")
+    return "\n".join(linhas) + "\n"
+
+
+def _gravar_atomico(caminho, conteudo):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def gravar_relatorio(diretorio=None, sufixo=""):
+    """
+    Grava o relatório JSON da execução e o arquivo do Prometheus.
+
+    Args:
+        diretorio: Destino dos arquivos (padrão: TELEMETRIA_DIR)
+        sufixo: Acrescentado aos nomes dos arquivos (ex: "-shard1de4"), para
+            que processos em paralelo não sobrescrevam uns aos outros
+
+    Returns:
+        Tupla (caminho_json, caminho_prom) ou None se a telemetria estiver desligada
+    """
+    if not TELEMETRIA_ATIVA:
+        return None
+    diretorio = diretorio or TELEMETRIA_DIR
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        carimbo = datetime.fromtimestamp(_inicio).strftime("%Y%m%d-%H%M%S")
+        caminho_json = os.path.join(diretorio, f"execucao-{carimbo}{sufixo}.json")
+        caminho_prom = os.path.join(diretorio, f"{PREFIXO_METRICAS}{sufixo}.prom")
+        _gravar_atomico(caminho_json, json.dumps(gerar_relatorio(), ensure_ascii=False, indent=2))
+        _gravar_atomico(caminho_prom, gerar_prometheus())
+        return caminho_json, caminho_prom
+    except Exception as e:
+        log_erro(f"⚠ Erro ao gravar relatório de telemetria: {e}")
+        return None
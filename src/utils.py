@@ -1,9 +1,28 @@
 """
 Funções utilitárias do TradingCore.
 """
+import json
+import sys
+from collections import Counter
 from datetime import datetime, timedelta
 import pytz
-from .config import HORAS_RETROATIVAS
+from .config import HORAS_RETROATIVAS, LOG_CONSOLE
+
+
+def log(*partes, **kwargs):
+    """
+    Escreve uma linha de progresso no console (stdout).
+
+    Não escreve nada com LOG_CONSOLE=false; o resultado da execução fica
+    no relatório de telemetria.
+    """
+    if LOG_CONSOLE:
+        print(*partes, **kwargs)
+
+
+def log_erro(*partes, **kwargs):
+    """Escreve erros e avisos no stderr, mesmo com LOG_CONSOLE=false."""
+    print(*partes, file=sys.stderr, **kwargs)
 
 
 def calcular_periodo_24h():
@@ -35,6 +54,22 @@ def parsear_tickers(ticker_str):
     return [t for t in tickers if t]
 
 
+def estimar_tokens(texto):
+    """Estimativa grosseira de tokens (~4 caracteres por token)."""
+    return len(texto) // 4 + 1
+
+
+def extrair_json(conteudo):
+    """Converte a resposta do GPT em objeto JSON, removendo blocos markdown."""
+    conteudo = conteudo.strip()
+    if conteudo.startswith("```"):
+        conteudo = conteudo.split("```")[1]
+        if conteudo.startswith("json"):
+            conteudo = conteudo[4:]
+        conteudo = conteudo.strip()
+    return json.loads(conteudo)
+
+
 def formatar_timestamp():
     """Retorna timestamp formatado no timezone de São Paulo."""
     tz = pytz.timezone('America/Sao_Paulo')
@@ -60,3 +95,18 @@ def extrair_tickers_unicos(df_usuarios):
     
     return todos_tickers
 
+
+def contar_assinantes(df_usuarios):
+    """
+    Conta quantos usuários acompanham cada ticker.
+
+    Args:
+        df_usuarios: DataFrame com coluna 'Ticker 1' contendo tickers separados por vírgula
+
+    Returns:
+        Counter {ticker: número de usuários}
+    """
+    contagem = Counter()
+    for _, row in df_usuarios.iterrows():
+        contagem.update(set(parsear_tickers(row.get('Ticker 1', ''))))
+    return contagem
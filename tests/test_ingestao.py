@@ -0,0 +1,73 @@
+"""
+Testes da marca d'água da ingestão incremental (src/ingestao.py).
+
+Executar com: python -m unittest tests/test_ingestao.py
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from src import ingestao
+
+
+def _data(horas_atras):
+    """dateTime no formato do Event Registry, `horas_atras` antes de agora (dentro da janela)."""
+    return (datetime.now(timezone.utc) - timedelta(hours=horas_atras)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _artigo(uri, horas_atras):
+    return {'uri': uri, 'dateTime': _data(horas_atras), 'body': f"corpo {uri}"}
+
+
+class TestMarcaDagua(unittest.TestCase):
+
+    def setUp(self):
+        self._diretorio = tempfile.TemporaryDirectory()
+        self._caminho_original = ingestao.INGESTAO_PATH
+        ingestao.INGESTAO_PATH = os.path.join(self._diretorio.name, "ingestao.sqlite3")
+        ingestao._conexao = None
+
+    def tearDown(self):
+        if ingestao._conexao is not None:
+            ingestao._conexao.close()
+        ingestao._conexao = None
+        ingestao.INGESTAO_PATH = self._caminho_original
+        self._diretorio.cleanup()
+
+    def _marca(self, ticker="PETR4"):
+        return ingestao.obter_marcas([ticker])[ticker]
+
+    def test_descartados_nao_seguram_a_marca(self):
+        artigos = [_artigo("antigo-sem-corpo", 5), _artigo("analisado", 3), _artigo("pre-filtro", 1)]
+        resultados = [ingestao.DESCARTADO, {'resumo': 'ok'}, ingestao.DESCARTADO]
+
+        ingestao.registrar("PETR4", artigos, resultados)
+
+        self.assertEqual(self._marca(), artigos[2]['dateTime'])
+        # Descartados contam como vistos, mas não entram nas análises da janela
+        self.assertEqual(ingestao.filtrar_novos("PETR4", artigos), [])
+        self.assertEqual(ingestao.analises_janela("PETR4"), [{'resumo': 'ok'}])
+
+    def test_falha_recua_marca_ja_salva(self):
+        recente = _artigo("recente", 1)
+        ingestao.registrar("PETR4", [recente], [{'resumo': 'ok'}])
+        self.assertEqual(self._marca(), recente['dateTime'])
+
+        falho = _artigo("falho", 4)
+        ingestao.registrar("PETR4", [falho, _artigo("outro", 2)], [None, {'resumo': 'ok'}])
+
+        # A marca volta ao artigo falho, mesmo estando a marca salva depois dele
+        self.assertEqual(self._marca(), falho['dateTime'])
+        self.assertEqual(ingestao.filtrar_novos("PETR4", [falho]), [falho])
+
+    def test_so_falhas_tambem_recua_a_marca(self):
+        ingestao.registrar("PETR4", [_artigo("recente", 1)], [{'resumo': 'ok'}])
+        falho = _artigo("falho", 6)
+
+        ingestao.registrar("PETR4", [falho], [None])
+
+        self.assertEqual(self._marca(), falho['dateTime'])
+
+
+if __name__ == "__main__":
+    unittest.main()